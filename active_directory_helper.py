@@ -7,9 +7,15 @@ Ermittelt Standortinformationen von Benutzern über Active Directory
 import os
 import time
 import logging
+import threading
 import configparser
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Iterable, Set, Tuple
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+
+from ad_cache import UserInfoCache, SqliteCacheStore
+from ldap_pool import LdapConnectionPool
+from ad_directory import DirectoryIndex
 
 # Active Directory Imports
 try:
@@ -21,11 +27,34 @@ try:
     AD_AVAILABLE = True
 except ImportError as e:
     AD_AVAILABLE = False
+    SUBTREE = 'SUBTREE'  # Wert der ldap3-Konstante
     print(f"WARNUNG: Active Directory Module nicht verfügbar: {e}")
     print("Standort-Features werden deaktiviert.")
 
 logger = logging.getLogger(__name__)
 
+# Maximale Anzahl Benutzernamen pro OR-Filter bei Batch-Suchen
+AD_BATCH_SIZE = 50
+
+# OID des Paged-Results-Controls (RFC 2696)
+PAGED_RESULTS_OID = '1.2.840.113556.1.4.319'
+
+# Alle Benutzerkonten (objectCategory ist im AD indiziert)
+USER_FILTER = "(&(objectCategory=person)(objectClass=user))"
+
+# Attribute für den Verzeichnis-Index: Schlüssel, Quellen der INDEX_FIELDS, uSNChanged
+DIRECTORY_ATTRIBUTES = ['sAMAccountName', 'userPrincipalName', 'displayName', 'cn',
+                        'physicalDeliveryOfficeName', 'l', 'st', 'co', 'c', 'department', 'uSNChanged']
+
+
+def _escape_filter_value(value: str) -> str:
+    """Escaped Sonderzeichen für LDAP-Filter nach RFC 4515"""
+    return (value.replace('\\', r'\5c')
+                 .replace('*', r'\2a')
+                 .replace('(', r'\28')
+                 .replace(')', r'\29')
+                 .replace('\0', r'\00'))
+
 @dataclass
 class UserInfo:
     """Benutzerinformationen aus Active Directory"""
@@ -37,21 +66,46 @@ class UserInfo:
     city: str = ""
     country: str = ""
     
+# Platzhalter für Benutzer, die der Refresher noch nicht aufgelöst hat
+PENDING_INFO = {'location': 'pending'}
+
 class ActiveDirectoryHelper:
     """Helper-Klasse für Active Directory Abfragen"""
     
     def __init__(self, ad_server: Optional[str] = None, domain: Optional[str] = None, 
                  username: Optional[str] = None, password: Optional[str] = None,
-                 location_attributes: Optional[List[str]] = None):
+                 location_attributes: Optional[List[str]] = None,
+                 cache_file: Optional[str] = None, preload: Optional[bool] = None):
         self.ad_server = ad_server
         self.domain = domain or self._get_current_domain()
         self.username = username
         self.password = password
-        self.connection = None
-        self.user_cache = {}
+        self.server = None
+        self.pool: Optional[LdapConnectionPool] = None
         self.cache_timeout = 300  # 5 Minuten Cache
         self.last_cache_update = 0
         self.enabled = AD_AVAILABLE
+        self._stats_lock = threading.Lock()
+        self.last_batch_stats: Dict[str, float] = {}
+        self.batch_stats_total = {
+            'cache_hits': 0, 'found': 0, 'not_found': 0, 'failed': 0, 'stale': 0, 'pending': 0,
+            'ldap_searches': 0
+        }
+        # Hintergrund-Refresher: eingereihte neue Benutzer und zuletzt angefragte Benutzer
+        self._refresh_lock = threading.Lock()
+        self._refresh_queue: Set[str] = set()
+        self._requested: Dict[str, float] = {}
+        self._refresh_wakeup = threading.Event()
+        self._refresh_stop = threading.Event()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self.refreshed_users = 0
+        # Aus dem rootDSE ermittelt (siehe _discover_directory)
+        self.search_base: Optional[str] = None
+        self.search_attributes: Optional[List[str]] = None
+        # LDAP-Operationen insgesamt sowie Suchen/Benutzer für Benutzerabfragen
+        self.ldap_operations = 0
+        self.ldap_lookup_operations = 0
+        self.ldap_lookup_users = 0
         
         # Lade AD-Konfiguration aus Datei falls vorhanden
         ad_config = self._load_ad_config()
@@ -67,6 +121,41 @@ class ActiveDirectoryHelper:
         # Cache-Timeout aus Konfiguration
         self.cache_timeout = ad_config.get('cache_timeout', 300)
         
+        # Anzahl paralleler LDAP-Verbindungen
+        self.pool_size = ad_config.get('pool_size', 4)
+        
+        # Einträge werden im letzten Viertel ihrer TTL im Hintergrund erneuert
+        self.refresh_ahead_ratio = ad_config.get('refresh_ahead_ratio', 0.25)
+        
+        # Optional: komplettes Verzeichnis vorab laden und inkrementell abgleichen
+        if preload is None:
+            preload = ad_config.get('preload', False)
+        self.directory_index: Optional[DirectoryIndex] = DirectoryIndex() if preload else None
+        self.preload_sync_interval = ad_config.get('preload_sync_interval', 300)
+        self.preload_full_interval = ad_config.get('preload_full_interval', 86400)
+        self.preload_page_size = ad_config.get('preload_page_size', 1000)
+        self.directory_syncs = {'full': 0, 'incremental': 0}
+        self.last_directory_sync: Dict[str, float] = {}
+        
+        # Optional persistenter Cache für einen warmen Start nach Neustarts
+        if cache_file is None:
+            cache_file = ad_config.get('cache_file', '')
+        cache_store = None
+        if cache_file:
+            try:
+                cache_store = SqliteCacheStore(cache_file)
+            except Exception as e:
+                logger.warning(f"AD-Cache-Datei {cache_file} nicht nutzbar, Cache nur im Speicher: {e}")
+        
+        # Begrenzter LRU-Cache; nicht gefundene Benutzer laufen separat (kürzer) ab
+        self.user_cache = UserInfoCache(
+            max_entries=ad_config.get('cache_max_entries', 10000),
+            positive_ttl=self.cache_timeout,
+            negative_ttl=ad_config.get('negative_cache_timeout', 60),
+            max_stale=ad_config.get('stale_cache_timeout', 86400),
+            store=cache_store
+        )
+        
         # Standard Attribute für Standort-Informationen
         self.location_attributes = location_attributes or [
             'l',           # Location/Stadt
@@ -102,6 +191,16 @@ class ActiveDirectoryHelper:
                     config['username'] = ad_section.get('username', '').strip()
                     config['password'] = ad_section.get('password', '').strip()
                     config['cache_timeout'] = ad_section.getint('cache_timeout', 300)
+                    config['cache_max_entries'] = ad_section.getint('cache_max_entries', 10000)
+                    config['negative_cache_timeout'] = ad_section.getint('negative_cache_timeout', 60)
+                    config['stale_cache_timeout'] = ad_section.getint('stale_cache_timeout', 86400)
+                    config['cache_file'] = ad_section.get('cache_file', '').strip()
+                    config['pool_size'] = ad_section.getint('pool_size', 4)
+                    config['refresh_ahead_ratio'] = ad_section.getfloat('refresh_ahead_ratio', 0.25)
+                    config['preload'] = ad_section.getboolean('preload', False)
+                    config['preload_sync_interval'] = ad_section.getint('preload_sync_interval', 300)
+                    config['preload_full_interval'] = ad_section.getint('preload_full_interval', 86400)
+                    config['preload_page_size'] = ad_section.getint('preload_page_size', 1000)
                     
                     logger.info(f"AD-Konfiguration aus {config_file} geladen")
                     
@@ -222,46 +321,16 @@ class ActiveDirectoryHelper:
             logger.debug(f"Versuche AD-Verbindung zu: {self.ad_server}")
             
             # Timeout für Server-Verbindung setzen
-            server = Server(self.ad_server, get_info=ALL, connect_timeout=5)
+            self.server = Server(self.ad_server, get_info=ALL, connect_timeout=5)
             
-            if self.username and self.password:
-                # Explizite Anmeldung
-                user_dn = f"{self.username}@{self.domain}"
-                self.connection = Connection(
-                    server, 
-                    user=user_dn, 
-                    password=self.password, 
-                    auto_bind=True,
-                    read_only=True,
-                    raise_exceptions=False
-                )
-            else:
-                # Versuche mit aktuellen Windows-Credentials
-                self.connection = Connection(
-                    server, 
-                    auto_bind=True, 
-                    authentication='NTLM',
-                    read_only=True,
-                    raise_exceptions=False
-                )
+            # Verbindungen werden bei Bedarf aufgebaut und nach Abbrüchen neu gebunden
+            self.pool = LdapConnectionPool(self._connect, size=self.pool_size)
             
-            # Teste die Verbindung mit einer einfachen Abfrage
-            if self.connection and self.connection.bound:
-                # Teste mit einer einfachen Abfrage
-                test_result = self.connection.search(
-                    search_base="",
-                    search_filter="(objectClass=*)",
-                    search_scope="BASE",
-                    size_limit=1
-                )
-                
-                if test_result or not self.connection.last_error:
-                    logger.info(f"Active Directory Verbindung erfolgreich: {self.ad_server}")
-                    return True
-                else:
-                    logger.warning(f"AD-Verbindung funktioniert nicht richtig: {self.connection.last_error}")
-                    self.enabled = False
-                    return False
+            # rootDSE einmalig lesen - prüft die Verbindung und liefert Suchbasis und Schema
+            if self._discover_directory():
+                logger.info(f"Active Directory Verbindung erfolgreich: {self.ad_server} "
+                            f"(Suchbasis {self.search_base}, bis zu {self.pool_size} Verbindungen)")
+                return True
             else:
                 logger.warning("AD-Verbindung konnte nicht aufgebaut werden")
                 self.enabled = False
@@ -272,54 +341,190 @@ class ActiveDirectoryHelper:
             self.enabled = False
             return False
     
+    def _connect(self):
+        """Baut eine gebundene LDAP-Verbindung auf (Factory für den Connection Pool)"""
+        if self.username and self.password:
+            # Explizite Anmeldung
+            user_dn = f"{self.username}@{self.domain}"
+            connection = Connection(
+                self.server, 
+                user=user_dn, 
+                password=self.password, 
+                auto_bind=True,
+                read_only=True,
+                raise_exceptions=False
+            )
+        else:
+            # Versuche mit aktuellen Windows-Credentials
+            connection = Connection(
+                self.server, 
+                auto_bind=True, 
+                authentication='NTLM',
+                read_only=True,
+                raise_exceptions=False
+            )
+        
+        if not connection.bound:
+            raise ConnectionError(f"Bind an {self.ad_server} fehlgeschlagen: {connection.last_error}")
+        return connection
+    
+    def _discover_directory(self) -> bool:
+        """
+        Liest defaultNamingContext und Schema aus dem rootDSE und merkt sie sich.
+        Die rootDSE-Abfrage baut zugleich die erste Verbindung auf; das Schema
+        lädt ldap3 dabei über get_info=ALL. Standort-Attribute, die das Schema
+        nicht kennt, werden aus den Suchen entfernt.
+        """
+        try:
+            entries = self._ldap_search(
+                search_base="",
+                search_filter="(objectClass=*)",
+                search_scope="BASE",
+                attributes=['defaultNamingContext']
+            )
+        except Exception as e:
+            logger.warning(f"rootDSE-Abfrage fehlgeschlagen: {e}")
+            return False
+        
+        info = getattr(self.server, 'info', None)
+        naming_context = self._first_value(getattr(info, 'other', None) or {}, 'defaultNamingContext')
+        if not naming_context and entries:
+            naming_context = getattr(entries[0], 'defaultNamingContext', None)
+            naming_context = str(naming_context) if naming_context else None
+        
+        self.search_base = naming_context or self._domain_base()
+        
+        schema = getattr(self.server, 'schema', None)
+        attribute_types = getattr(schema, 'attribute_types', None)
+        if attribute_types:
+            known = {name.lower() for name in attribute_types}
+            unknown = [a for a in self.location_attributes if a.lower() not in known]
+            if unknown:
+                logger.info(f"AD-Schema kennt die Attribute {unknown} nicht - werden nicht abgefragt")
+                self.location_attributes = [a for a in self.location_attributes if a.lower() in known]
+        
+        self.search_attributes = ['sAMAccountName', 'displayName', 'cn', 'userPrincipalName'] + self.location_attributes
+        logger.debug(f"AD-Suchbasis aus rootDSE: {self.search_base}")
+        return True
+    
+    @staticmethod
+    def _first_value(values: Dict, key: str) -> Optional[str]:
+        """Erster Wert eines rootDSE-Attributs (ldap3 liefert Listen)"""
+        value = values.get(key)
+        if isinstance(value, (list, tuple)):
+            value = value[0] if value else None
+        return str(value) if value else None
+    
+    def _domain_base(self) -> str:
+        """Aus dem Domainnamen abgeleitete Suchbasis (Rückfall ohne rootDSE)"""
+        return f"DC={self.domain.replace('.', ',DC=')}"
+    
+    def _ldap_search(self, **kwargs) -> List:
+        """
+        Führt eine LDAP-Suche auf einer Verbindung aus dem Pool aus, zählt sie
+        und liefert die gefundenen Entries. Ist die Verbindung abgebrochen, baut
+        der Pool sie neu auf und wiederholt die Suche einmal.
+        """
+        def search(connection):
+            with self._stats_lock:
+                self.ldap_operations += 1
+            if not connection.search(**kwargs) and getattr(connection, 'closed', False):
+                raise ConnectionError(f"LDAP-Verbindung getrennt: {connection.last_error}")
+            return list(connection.entries)
+        
+        return self.pool.run(search)
+    
     def _search_user(self, username: str) -> Dict:
-        """Sucht einen Benutzer im Active Directory"""
-        if not self.enabled or not self.connection:
+        """Sucht einen Benutzer im Active Directory - eine Suche mit kombiniertem Filter"""
+        if not self.enabled or not self.pool:
             return {}
         
-        try:
-            # Verschiedene DN-Basis probieren
-            search_bases = [
-                f"DC={self.domain.replace('.', ',DC=')}",
-                "CN=Users," + f"DC={self.domain.replace('.', ',DC=')}",
-                ""  # Root-Suche als Fallback
-            ]
-            
-            # Verschiedene Suchfilter probieren
-            search_filters = [
-                f"(sAMAccountName={username})",
-                f"(userPrincipalName={username}@{self.domain})",
-                f"(cn={username})",
-                f"(displayName={username})"
-            ]
-            
-            attributes = ['sAMAccountName', 'displayName', 'cn', 'userPrincipalName'] + self.location_attributes
-            
-            for search_base in search_bases:
-                for search_filter in search_filters:
-                    try:
-                        self.connection.search(
-                            search_base=search_base,
-                            search_filter=search_filter,
-                            search_scope=SUBTREE,
-                            attributes=attributes
-                        )
-                        
-                        if self.connection.entries:
-                            entry = self.connection.entries[0]
-                            logger.debug(f"Benutzer {username} gefunden in {search_base}")
-                            return self._extract_user_info(entry)
-                            
-                    except Exception as e:
-                        logger.debug(f"Suche fehlgeschlagen: {search_base} - {search_filter}: {e}")
-                        continue
-            
+        results, _, failed = self._search_users_batch([username])
+        if username in failed:
+            logger.error(f"Fehler bei AD-Suche für {username}")
+        elif username not in results:
             logger.debug(f"Benutzer {username} nicht in AD gefunden")
-            return {}
-            
+        return results.get(username, {})
+    
+    def _search_users_batch(self, usernames: List[str]) -> Tuple[Dict[str, Dict], int, Set[str]]:
+        """
+        Sucht mehrere Benutzer mit einer Suche pro AD_BATCH_SIZE Namen.
+        Der Filter kombiniert sAMAccountName, userPrincipalName, cn und
+        displayName; passen mehrere Entries auf einen Namen, gewinnt der
+        Treffer in dieser Reihenfolge. Mehrere Suchen laufen parallel über
+        die Verbindungen des Pools.
+        Gibt ({username: info} der gefundenen Benutzer, Anzahl LDAP-Suchen,
+        Benutzer deren Suche fehlgeschlagen ist) zurück.
+        """
+        results: Dict[str, Dict] = {}
+        failed: Set[str] = set()
+        if not self.enabled or not self.pool or not usernames:
+            return results, 0, set(usernames)
+        
+        chunks = [usernames[i:i + AD_BATCH_SIZE] for i in range(0, len(usernames), AD_BATCH_SIZE)]
+        workers = min(self.pool.size, len(chunks))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ad-lookup') as executor:
+                outcomes = list(executor.map(self._search_chunk, chunks))
+        else:
+            outcomes = [self._search_chunk(chunk) for chunk in chunks]
+        
+        for chunk, found in zip(chunks, outcomes):
+            if found is None:
+                failed.update(chunk)
+            else:
+                results.update(found)
+        
+        with self._stats_lock:
+            self.ldap_lookup_users += len(usernames)
+            self.ldap_lookup_operations += len(chunks)
+        
+        return results, len(chunks), failed
+    
+    def _search_chunk(self, chunk: List[str]) -> Optional[Dict[str, Dict]]:
+        """Eine Suche für bis zu AD_BATCH_SIZE Namen; None, wenn die Suche fehlgeschlagen ist"""
+        lookup = {name.lower(): name for name in chunk}
+        terms = "".join(
+            f"(sAMAccountName={value})(userPrincipalName={value}@{self.domain})"
+            f"(cn={value})(displayName={value})"
+            for value in map(_escape_filter_value, chunk)
+        )
+        search_filter = f"{USER_FILTER[:-1]}(|{terms}))"
+        
+        try:
+            entries = self._ldap_search(
+                search_base=self.search_base or self._domain_base(),
+                search_filter=search_filter,
+                search_scope=SUBTREE,
+                attributes=self.search_attributes or (
+                    ['sAMAccountName', 'displayName', 'cn', 'userPrincipalName'] + self.location_attributes)
+            )
         except Exception as e:
-            logger.error(f"Fehler bei AD-Suche für {username}: {e}")
-            return {}
+            logger.debug(f"Batch-Suche fehlgeschlagen ({len(chunk)} Benutzer): {e}")
+            return None
+        
+        best: Dict[str, Tuple[int, object]] = {}
+        for entry in entries:
+            for priority, name in self._entry_names(entry):
+                requested = lookup.get(name)
+                if requested and (requested not in best or priority < best[requested][0]):
+                    best[requested] = (priority, entry)
+        return {requested: self._extract_user_info(entry) for requested, (_, entry) in best.items()}
+    
+    def _entry_names(self, entry) -> List[Tuple[int, str]]:
+        """
+        Alle Namen (klein geschrieben), unter denen ein LDAP-Entry angefragt
+        worden sein kann, mit Priorität (0 = sAMAccountName ... 3 = displayName)
+        """
+        names = []
+        for priority, attribute in enumerate(('sAMAccountName', 'userPrincipalName', 'cn', 'displayName')):
+            value = getattr(entry, attribute, None)
+            if value:
+                value = str(value)
+                if attribute == 'userPrincipalName':
+                    value = value.split('@', 1)[0]
+                names.append((priority, value.lower()))
+        return names
     
     def _extract_user_info(self, entry) -> Dict:
         """Extrahiert Benutzerinformationen aus einem LDAP-Entry"""
@@ -373,72 +578,384 @@ class ActiveDirectoryHelper:
         if not self.enabled:
             return "AD_Disabled"
         
-        # Cache prüfen
-        current_time = time.time()
-        if username in self.user_cache:
-            cache_entry = self.user_cache[username]
-            if current_time - cache_entry['timestamp'] < self.cache_timeout:
-                return cache_entry['location']
-        
-        # AD-Abfrage
-        user_info = self._search_user(username)
-        location = user_info.get('location', 'Unknown')
-        
-        # Cache aktualisieren
-        self.user_cache[username] = {
-            'location': location,
-            'timestamp': current_time,
-            'full_info': user_info
-        }
+        user_info = self._lookup_user(username)
         
-        return location
+        return user_info.get('location', 'Unknown')
     
     def get_user_info(self, username: str) -> UserInfo:
         """Ermittelt vollständige Benutzerinformationen"""
         if not self.enabled:
             return UserInfo(username=username, location="AD_Disabled")
         
+        user_info = self._lookup_user(username)
+        
+        return self._to_user_info(username, user_info)
+    
+    def _lookup_user(self, username: str) -> Dict:
+        """Einzelabfrage: vorab geladenes Verzeichnis, sonst Cache und bei Bedarf AD-Suche"""
+        if self.directory_index is not None and self.directory_index.loaded:
+            return self.directory_index.get(username) or {}
+        
         # Cache prüfen
-        current_time = time.time()
-        if username in self.user_cache:
-            cache_entry = self.user_cache[username]
-            if current_time - cache_entry['timestamp'] < self.cache_timeout:
-                info = cache_entry['full_info']
-                return UserInfo(
-                    username=username,
-                    full_name=info.get('full_name', ''),
-                    location=info.get('location', 'Unknown'),
-                    department=info.get('department', ''),
-                    office=info.get('office', ''),
-                    city=info.get('city', ''),
-                    country=info.get('country', '')
-                )
-        
-        # AD-Abfrage
-        user_info = self._search_user(username)
-        
-        # Cache aktualisieren
-        self.user_cache[username] = {
-            'location': user_info.get('location', 'Unknown'),
-            'timestamp': current_time,
-            'full_info': user_info
+        user_info = self.user_cache.get(username)
+        if user_info is None:
+            # AD-Abfrage und Cache aktualisieren
+            user_info = self._search_user(username)
+            self.user_cache.put(username, user_info)
+        return user_info
+    
+    def get_users_info(self, usernames: Iterable[str], block: Optional[bool] = None) -> Dict[str, UserInfo]:
+        """
+        Ermittelt Benutzerinformationen für viele Benutzer auf einmal.
+        Abgelaufene Cache-Einträge werden entfernt, alle nicht gecachten
+        Benutzer werden gesammelt und mit gebündelten LDAP-Suchen aufgelöst.
+        
+        Läuft der Hintergrund-Refresher (oder block=False), wird nie auf das
+        AD gewartet: abgelaufene Einträge werden weiter verwendet, neue
+        Benutzer erhalten location="pending" und werden zur Suche eingereiht.
+        """
+        usernames = list(dict.fromkeys(usernames))
+        if not self.enabled:
+            return {name: UserInfo(username=name, location="AD_Disabled") for name in usernames}
+        if self.directory_index is not None and self.directory_index.loaded:
+            return self._lookup_directory(usernames)
+        if block is None:
+            block = not self.refresher_running()
+        
+        start_time = time.time()
+        
+        # Cache-Pflege: abgelaufene Einträge entfernen
+        purged = self.user_cache.purge_expired()
+        self._note_requested(usernames, start_time)
+        
+        infos = {}
+        missing = []
+        for name in usernames:
+            user_info = self.user_cache.get(name)
+            if user_info is not None:
+                infos[name] = user_info
+            else:
+                missing.append(name)
+        
+        if block:
+            resolved, stats = self._resolve(missing)
+            infos.update(resolved)
+        else:
+            # Nicht auf das AD warten - der Refresher löst die Benutzer im Hintergrund auf
+            stats = dict.fromkeys(('found', 'not_found', 'failed', 'stale', 'ldap_searches', 'pending'), 0)
+            for name in missing:
+                user_info = self.user_cache.get_stale(name)
+                if user_info is None:
+                    stats['pending'] += 1
+                    infos[name] = PENDING_INFO
+                else:
+                    stats['stale'] += 1
+                    infos[name] = user_info
+            self._enqueue_refresh(missing)
+        
+        stats.update(requested=len(usernames), cache_hits=len(usernames) - len(missing),
+                     purged=purged, duration=time.time() - start_time)
+        self._record_stats(stats)
+        
+        if missing:
+            logger.info(f"AD-Batch: {len(usernames)} Benutzer, {stats['cache_hits']} aus Cache, "
+                        f"{stats['found']} gefunden, {stats['not_found']} nicht gefunden, "
+                        f"{stats['failed']} fehlgeschlagen ({stats['stale']} aus abgelaufenem Cache), "
+                        f"{stats['pending']} ausstehend, {stats['ldap_searches']} LDAP-Suchen, "
+                        f"{purged} Cache-Einträge entfernt, {stats['duration']:.3f}s")
+        
+        return {name: self._to_user_info(name, info) for name, info in infos.items()}
+    
+    def _lookup_directory(self, usernames: List[str]) -> Dict[str, UserInfo]:
+        """Abfrage gegen das vorab geladene Verzeichnis - reine Dictionary-Zugriffe, kein LDAP"""
+        start_time = time.time()
+        infos = {}
+        hits = 0
+        for name in usernames:
+            user_info = self.directory_index.get(name)
+            if user_info is None:
+                user_info = {}
+            else:
+                hits += 1
+            infos[name] = self._to_user_info(name, user_info)
+        self._record_stats({
+            'requested': len(usernames), 'cache_hits': hits, 'not_found': len(usernames) - hits,
+            'duration': time.time() - start_time
+        })
+        return infos
+    
+    def load_directory(self, full: bool = True) -> int:
+        """
+        Lädt alle Benutzerkonten per Paged Search in den Index (full=True) oder
+        nur die seit dem letzten Abgleich geänderten (uSNChanged > High-Water-Mark).
+        Gibt die Anzahl geladener Benutzer zurück.
+        
+        uSNChanged-Werte gelten nur auf einem Domain Controller. Der Abgleich
+        liest deshalb zuerst dnsHostName und highestCommittedUSN aus dem rootDSE
+        derselben Verbindung; hat der Pool einen anderen DC erreicht (oder ist
+        dessen USN kleiner als die High-Water-Mark), wird vollständig geladen.
+        """
+        index = self.directory_index
+        start_time = time.time()
+        
+        def sync(connection):
+            dc_name, committed_usn = self._read_dc_state(connection)
+            incremental = (not full and index.loaded and dc_name is not None
+                           and index.server == dc_name
+                           and (committed_usn is None or committed_usn >= index.high_water_mark))
+            search_filter = USER_FILTER
+            if incremental:
+                search_filter = f"{USER_FILTER[:-1]}(uSNChanged>={index.high_water_mark + 1}))"
+            return dc_name, incremental, self._search_pages(connection, search_filter, DIRECTORY_ATTRIBUTES)
+        
+        dc_name, incremental, entries = self.pool.run(sync)
+        if not full and not incremental and index.loaded:
+            logger.info(f"AD-Abgleich über {dc_name or 'unbekannten DC'} statt {index.server} - lade vollständig")
+        records = [
+            ([str(getattr(entry, 'sAMAccountName', None) or ''), self._upn_prefix(entry)],
+             self._extract_user_info(entry),
+             int(str(getattr(entry, 'uSNChanged', None) or 0)))
+            for entry in entries
+        ]
+        
+        if incremental:
+            count = index.update(records)
+        else:
+            count = index.replace(records, server=dc_name)
+        
+        mode = 'incremental' if incremental else 'full'
+        duration = time.time() - start_time
+        with self._stats_lock:
+            self.directory_syncs[mode] += 1
+            self.last_directory_sync = {'mode': mode, 'users': len(records), 'duration': duration}
+        logger.info(f"AD-Verzeichnis {'abgeglichen' if incremental else 'geladen'}: {len(records)} Benutzer, "
+                    f"{len(index)} im Index, uSNChanged bis {index.high_water_mark}, {duration:.2f}s")
+        return len(records)
+    
+    def _read_dc_state(self, connection) -> Tuple[Optional[str], Optional[int]]:
+        """dnsHostName und highestCommittedUSN des DCs hinter dieser Verbindung (rootDSE)"""
+        with self._stats_lock:
+            self.ldap_operations += 1
+        try:
+            if not connection.search(search_base="", search_filter="(objectClass=*)", search_scope="BASE",
+                                     attributes=['dnsHostName', 'highestCommittedUSN']) or not connection.entries:
+                return None, None
+        except Exception as e:
+            logger.debug(f"rootDSE-Abfrage für den AD-Abgleich fehlgeschlagen: {e}")
+            return None, None
+        entry = connection.entries[0]
+        dc_name = getattr(entry, 'dnsHostName', None)
+        committed_usn = getattr(entry, 'highestCommittedUSN', None)
+        return (str(dc_name).lower() if dc_name else None,
+                int(str(committed_usn)) if committed_usn else None)
+    
+    def sync_directory_if_due(self, now: Optional[float] = None) -> Optional[str]:
+        """Startet fälliges vollständiges Laden oder inkrementellen Abgleich; liefert den Modus"""
+        index = self.directory_index
+        if index is None or not self.enabled:
+            return None
+        now = time.time() if now is None else now
+        if not index.loaded or now - index.loaded_at >= self.preload_full_interval:
+            self.load_directory(full=True)
+            return 'full'
+        if now - index.synced_at >= self.preload_sync_interval:
+            self.load_directory(full=False)
+            return self.last_directory_sync['mode']
+        return None
+    
+    def _search_pages(self, connection, search_filter: str, attributes: List[str]) -> List:
+        """Paged Search über die Suchbasis; alle Seiten laufen auf derselben Verbindung"""
+        entries = []
+        cookie = None
+        while True:
+            with self._stats_lock:
+                self.ldap_operations += 1
+            if not connection.search(
+                search_base=self.search_base or self._domain_base(),
+                search_filter=search_filter,
+                search_scope=SUBTREE,
+                attributes=attributes,
+                paged_size=self.preload_page_size,
+                paged_cookie=cookie
+            ) and getattr(connection, 'closed', False):
+                raise ConnectionError(f"LDAP-Verbindung getrennt: {connection.last_error}")
+            entries.extend(connection.entries)
+            controls = (getattr(connection, 'result', None) or {}).get('controls') or {}
+            cookie = controls.get(PAGED_RESULTS_OID, {}).get('value', {}).get('cookie')
+            if not cookie:
+                return entries
+    
+    @staticmethod
+    def _upn_prefix(entry) -> str:
+        """Teil des userPrincipalName vor dem @ (zusätzlicher Schlüssel im Index)"""
+        upn = getattr(entry, 'userPrincipalName', None)
+        return str(upn).split('@', 1)[0] if upn else ''
+    
+    def _resolve(self, missing: List[str]) -> Tuple[Dict[str, Dict], Dict[str, int]]:
+        """Sucht Benutzer im AD, aktualisiert den Cache und liefert ({username: info}, Zähler)"""
+        found, searches, failed = self._search_users_batch(missing)
+        
+        # Cache aktualisieren - auch nicht gefundene Benutzer, damit sie nicht jeden Zyklus erneut gesucht werden
+        infos = {}
+        stale = 0
+        for name in missing:
+            if name in failed:
+                # AD nicht erreichbar: abgelaufenen Eintrag weiter verwenden, nichts cachen
+                user_info = self.user_cache.get_stale(name) or {}
+                stale += bool(user_info)
+            else:
+                user_info = found.get(name, {})
+                self.user_cache.put(name, user_info)
+            infos[name] = user_info
+        
+        # Änderungen gebündelt persistieren
+        self.user_cache.flush()
+        
+        return infos, {
+            'found': len(found),
+            'not_found': len(missing) - len(found) - len(failed),
+            'failed': len(failed),
+            'stale': stale,
+            'ldap_searches': searches,
+            'pending': 0
         }
+    
+    def _record_stats(self, stats: Dict[str, float]):
+        """Übernimmt die Zähler einer Abfrage in die Gesamtstatistik"""
+        with self._stats_lock:
+            self.last_batch_stats = stats
+            for key in self.batch_stats_total:
+                self.batch_stats_total[key] += stats.get(key, 0)
+    
+    def _note_requested(self, usernames: List[str], now: float):
+        """Merkt sich, wann Benutzer zuletzt angefragt wurden - nur diese werden vorab erneuert"""
+        with self._refresh_lock:
+            for name in usernames:
+                self._requested[name] = now
+    
+    def _enqueue_refresh(self, usernames: Iterable[str]):
+        """Reiht Benutzer für die Hintergrund-Suche ein und weckt den Refresher"""
+        with self._refresh_lock:
+            before = len(self._refresh_queue)
+            self._refresh_queue.update(usernames)
+            added = len(self._refresh_queue) > before
+        if added:
+            self._refresh_wakeup.set()
+    
+    def _expiring_soon(self, now: float) -> List[str]:
+        """
+        Angefragte Benutzer, deren Eintrag im letzten `refresh_ahead_ratio`-Anteil
+        der TTL liegt. Benutzer, die länger als eine TTL nicht angefragt wurden,
+        werden nicht mehr erneuert und laufen normal ab.
+        """
+        due = []
+        with self._refresh_lock:
+            for name, requested_at in list(self._requested.items()):
+                if now - requested_at > self.cache_timeout:
+                    del self._requested[name]
+                    continue
+                entry = self.user_cache.get_entry(name)
+                if entry is None:
+                    continue
+                ttl = entry.expires_at - entry.stored_at
+                if entry.expires_at - now <= ttl * self.refresh_ahead_ratio:
+                    due.append(name)
+        return due
+    
+    def refresh_pending(self) -> int:
+        """
+        Löst eingereihte Benutzer auf und erneuert bald ablaufende Einträge.
+        Wird vom Refresher-Thread aufgerufen; gibt die Anzahl gesuchter Benutzer zurück.
+        """
+        now = time.time()
+        with self._refresh_lock:
+            queued = list(self._refresh_queue)
+            self._refresh_queue.clear()
+        names = list(dict.fromkeys(queued + self._expiring_soon(now)))
+        if not names:
+            return 0
         
+        _, stats = self._resolve(names)
+        stats.update(requested=len(names), cache_hits=0, purged=0, duration=time.time() - now)
+        self._record_stats(stats)
+        with self._stats_lock:
+            self.refreshed_users += len(names)
+        logger.debug(f"AD-Refresh: {len(queued)} neue, {len(names) - len(queued)} bald ablaufende Benutzer "
+                     f"in {stats['duration']:.3f}s")
+        return len(names)
+    
+    def start_refresher(self, interval: float = 5.0):
+        """Startet den Hintergrund-Refresher; ab dann wartet get_users_info nie auf das AD"""
+        if not self.enabled or self.refresher_running():
+            return
+        self._refresh_stop.clear()
+        if self.directory_index is not None:
+            # Verzeichnis sofort laden, nicht erst nach dem ersten Intervall
+            self._refresh_wakeup.set()
+        self._refresh_thread = threading.Thread(
+            target=self._refresh_loop, args=(interval,), name='ad-refresher', daemon=True
+        )
+        self._refresh_thread.start()
+        logger.info(f"AD-Refresher gestartet (Intervall {interval}s)")
+    
+    def stop_refresher(self, timeout: Optional[float] = None):
+        """Beendet den Hintergrund-Refresher"""
+        self._refresh_stop.set()
+        self._refresh_wakeup.set()
+        if self._refresh_thread:
+            self._refresh_thread.join(timeout)
+            self._refresh_thread = None
+    
+    def refresh_queue_size(self) -> int:
+        """Anzahl der Benutzer, die auf den Refresher warten"""
+        return len(self._refresh_queue)
+    
+    def refresher_running(self) -> bool:
+        """Läuft der Hintergrund-Refresher?"""
+        return self._refresh_thread is not None and self._refresh_thread.is_alive()
+    
+    def _refresh_loop(self, interval: float):
+        """Refresher: wacht bei neuen Benutzern sofort auf, sonst alle `interval` Sekunden"""
+        while not self._refresh_stop.is_set():
+            self._refresh_wakeup.wait(interval)
+            self._refresh_wakeup.clear()
+            if self._refresh_stop.is_set():
+                break
+            try:
+                self.sync_directory_if_due()
+            except Exception as e:
+                logger.warning(f"AD-Verzeichnisabgleich fehlgeschlagen: {e}")
+            try:
+                self.refresh_pending()
+            except Exception as e:
+                logger.warning(f"AD-Refresh fehlgeschlagen: {e}")
+    
+    @staticmethod
+    def _to_user_info(username: str, info: Dict) -> UserInfo:
+        """Baut ein UserInfo-Objekt aus einem Cache-/Suchergebnis"""
         return UserInfo(
             username=username,
-            full_name=user_info.get('full_name', ''),
-            location=user_info.get('location', 'Unknown'),
-            department=user_info.get('department', ''),
-            office=user_info.get('office', ''),
-            city=user_info.get('city', ''),
-            country=user_info.get('country', '')
+            full_name=info.get('full_name', ''),
+            location=info.get('location', 'Unknown'),
+            department=info.get('department', ''),
+            office=info.get('office', ''),
+            city=info.get('city', ''),
+            country=info.get('country', '')
         )
     
     def clear_cache(self):
         """Leert den Benutzer-Cache"""
         self.user_cache.clear()
+        self.user_cache.flush()
         logger.info("Benutzer-Cache geleert")
     
+    def close(self):
+        """Beendet den Refresher, schreibt den Cache weg und trennt alle LDAP-Verbindungen"""
+        self.stop_refresher(timeout=5)
+        self.user_cache.flush()
+        if self.pool:
+            self.pool.close()
+    
     def is_enabled(self) -> bool:
         """Prüft ob AD-Integration verfügbar ist"""
         return self.enabled
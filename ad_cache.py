@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Cache für Active Directory Benutzerinformationen
+Begrenzter, thread-sicherer LRU-Cache mit getrennten TTLs für Treffer
+und nicht gefundene Benutzer (Negative Caching). Optional werden die
+Einträge gebündelt in einer lokalen SQLite-Datei persistiert, damit der
+Cache nach einem Neustart sofort wieder warm ist.
+"""
+
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry(NamedTuple):
+    """Ein Cache-Eintrag; `negative` markiert Benutzer, die nicht im AD gefunden wurden"""
+    value: Dict
+    stored_at: float
+    expires_at: float
+    negative: bool
+
+
+class SqliteCacheStore:
+    """
+    Persistente Ablage der Cache-Einträge in SQLite.
+    Einträge werden mit ihrem ursprünglichen Zeitstempel gespeichert und
+    in einer Transaktion pro Batch geschrieben.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS user_cache ("
+                "username TEXT PRIMARY KEY, info TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+
+    def load(self, min_stored_at: float = 0) -> List[Tuple[str, Dict, float]]:
+        """Lädt alle Einträge, die nicht älter als `min_stored_at` sind"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT username, info, stored_at FROM user_cache WHERE stored_at >= ? ORDER BY stored_at",
+                (min_stored_at,)
+            ).fetchall()
+        return [(username, json.loads(info), stored_at) for username, info, stored_at in rows]
+
+    def write_batch(self, upserts: Iterable[Tuple[str, Dict, float]], deletes: Iterable[str] = (),
+                    min_stored_at: Optional[float] = None):
+        """Schreibt geänderte und entfernt gelöschte Einträge in einer Transaktion"""
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO user_cache (username, info, stored_at) VALUES (?, ?, ?)",
+                [(username, json.dumps(info), stored_at) for username, info, stored_at in upserts]
+            )
+            self._connection.executemany(
+                "DELETE FROM user_cache WHERE username = ?", [(username,) for username in deletes]
+            )
+            if min_stored_at is not None:
+                self._connection.execute("DELETE FROM user_cache WHERE stored_at < ?", (min_stored_at,))
+
+    def close(self):
+        """Schließt die Datenbank"""
+        with self._lock:
+            self._connection.close()
+
+
+class UserInfoCache:
+    """
+    LRU+TTL-Cache für AD-Benutzerinformationen.
+
+    Lesen kommt ohne Lock aus: Einträge sind unveränderliche Tupel, die nur
+    als Ganzes ersetzt werden. Die LRU-Reihenfolge wird beim Lesen nur
+    aktualisiert, wenn der Lock gerade frei ist - ein Leser wartet nie.
+    Schreiben, Verdrängen und Aufräumen laufen unter dem Lock.
+    Die Statistik-Zähler werden ohne Lock geführt und sind unter hoher
+    Parallelität daher nur näherungsweise exakt.
+
+    Abgelaufene Einträge bleiben noch `max_stale` Sekunden erhalten und
+    können über get_stale() als Rückfall genutzt werden, falls das AD nicht
+    erreichbar ist. Mit einem `store` werden Änderungen vorgemerkt und
+    erst bei flush() gebündelt geschrieben.
+    """
+
+    def __init__(self, max_entries: int = 10000, positive_ttl: float = 300,
+                 negative_ttl: float = 60, max_stale: float = 0,
+                 store: Optional[SqliteCacheStore] = None,
+                 clock: Callable[[], float] = time.time):
+        self.max_entries = max(1, max_entries)
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.max_stale = max_stale
+        self.store = store
+        self._clock = clock
+        self._entries: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self._deleted = set()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        if self.store is not None:
+            self.load_from_store()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Liefert den gecachten Wert oder None bei fehlendem/abgelaufenem Eintrag.
+        Für nicht gefundene Benutzer wird ein leeres Dict geliefert.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= self._clock():
+            self.misses += 1
+            return None
+
+        if self._lock.acquire(blocking=False):
+            try:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+            finally:
+                self._lock.release()
+
+        if entry.negative:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return entry.value
+
+    def get_stale(self, key: str) -> Optional[Dict]:
+        """Liefert einen positiven Eintrag auch nach Ablauf der TTL (Rückfall bei AD-Ausfall)"""
+        entry = self._entries.get(key)
+        if entry is None or entry.negative:
+            return None
+        return entry.value
+
+    def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """Liefert den Eintrag inkl. Zeitstempel, auch wenn er abgelaufen ist (ohne Statistik)"""
+        return self._entries.get(key)
+
+    def put(self, key: str, value: Dict, stored_at: Optional[float] = None):
+        """Speichert einen Wert; ein leeres Dict wird als negativer Eintrag gecacht"""
+        self._put(key, value, self._clock() if stored_at is None else stored_at, persist=True)
+
+    def _put(self, key: str, value: Dict, stored_at: float, persist: bool):
+        negative = not value
+        ttl = self.negative_ttl if negative else self.positive_ttl
+        entry = CacheEntry(value=value, stored_at=stored_at, expires_at=stored_at + ttl, negative=negative)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if persist and self.store is not None:
+                self._dirty.add(key)
+                self._deleted.discard(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._forget(evicted)
+                self.evictions += 1
+
+    def _forget(self, key: str):
+        """Merkt einen entfernten Eintrag zum Löschen im Store vor (Lock muss gehalten werden)"""
+        if self.store is not None:
+            self._dirty.discard(key)
+            self._deleted.add(key)
+
+    def purge_expired(self) -> int:
+        """Entfernt alle Einträge, die länger als `max_stale` abgelaufen sind, und gibt deren Anzahl zurück"""
+        limit = self._clock() - self.max_stale
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if entry.expires_at <= limit]
+            for key in expired:
+                del self._entries[key]
+                self._forget(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def clear(self):
+        """Leert den Cache"""
+        with self._lock:
+            for key in self._entries:
+                self._forget(key)
+            self._entries.clear()
+
+    def load_from_store(self) -> int:
+        """Lädt persistierte Einträge mit ihren ursprünglichen Zeitstempeln"""
+        # Einträge, die selbst als Rückfall zu alt wären, gar nicht erst laden
+        min_stored_at = self._clock() - max(self.positive_ttl, self.negative_ttl) - self.max_stale
+        try:
+            rows = self.store.load(min_stored_at)
+        except Exception as e:
+            logger.warning(f"AD-Cache konnte nicht aus {self.store.path} geladen werden: {e}")
+            return 0
+        for key, value, stored_at in rows:
+            self._put(key, value, stored_at, persist=False)
+        logger.info(f"AD-Cache: {len(rows)} Einträge aus {self.store.path} geladen")
+        return len(rows)
+
+    def flush(self) -> int:
+        """Schreibt alle vorgemerkten Änderungen gebündelt in den Store"""
+        if self.store is None:
+            return 0
+        with self._lock:
+            upserts = [(key, self._entries[key].value, self._entries[key].stored_at)
+                       for key in self._dirty if key in self._entries]
+            deletes = list(self._deleted)
+            self._dirty.clear()
+            self._deleted.clear()
+        if not upserts and not deletes:
+            return 0
+        min_stored_at = self._clock() - max(self.positive_ttl, self.negative_ttl) - self.max_stale
+        try:
+            self.store.write_batch(upserts, deletes, min_stored_at=min_stored_at)
+        except Exception as e:
+            logger.warning(f"AD-Cache konnte nicht nach {self.store.path} geschrieben werden: {e}")
+            # Änderungen für den nächsten Versuch erneut vormerken
+            with self._lock:
+                self._dirty.update(key for key, _, _ in upserts if key in self._entries)
+                self._deleted.update(key for key in deletes if key not in self._entries)
+            return 0
+        logger.debug(f"AD-Cache: {len(upserts)} Einträge geschrieben, {len(deletes)} gelöscht")
+        return len(upserts) + len(deletes)
+
+    def stats(self) -> Dict[str, int]:
+        """Zählerstände für die Prometheus-Metriken"""
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Vorab geladenes Verzeichnis der AD-Benutzer
+Kompakter In-Memory-Index über alle Benutzerkonten, damit Abfragen im
+Poll-Zyklus reine Dictionary-Zugriffe sind. Der Index wird einmal komplett
+geladen und danach inkrementell über uSNChanged aktualisiert.
+"""
+
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Reihenfolge der Felder im kompakten Tupel
+INDEX_FIELDS = ('full_name', 'location', 'department', 'office', 'city', 'state', 'country')
+
+
+class DirectoryIndex:
+    """
+    Index sAMAccountName -> Benutzerinformationen.
+
+    Pro Benutzer wird nur ein Tupel mit internierten Strings gehalten -
+    Standorte und Abteilungen wiederholen sich stark, so bleiben auch
+    große Verzeichnisse klein. Ein vollständiges Laden ersetzt das Dict
+    als Ganzes, inkrementelle Änderungen werden einzeln eingetragen;
+    Leser brauchen in beiden Fällen keinen Lock.
+
+    Die uSNChanged-Werte sind pro Domain Controller vergeben - die
+    High-Water-Mark gilt daher nur für den Server, von dem geladen wurde.
+    Gelöschte Konten erscheinen nicht in der inkrementellen Abfrage und
+    verschwinden erst beim nächsten vollständigen Laden.
+    """
+
+    def __init__(self):
+        self._users: Dict[str, Tuple[str, ...]] = {}
+        self.high_water_mark = 0
+        self.server: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+        self.synced_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def __contains__(self, username: str) -> bool:
+        return username.lower() in self._users
+
+    @property
+    def loaded(self) -> bool:
+        """Wurde der Index mindestens einmal vollständig geladen?"""
+        return self.loaded_at is not None
+
+    def get(self, username: str) -> Optional[Dict]:
+        """Benutzerinformationen wie von _extract_user_info, None für unbekannte Benutzer"""
+        record = self._users.get(username.lower())
+        if record is None:
+            return None
+        return {field: value for field, value in zip(INDEX_FIELDS, record) if value}
+
+    def replace(self, records: Iterable[Tuple[List[str], Dict, int]], server: Optional[str] = None,
+                now: Optional[float] = None) -> int:
+        """Ersetzt den Index durch ein vollständiges Laden; gibt die Anzahl Benutzer zurück"""
+        users: Dict[str, Tuple[str, ...]] = {}
+        high_water_mark = self._fill(users, records, 0)
+        self._users = users
+        self.high_water_mark = high_water_mark
+        self.server = server
+        self.loaded_at = self.synced_at = time.time() if now is None else now
+        return len(users)
+
+    def update(self, records: Iterable[Tuple[List[str], Dict, int]], now: Optional[float] = None) -> int:
+        """Trägt geänderte Benutzer ein; gibt die Anzahl geänderter Einträge zurück"""
+        before = self.high_water_mark
+        changed: Dict[str, Tuple[str, ...]] = {}
+        self.high_water_mark = self._fill(changed, records, before)
+        self._users.update(changed)
+        self.synced_at = time.time() if now is None else now
+        return len(changed)
+
+    @staticmethod
+    def _fill(target: Dict[str, Tuple[str, ...]], records: Iterable[Tuple[List[str], Dict, int]],
+              high_water_mark: int) -> int:
+        """Schreibt Datensätze kompakt in `target` und liefert die höchste uSNChanged"""
+        intern = sys.intern
+        for keys, info, usn in records:
+            record = tuple(intern(str(info.get(field) or '')) for field in INDEX_FIELDS)
+            for key in keys:
+                if key:
+                    target[key.lower()] = record
+            high_water_mark = max(high_water_mark, usn)
+        return high_water_mark
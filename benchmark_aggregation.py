@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark für die Aggregation der Checkout-Zähler
+Vergleicht die Aggregation in einem Durchlauf mit Tupel-Schlüsseln
+(collection_engine.summarize_checkouts) mit der bisherigen Implementierung
+aus build_snapshot (zwei Durchläufe, String-Schlüssel und rsplit).
+Gemessen werden Laufzeit und Spitzen-Speicher pro 10.000 Checkouts.
+
+Aufruf: python benchmark_aggregation.py [--sizes 1000 10000 100000] [--repeat 5]
+"""
+
+import gc
+import sys
+import time
+import argparse
+import tracemalloc
+from typing import Dict, List, Tuple
+
+sys.path.append('.')
+
+from lmstat_parser import parse_lmstat
+from collection_engine import UserCheckout, summarize_checkouts
+from benchmark_parser import generate_lmstat_output
+
+LOCATIONS = ('Stuttgart', 'Berlin', 'Hamburg', 'München', 'Unknown')
+DEPARTMENTS = ('Konstruktion', 'Simulation', 'Fertigung')
+
+
+def enrich(data: Dict) -> Dict[Tuple[str, str], Tuple[str, str]]:
+    """Feste Standorte/Abteilungen wie sie die Anreicherungs-Pipeline liefern würde"""
+    return {
+        (user['username'], user['hostname']): (LOCATIONS[n % len(LOCATIONS)], DEPARTMENTS[n % len(DEPARTMENTS)])
+        for n, user in enumerate(data['users'])
+    }
+
+
+def aggregate_legacy(data: Dict, enriched: Dict) -> Tuple:
+    """Bisherige Implementierung aus FlexLMExporter.build_snapshot als Referenz"""
+    users: List[UserCheckout] = []
+    location_counts = {}
+    for feature in data['features']:
+        for user in feature['users']:
+            location, department = enriched[(user['username'], user['hostname'])]
+            users.append(UserCheckout(
+                feature=feature['name'],
+                vendor='solidworks',
+                username=user['username'],
+                hostname=user['hostname'],
+                display=user['display'],
+                location=location,
+                department=department
+            ))
+            location_key = f"{location}_{feature['name']}"
+            if location_key in location_counts:
+                location_counts[location_key] += 1
+            else:
+                location_counts[location_key] = 1
+
+    host_counts = {}
+    location_user_counts = {}
+    for user in users:
+        host_key = f"{user.hostname}_{user.location}"
+        if host_key in host_counts:
+            host_counts[host_key] += 1
+        else:
+            host_counts[host_key] = 1
+        if user.location in location_user_counts:
+            location_user_counts[user.location].add(user.username)
+        else:
+            location_user_counts[user.location] = {user.username}
+
+    return (
+        tuple(users),
+        tuple((*key.rsplit('_', 1), count) for key, count in location_counts.items()),
+        tuple((*key.rsplit('_', 1), count) for key, count in host_counts.items()),
+        tuple((location, len(names)) for location, names in location_user_counts.items())
+    )
+
+
+def aggregate_single_pass(data: Dict, enriched: Dict) -> Tuple:
+    """Aktuelle Implementierung (wie in build_snapshot)"""
+    summary = summarize_checkouts(
+        UserCheckout(feature['name'], 'solidworks', user['username'], user['hostname'], user['display'],
+                     *enriched[(user['username'], user['hostname'])])
+        for feature in data['features']
+        for user in feature['users']
+    )
+    return summary.users, summary.location_licenses, summary.host_licenses, summary.location_users
+
+
+def measure(func, data: Dict, enriched: Dict, repeat: int) -> Tuple[float, int]:
+    """Beste Laufzeit aus `repeat` Durchläufen in Sekunden und Spitzen-Speicher in Bytes"""
+    best = float('inf')
+    for _ in range(repeat):
+        # Wie timeit ohne Garbage Collector messen, sonst dominieren zufällige GC-Läufe
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            func(data, enriched)
+            best = min(best, time.perf_counter() - start)
+        finally:
+            gc.enable()
+
+    tracemalloc.start()
+    func(data, enriched)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    """Führt den Benchmark aus und gibt eine Vergleichstabelle aus"""
+    parser = argparse.ArgumentParser(description='Benchmark Checkout-Aggregation (Tupel-Schlüssel vs. bisherige Implementierung)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Anzahl der Checkouts je Testlauf (default: 1000 10000 100000)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Wiederholungen pro Messung, gewertet wird die beste (default: 5)')
+    args = parser.parse_args()
+
+    print("Checkout-Aggregation Benchmark (Werte pro 10.000 Checkouts)")
+    print("=" * 78)
+    print(f"{'Checkouts':>10} {'bisher [ms]':>12} {'bisher [KiB]':>13} "
+          f"{'1 Pass [ms]':>12} {'1 Pass [KiB]':>13} {'Faktor':>9}")
+    print("-" * 78)
+
+    wrong_series = 0
+    for size in args.sizes:
+        data = parse_lmstat(generate_lmstat_output(size, idle_features=0))
+        enriched = enrich(data)
+
+        # Checkouts und Benutzer pro Standort müssen übereinstimmen; die Standort-/Feature-
+        # Zähler der bisherigen Variante sind bei Unterstrichen im Feature-Namen falsch
+        legacy_result = aggregate_legacy(data, enriched)
+        single_result = aggregate_single_pass(data, enriched)
+        if legacy_result[0] != single_result[0] or sorted(legacy_result[3]) != sorted(single_result[3]):
+            print(f"✗ Ergebnisse für {size} Checkouts weichen ab!")
+            sys.exit(1)
+        wrong_series += len(set(legacy_result[1]) - set(single_result[1]))
+
+        scale = 10000 / size
+        legacy_time, legacy_peak = measure(aggregate_legacy, data, enriched, args.repeat)
+        single_time, single_peak = measure(aggregate_single_pass, data, enriched, args.repeat)
+        print(f"{size:>10} {legacy_time * 1000 * scale:>12.3f} {legacy_peak / 1024 * scale:>13.1f} "
+              f"{single_time * 1000 * scale:>12.3f} {single_peak / 1024 * scale:>13.1f} "
+              f"{legacy_time / single_time:>8.1f}x")
+
+    print("=" * 78)
+    # Features heißen FEATURE_0001 usw. - rsplit('_', 1) trennt am Unterstrich im Feature-Namen
+    print(f"Falsche Standort/Feature-Serien der bisherigen Implementierung: {wrong_series}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Benchmark für den lmstat Parser
+Vergleicht den Single-Pass Parser (lmstat_parser.parse_lmstat) mit der
+bisherigen zeilenweisen Implementierung auf synthetischen lmstat-Ausgaben.
+
+Zusätzlich wird Ausgabegröße und Parse-Zeit von `lmstat -a` und `lmstat -A`
+(nur Features in Benutzung) auf einem Server mit vielen ruhenden Features verglichen.
+
+Aufruf: python benchmark_parser.py [--sizes 10 1000 100000] [--repeat 5] [--idle-features 2000]
+"""
+
+import re
+import sys
+import time
+import argparse
+from typing import Dict
+
+sys.path.append('.')
+
+from lmstat_parser import parse_lmstat
+
+
+def parse_lmstat_legacy(output: str) -> Dict:
+    """Bisherige Implementierung (FlexLMExporter.parse_lmstat_output) als Referenz"""
+    data = {
+        'server_status': False,
+        'daemons': [],
+        'features': [],
+        'users': []
+    }
+
+    lines = output.split('\n')
+    current_feature = None
+    in_users_section = False
+
+    for line in lines:
+        original_line = line
+        line = line.strip()
+
+        if 'license server UP' in line:
+            data['server_status'] = True
+        elif 'Cannot connect to license server' in line:
+            data['server_status'] = False
+
+        daemon_match = re.search(r'(\w+): UP v([0-9.]+)', line)
+        if daemon_match:
+            data['daemons'].append({
+                'name': daemon_match.group(1),
+                'status': 'UP',
+                'version': daemon_match.group(2)
+            })
+
+        feature_match = re.search(r'Users of (\w+):\s+\(Total of (\d+) license[s]? issued;\s+Total of (\d+) license[s]? in use\)', line)
+        if feature_match:
+            total_licenses = int(feature_match.group(2))
+            used_licenses = int(feature_match.group(3))
+            current_feature = {
+                'name': feature_match.group(1),
+                'total': total_licenses,
+                'used': used_licenses,
+                'available': total_licenses - used_licenses,
+                'users': []
+            }
+            data['features'].append(current_feature)
+            in_users_section = True
+            continue
+
+        if line.startswith('Users of ') and current_feature:
+            in_users_section = False
+            current_feature = None
+
+        if in_users_section and current_feature:
+            user_match = re.search(r'^\s+(\S+)\s+(\S+)\s+(\S+)\s+\([^)]+\)\s+\([^)]+\s+\d+\)', original_line)
+            if user_match:
+                user_info = {
+                    'username': user_match.group(1),
+                    'hostname': user_match.group(2),
+                    'display': user_match.group(3),
+                    'feature': current_feature['name']
+                }
+                current_feature['users'].append(user_info)
+                data['users'].append(user_info)
+                continue
+
+    return data
+
+
+def generate_lmstat_output(user_count: int, users_per_feature: int = 50, idle_features: int = 20,
+                           idle_detail: bool = False) -> str:
+    """
+    Erzeugt eine synthetische lmstat -a Ausgabe mit `user_count` Benutzer-Zeilen.
+    Mit `idle_features=0` entspricht sie `lmstat -A`; `idle_detail` gibt zu
+    ruhenden Features wie manche lmgrd-Versionen die Versions-Zeilen mit aus.
+    """
+    lines = [
+        "lmutil - Copyright (c) 1989-2022 Flexera. All Rights Reserved.",
+        "Flexible License Manager status on Wed 8/4/2025 14:30",
+        "",
+        "License server status: 27000@lic-bench",
+        "    License file(s) on lic-bench: C:\\Licenses\\sw_d.lic:",
+        "",
+        "lic-bench: license server UP (MASTER) v11.18.1",
+        "",
+        "Vendor daemon status (on lic-bench):",
+        "",
+        "SolidWorksNetworkLicense: UP v11.18.1",
+        "",
+        "Feature usage info:",
+        "",
+    ]
+
+    feature_count = max(1, -(-user_count // users_per_feature))
+    remaining = user_count
+    for f in range(feature_count):
+        in_use = min(users_per_feature, remaining)
+        remaining -= in_use
+        name = f"FEATURE_{f:04d}"
+        lines += [
+            f"Users of {name}:  (Total of {in_use + 5} licenses issued;  Total of {in_use} licenses in use)",
+            "",
+            f'  "{name}" v2023.0400, vendor: SolidWorksNetworkLicense, expiry: 31-dec-2025',
+            "  floating license",
+            "",
+        ]
+        for u in range(in_use):
+            n = f * users_per_feature + u
+            lines.append(
+                f"    user{n:06d} WS-{n % 997:04d} WS-{n % 997:04d} (v2023.0400) "
+                f"(lic-bench/27000 {1000 + n}), start Wed 8/4 14:25"
+            )
+        lines.append("")
+
+    # Features ohne Benutzer, wie sie lmstat -a ebenfalls ausgibt
+    for f in range(idle_features):
+        lines += [
+            f"Users of IDLE_{f:04d}:  (Total of 5 licenses issued;  Total of 0 licenses in use)",
+            "",
+        ]
+        if idle_detail:
+            lines += [
+                f'  "IDLE_{f:04d}" v2023.0400, vendor: SolidWorksNetworkLicense, expiry: 31-dec-2025',
+                "  floating license",
+                "",
+            ]
+
+    return "\n".join(lines) + "\n"
+
+
+def benchmark(func, output: str, repeat: int) -> float:
+    """Beste Laufzeit aus `repeat` Durchläufen in Sekunden"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(output)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """Führt den Benchmark aus und gibt eine Vergleichstabelle aus"""
+    parser = argparse.ArgumentParser(description='Benchmark lmstat Parser (Single-Pass vs. bisherige Implementierung)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 100000],
+                        help='Anzahl der Benutzer-Zeilen je Testlauf (default: 10 1000 100000)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Wiederholungen pro Messung, gewertet wird die beste (default: 5)')
+    parser.add_argument('--idle-features', type=int, default=2000,
+                        help='Ruhende Features für den Vergleich lmstat -a / -A (default: 2000)')
+    args = parser.parse_args()
+
+    print("lmstat Parser Benchmark")
+    print("=" * 72)
+    print(f"{'Benutzer':>10} {'Bytes':>12} {'bisher [ms]':>14} {'single-pass [ms]':>18} {'Faktor':>10}")
+    print("-" * 72)
+
+    for size in args.sizes:
+        output = generate_lmstat_output(size)
+
+        # Beide Parser müssen identische Ergebnisse liefern
+        data = parse_lmstat(output)
+        for feature in data['features']:
+            del feature['vendor']  # kennt die bisherige Implementierung nicht
+        if data != parse_lmstat_legacy(output):
+            print(f"✗ Ergebnisse für {size} Benutzer weichen ab!")
+            sys.exit(1)
+
+        legacy = benchmark(parse_lmstat_legacy, output, args.repeat)
+        single_pass = benchmark(parse_lmstat, output, args.repeat)
+        print(f"{size:>10} {len(output):>12} {legacy * 1000:>14.3f} {single_pass * 1000:>18.3f} "
+              f"{legacy / single_pass:>9.1f}x")
+
+    print("=" * 72)
+    print()
+    print(f"lmstat -a vs. -A ({args.idle_features} ruhende Features)")
+    print("=" * 72)
+    print(f"{'Benutzer':>10} {'Bytes -a':>12} {'Bytes -A':>12} {'-a [ms]':>10} {'-A [ms]':>10} {'Faktor':>10}")
+    print("-" * 72)
+    for size in args.sizes:
+        full = generate_lmstat_output(size, idle_features=args.idle_features, idle_detail=True)
+        active = generate_lmstat_output(size, idle_features=0)
+        full_time = benchmark(parse_lmstat, full, args.repeat)
+        active_time = benchmark(parse_lmstat, active, args.repeat)
+        print(f"{size:>10} {len(full):>12} {len(active):>12} {full_time * 1000:>10.3f} "
+              f"{active_time * 1000:>10.3f} {len(full) / len(active):>9.1f}x")
+    print("=" * 72)
+
+
+if __name__ == '__main__':
+    main()
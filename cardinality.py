@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Kardinalitäts-Budget für Metriken mit Benutzer- und Host-Labels
+Begrenzt die Anzahl der Serien pro Metrik-Familie: nur die Top-N Benutzer,
+Hosts oder Standorte nach Lizenzanzahl behalten ihre Labels, alle übrigen
+werden zu einem Eintrag "other" zusammengefasst. Zusätzlich können einzelne
+Labels ganz entfallen (z.B. `display`); Serien, die sich danach gleichen,
+werden addiert.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+OTHER = "other"
+
+# Metrik -> (Label für die Rangfolge, Labels, die beim Zusammenfassen "other" werden)
+FOLD_RULES = {
+    'flexlm_user_licenses': ('user', ('user', 'hostname', 'display')),
+    'flexlm_host_licenses_total': ('hostname', ('hostname',)),
+    'flexlm_location_licenses_total': ('location', ('location',)),
+}
+
+# Labels, die entfallen dürfen ('server' bleibt immer erhalten)
+DROPPABLE_LABELS = {
+    'flexlm_user_licenses': ('vendor', 'feature', 'user', 'hostname', 'display', 'location', 'department'),
+    'flexlm_host_licenses_total': ('hostname', 'location'),
+    'flexlm_location_licenses_total': ('location', 'feature'),
+}
+
+Row = Tuple[Tuple[str, ...], float]
+
+
+class CardinalityBudget:
+    """
+    Top-N und Label-Verzicht pro Metrik-Familie.
+
+    `top_n` ordnet einer Familie aus FOLD_RULES die Anzahl der Einträge zu,
+    die ihre Labels behalten; gewertet wird die Summe der Lizenzen über alle
+    Serien und Server. `drop_labels` ordnet einer Familie die Labels zu, die
+    entfallen. `suppressed` enthält pro Familie, wie viele Serien beim
+    letzten Scrape eingespart wurden (bzw. das an `apply` übergebene Dict,
+    z.B. getrennt für /probe).
+    """
+
+    def __init__(self, top_n: Optional[Dict[str, int]] = None,
+                 drop_labels: Optional[Dict[str, Sequence[str]]] = None):
+        self.top_n = dict(top_n or {})
+        self.drop_labels = {family: tuple(labels) for family, labels in (drop_labels or {}).items()}
+        for family in set(self.top_n) | set(self.drop_labels):
+            if family not in FOLD_RULES:
+                raise ValueError(f"Kein Kardinalitäts-Budget für '{family}' möglich "
+                                 f"(unterstützt: {', '.join(sorted(FOLD_RULES))})")
+        for family, count in self.top_n.items():
+            if count < 1:
+                raise ValueError(f"Top-N für '{family}' muss mindestens 1 sein")
+        for family, labels in self.drop_labels.items():
+            unknown = set(labels) - set(DROPPABLE_LABELS[family])
+            if unknown:
+                raise ValueError(f"Label {', '.join(sorted(unknown))} von '{family}' kann nicht entfallen "
+                                 f"(möglich: {', '.join(DROPPABLE_LABELS[family])})")
+        self.suppressed: Dict[str, int] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.top_n or self.drop_labels)
+
+    @classmethod
+    def parse(cls, top_n: Iterable[str] = (), drop_labels: Iterable[str] = ()) -> 'CardinalityBudget':
+        """Parst Angaben der Kommandozeile im Format `metrik=N` bzw. `metrik=label`"""
+        limits: Dict[str, int] = {}
+        for spec in top_n:
+            family, value = cls._split(spec)
+            try:
+                limits[family] = int(value)
+            except ValueError:
+                raise ValueError(f"Ungültiges Top-N '{spec}' (erwartet metrik=N)")
+        dropped: Dict[str, List[str]] = {}
+        for spec in drop_labels:
+            family, label = cls._split(spec)
+            dropped.setdefault(family, []).append(label)
+        return cls(limits, dropped)
+
+    @staticmethod
+    def _split(spec: str) -> Tuple[str, str]:
+        family, sep, value = spec.partition('=')
+        if not sep or not family.strip() or not value.strip():
+            raise ValueError(f"Ungültige Angabe '{spec}' (erwartet metrik=wert)")
+        return family.strip(), value.strip()
+
+    def apply(self, family: str, labelnames: Sequence[str], rows: Iterable[Row],
+              suppressed: Optional[Dict[str, int]] = None) -> Tuple[Tuple[str, ...], List[Row]]:
+        """Wendet Top-N und Label-Verzicht auf die Serien einer Familie an"""
+        labelnames = tuple(labelnames)
+        rows = list(rows)
+        limit = self.top_n.get(family)
+        dropped = self.drop_labels.get(family, ())
+        if limit is None and not dropped:
+            return labelnames, rows
+
+        before = len(rows)
+        if limit is not None:
+            rows = self._fold(family, labelnames, rows, limit)
+        if dropped:
+            keep = [index for index, name in enumerate(labelnames) if name not in dropped]
+            labelnames = tuple(labelnames[index] for index in keep)
+            rows = self._merge((tuple(labels[index] for index in keep), value) for labels, value in rows)
+        (self.suppressed if suppressed is None else suppressed)[family] = before - len(rows)
+        return labelnames, rows
+
+    @staticmethod
+    def _merge(rows: Iterable[Row]) -> List[Row]:
+        """Addiert Serien mit identischen Labels"""
+        merged: Dict[Tuple[str, ...], float] = {}
+        for labels, value in rows:
+            merged[labels] = merged.get(labels, 0) + value
+        return list(merged.items())
+
+    def _fold(self, family: str, labelnames: Tuple[str, ...], rows: List[Row], limit: int) -> List[Row]:
+        """Fasst alle Einträge außerhalb der Top-N zu "other" zusammen"""
+        rank_label, fold_labels = FOLD_RULES[family]
+        rank_index = labelnames.index(rank_label)
+        totals: Dict[str, float] = {}
+        for labels, value in rows:
+            name = labels[rank_index]
+            totals[name] = totals.get(name, 0) + value
+        if len(totals) <= limit:
+            return rows
+
+        # Höchste Lizenzanzahl zuerst, bei Gleichstand nach Name - stabil über Scrapes
+        ranked = sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+        kept = {name for name, _ in ranked[:limit]}
+        fold_indexes = [labelnames.index(label) for label in fold_labels]
+        folded = []
+        for labels, value in rows:
+            if labels[rank_index] not in kept:
+                labels = list(labels)
+                for index in fold_indexes:
+                    labels[index] = OTHER
+                labels = tuple(labels)
+            folded.append((labels, value))
+        return self._merge(folded)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Circuit Breaker für nicht erreichbare License Server
+Nach `failure_threshold` Fehlschlägen in Folge wird ein Server nicht mehr
+bei jedem Zyklus voll abgefragt (und jedes Mal bis zum lmutil-Timeout
+gewartet). Stattdessen folgen einzelne, günstige Prüfungen mit
+exponentiell wachsendem Abstand und Jitter; die erste erfolgreiche
+Prüfung schließt den Breaker wieder.
+"""
+
+import time
+import random
+import threading
+from typing import Callable
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Zahlenwerte für die Metrik flexlm_circuit_breaker_state
+STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    Zustände: closed (normal), open (Server wird übersprungen), half_open
+    (eine Prüfung läuft). Der Abstand der Prüfungen beginnt bei
+    `initial_backoff` Sekunden, verdoppelt sich mit jeder erfolglosen
+    Prüfung bis `max_backoff` und wird um ±`jitter` (Anteil) gestreut, damit
+    mehrere Exporter einen zurückkehrenden Server nicht gleichzeitig abfragen.
+    """
+
+    def __init__(self, failure_threshold: int = 3, initial_backoff: float = 30.0, max_backoff: float = 600.0,
+                 jitter: float = 0.2, clock: Callable[[], float] = time.monotonic,
+                 random_uniform: Callable[[float, float], float] = random.uniform):
+        self.failure_threshold = max(1, failure_threshold)
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self._clock = clock
+        self._uniform = random_uniform
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opens = 0
+        self.backoff = 0.0
+        self.next_attempt = 0.0
+        self._attempts = 0
+
+    def allow(self) -> bool:
+        """
+        Darf der Server jetzt abgefragt werden? Im Zustand open liefert nur
+        der erste Aufruf nach Ablauf des Backoffs True und wechselt nach half_open.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self._clock() >= self.next_attempt:
+                self.state = HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        """Erfolgreiche Abfrage - Breaker schließen und Zähler zurücksetzen"""
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._attempts = 0
+            self.backoff = 0.0
+
+    def record_failure(self):
+        """Fehlgeschlagene Abfrage - nach genug Fehlern bzw. erfolgloser Prüfung öffnen"""
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state == CLOSED:
+                    self.opens += 1
+                self.state = OPEN
+                self.backoff = min(self.max_backoff, self.initial_backoff * (2 ** self._attempts))
+                self._attempts += 1
+                spread = self.backoff * self.jitter
+                self.next_attempt = self._clock() + max(0.0, self.backoff + self._uniform(-spread, spread))
+
+    def defer(self, delay: float):
+        """
+        Prüfung konnte nicht laufen (z.B. lokales lmutil-Limit) - half_open
+        zurück nach open, nächster Versuch in `delay` Sekunden. Fehler und
+        Backoff bleiben unverändert.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.state = OPEN
+                self.next_attempt = self._clock() + delay
+
+    def retry_in(self) -> float:
+        """Sekunden bis zur nächsten Prüfung (0 wenn geschlossen oder fällig)"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.next_attempt - self._clock())
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Collection Engine für den FlexLM Exporter
+Pollt einen oder mehrere License Server in einem eigenen Thread und stellt
+das Ergebnis je Server als unveränderlichen Snapshot bereit. collect() rendert nur noch diesen
+Snapshot und ruft lmutil nie selbst auf. Selten veränderliche Daten (z.B. das
+Feature-Inventar aus `lmstat -i`) laufen als eigene Aufgaben im TieredScheduler
+und werden in den Snapshot eingemischt.
+"""
+
+import time
+import threading
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Mapping, NamedTuple, Optional, Set, Tuple
+
+from scheduler import ScheduledTask, TieredScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class LicenseTarget(NamedTuple):
+    """Ein zu überwachender FlexLM License Server"""
+    host: str
+    port: int
+
+    @property
+    def label(self) -> str:
+        """Wert für das `server`-Label der Metriken"""
+        return f"{self.host}:{self.port}"
+
+    @property
+    def spec(self) -> str:
+        """Angabe für `lmutil -c` (port@host)"""
+        return f"{self.port}@{self.host}"
+
+    @classmethod
+    def parse(cls, value: str) -> 'LicenseTarget':
+        """Parst `port@host` (lmutil-Schreibweise) oder `host:port`"""
+        value = value.strip()
+        try:
+            if '@' in value:
+                port, host = value.split('@', 1)
+                return cls(host.strip(), int(port))
+            host, port = value.rsplit(':', 1)
+            return cls(host.strip(), int(port))
+        except ValueError:
+            raise ValueError(f"Ungültiges License-Server-Ziel '{value}' (erwartet port@host oder host:port)")
+
+
+class DaemonState(NamedTuple):
+    """Status eines Vendor Daemons"""
+    name: str
+    version: str
+    up: bool
+
+
+class FeatureState(NamedTuple):
+    """Lizenzzahlen eines Features"""
+    name: str
+    vendor: str
+    total: int
+    used: int
+    available: int
+
+
+class FeatureInventory(NamedTuple):
+    """Eine Lizenz-Zeile aus `lmstat -i`"""
+    name: str
+    vendor: str
+    version: str
+    licenses: int
+    expires: float  # Unix-Zeit, 0 = unbefristet
+
+
+class UserCheckout(NamedTuple):
+    """Ein ausgecheckte Lizenz inkl. Standort-Informationen"""
+    feature: str
+    vendor: str
+    username: str
+    hostname: str
+    display: str
+    location: str
+    department: str
+
+
+@dataclass(frozen=True)
+class LicenseSnapshot:
+    """Unveränderlicher Stand eines License Servers nach einem Poll"""
+    server: str
+    created_at: float
+    duration: float
+    success: bool
+    server_up: bool = False
+    daemons: Tuple[DaemonState, ...] = ()
+    features: Tuple[FeatureState, ...] = ()
+    users: Tuple[UserCheckout, ...] = ()
+    user_licenses: Tuple[Tuple[UserCheckout, int], ...] = ()  # (checkout, count)
+    location_licenses: Tuple[Tuple[str, str, int], ...] = ()  # (location, feature, count)
+    host_licenses: Tuple[Tuple[str, str, int], ...] = ()      # (hostname, location, count)
+    location_users: Tuple[Tuple[str, int], ...] = ()          # (location, users)
+    inventory: Tuple[FeatureInventory, ...] = ()
+    inventory_at: float = 0.0  # Zeitpunkt des letzten `lmstat -i` (0 = noch keiner)
+    output_bytes: int = 0      # Größe der lmstat-Ausgabe (0 = unbekannt, z.B. Streaming)
+    error: str = ""
+    stale: bool = False  # letzter guter Stand, der Poll ist fehlgeschlagen oder der Circuit Breaker offen
+    skipped: bool = False  # kein Poll, weil der Circuit Breaker offen ist oder das lmutil-Limit greift
+
+    def age(self, now: Optional[float] = None) -> float:
+        """Alter des Snapshots in Sekunden"""
+        return (now if now is not None else time.time()) - self.created_at
+
+
+class CheckoutSummary(NamedTuple):
+    """Alle Checkouts eines Polls und die daraus aggregierten Zähler"""
+    users: Tuple[UserCheckout, ...]
+    user_licenses: Tuple[Tuple[UserCheckout, int], ...]
+    location_licenses: Tuple[Tuple[str, str, int], ...]
+    host_licenses: Tuple[Tuple[str, str, int], ...]
+    location_users: Tuple[Tuple[str, int], ...]
+
+
+def summarize_checkouts(checkouts: Iterable[UserCheckout]) -> CheckoutSummary:
+    """
+    Aggregiert alle Zähler eines Snapshots in einem Durchlauf über die Checkouts.
+    Die Schlüssel sind Tupel der Label-Werte - Unterstriche in Feature-,
+    Host- oder Standortnamen können so keine Serien mehr vermischen.
+    """
+    users = tuple(checkouts)
+    # Identische Checkouts (gleicher Benutzer, Host, Feature) zählt Counter in C
+    user_counts = Counter(users)
+    location_counts: Dict[Tuple[str, str], int] = {}
+    host_counts: Dict[Tuple[str, str], int] = {}
+    location_user_names: Dict[str, Set[str]] = {}
+
+    for feature, _, username, hostname, _, location, _ in users:
+        key = (location, feature)
+        location_counts[key] = location_counts.get(key, 0) + 1
+        key = (hostname, location)
+        host_counts[key] = host_counts.get(key, 0) + 1
+        names = location_user_names.get(location)
+        if names is None:
+            names = location_user_names[location] = set()
+        names.add(username)
+
+    return CheckoutSummary(
+        users=users,
+        user_licenses=tuple(user_counts.items()),
+        location_licenses=tuple((*key, count) for key, count in location_counts.items()),
+        host_licenses=tuple((*key, count) for key, count in host_counts.items()),
+        location_users=tuple((location, len(names)) for location, names in location_user_names.items())
+    )
+
+
+# Name der Aufgabe für den eigentlichen Poll (`lmstat -a`)
+POLL_TASK = "lmstat_a"
+
+
+class CollectionEngine:
+    """
+    Pollt alle Targets parallel über einen begrenzten Worker-Pool und
+    tauscht die Snapshots atomar aus.
+
+    Im Hintergrund plant ein TieredScheduler jedes Target einzeln: der Poll
+    läuft alle `interval` Sekunden, weitere `tasks` (z.B. das Inventar) in
+    ihrem eigenen Intervall; die Server sind über das Intervall verteilt.
+    Ergebnisse der weiteren Aufgaben werden je Target gehalten und über
+    `merge(snapshot, results)` in jeden veröffentlichten Snapshot eingemischt
+    (`results`: Aufgabe -> (Zeitpunkt, Ergebnis)).
+
+    Leser greifen ohne Lock auf `snapshots` zu: das Mapping wird nur als
+    Ganzes ersetzt, ein Snapshot selbst wird nie verändert.
+    """
+
+    def __init__(self, poll: Callable[[LicenseTarget], LicenseSnapshot],
+                 targets: Iterable[LicenseTarget], interval: float = 30.0,
+                 on_snapshot: Optional[Callable[[LicenseSnapshot], None]] = None,
+                 max_workers: int = 8, tasks: Iterable[ScheduledTask] = (),
+                 merge: Optional[Callable[[LicenseSnapshot, Mapping[str, Tuple[float, Any]]], LicenseSnapshot]] = None,
+                 jitter: float = 0.1):
+        self._poll = poll
+        self.targets = list(targets)
+        self.interval = interval
+        self._on_snapshot = on_snapshot
+        self.max_workers = max(1, min(max_workers, len(self.targets)))
+        self.tasks = list(tasks)
+        self._merge = merge
+        self.jitter = jitter
+        self._snapshots: Mapping[str, LicenseSnapshot] = MappingProxyType({})
+        self._polled: Dict[str, LicenseSnapshot] = {}  # letzter Poll je Target, ohne eingemischte Aufgaben
+        self._results: Dict[str, Dict[str, Tuple[float, Any]]] = {}
+        self._publish_lock = threading.Lock()
+        self.last_cycle_duration: Optional[float] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._poll_lock = threading.Lock()
+        self.scheduler: Optional[TieredScheduler] = None
+
+    @property
+    def snapshots(self) -> Mapping[str, LicenseSnapshot]:
+        """Aktuelle Snapshots je Target-Label (leer bis zum ersten Poll)"""
+        return self._snapshots
+
+    def snapshot_age(self, server: Optional[str] = None) -> Optional[float]:
+        """Alter des Snapshots eines Servers bzw. des ältesten Snapshots in Sekunden"""
+        snapshots = self._snapshots
+        if server is not None:
+            snapshot = snapshots.get(server)
+            return snapshot.age() if snapshot is not None else None
+        if not snapshots:
+            return None
+        now = time.time()
+        return max(snapshot.age(now) for snapshot in snapshots.values())
+
+    def _poll_target(self, target: LicenseTarget) -> Optional[LicenseSnapshot]:
+        """Pollt ein einzelnes Target im Worker-Thread"""
+        try:
+            snapshot = self._poll(target)
+        except Exception as e:
+            logger.error(f"Poll von {target.label} fehlgeschlagen: {e}")
+            return None
+        if self._on_snapshot:
+            try:
+                self._on_snapshot(snapshot)
+            except Exception as e:
+                logger.error(f"Fehler beim Übernehmen des Snapshots von {target.label}: {e}")
+        return snapshot
+
+    def poll_once(self) -> Mapping[str, LicenseSnapshot]:
+        """Pollt alle Targets parallel und veröffentlicht die neuen Snapshots"""
+        # Verhindert überlappende Zyklen, falls poll_once zusätzlich manuell aufgerufen wird
+        with self._poll_lock:
+            start_time = time.monotonic()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="flexlm-poll")
+            results = list(self._executor.map(self._poll_target, self.targets))
+            
+            # Fehlgeschlagene Polls behalten ihren bisherigen Snapshot
+            with self._publish_lock:
+                snapshots = dict(self._snapshots)
+                for target, snapshot in zip(self.targets, results):
+                    if snapshot is not None:
+                        self._polled[target.label] = snapshot
+                        snapshots[target.label] = self._merged(target.label, snapshot)
+                self._snapshots = MappingProxyType(snapshots)
+            self.last_cycle_duration = time.monotonic() - start_time
+        
+        logger.debug(f"Poll-Zyklus über {len(self.targets)} Server in {self.last_cycle_duration:.2f}s")
+        return self._snapshots
+
+    def _merged(self, label: str, snapshot: LicenseSnapshot) -> LicenseSnapshot:
+        """Mischt die Ergebnisse der weiteren Aufgaben eines Targets in den Snapshot"""
+        results = self._results.get(label)
+        if not results or self._merge is None:
+            return snapshot
+        return self._merge(snapshot, MappingProxyType(results))
+
+    def _on_task_result(self, task_name: str, target: LicenseTarget, result: Any):
+        """Übernimmt ein Ergebnis aus dem Scheduler und veröffentlicht den Snapshot des Targets neu"""
+        if result is None:
+            return
+        label = target.label
+        with self._publish_lock:
+            if task_name == POLL_TASK:
+                self._polled[label] = result
+            else:
+                self._results.setdefault(label, {})[task_name] = (time.time(), result)
+            snapshot = self._polled.get(label)
+            if snapshot is None:
+                return
+            snapshots = dict(self._snapshots)
+            snapshots[label] = self._merged(label, snapshot)
+            self._snapshots = MappingProxyType(snapshots)
+
+    def start(self):
+        """Startet den Scheduler für Poll und weitere Aufgaben"""
+        if self.scheduler is not None:
+            return
+        tasks = [ScheduledTask(POLL_TASK, self.interval, self._poll_target)] + self.tasks
+        self.scheduler = TieredScheduler(tasks, self.targets, self._on_task_result,
+                                         max_workers=self.max_workers * len(tasks), jitter=self.jitter)
+        self.scheduler.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stoppt den Scheduler und den Worker-Pool"""
+        if self.scheduler is not None:
+            self.scheduler.stop(timeout)
+            self.scheduler = None
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
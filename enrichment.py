@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Anreicherungs-Pipeline für License-Checkouts
+Standort und Abteilung eines Checkouts kommen aus mehreren Quellen
+(Standort-Datei, Hostname-/Netz-Regeln, Active Directory). Jede Quelle ist
+eine Stufe mit eigenem Cache und eigener Batch-Abfrage. Die Pipeline fragt
+pro Zyklus jeden Benutzer und jeden Host höchstens einmal je Stufe ab und
+übernimmt pro Feld den Wert der Stufe mit der höchsten Priorität.
+"""
+
+import abc
+import time
+import logging
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN = "Unknown"
+
+
+class Enrichment(NamedTuple):
+    """Teilergebnis einer Stufe - leere Felder sind unbekannt"""
+    location: str = ""
+    department: str = ""
+
+
+NO_RESULT = Enrichment()
+
+
+class EnrichmentStage(abc.ABC):
+    """
+    Basisklasse einer Stufe.
+
+    `key` legt fest, ob die Stufe Benutzer ('user') oder Hosts ('host')
+    auflöst, `provides` welche Felder sie liefern kann. Ergebnisse werden
+    `cache_ttl` Sekunden pro Stufe gecacht (0 = kein Cache).
+    """
+
+    name = "stage"
+    key = "user"
+    provides = ('location', 'department')
+    cache_ttl = 0.0
+
+    @abc.abstractmethod
+    def resolve_batch(self, keys: List[str]) -> Dict[str, Enrichment]:
+        """Löst alle Schlüssel eines Zyklus auf; fehlende Schlüssel gelten als unbekannt"""
+
+    def cacheable(self, result: Enrichment) -> bool:
+        """Ob ein Ergebnis gecacht werden darf (z.B. nicht für vorläufige Werte)"""
+        return True
+
+
+class LocationMapUserStage(EnrichmentStage):
+    """Benutzer-Einträge der Standort-Datei"""
+
+    name = "location_map_user"
+    key = "user"
+
+    def __init__(self, location_map):
+        self.location_map = location_map
+
+    def resolve_batch(self, keys: List[str]) -> Dict[str, Enrichment]:
+        results = {}
+        for username in keys:
+            entry = self.location_map.user(username)
+            if entry is not None:
+                results[username] = Enrichment(entry.location, entry.department)
+        return results
+
+
+class LocationMapHostStage(EnrichmentStage):
+    """Host-Einträge der Standort-Datei"""
+
+    name = "location_map_host"
+    key = "host"
+    provides = ('location',)
+
+    def __init__(self, location_map):
+        self.location_map = location_map
+
+    def resolve_batch(self, keys: List[str]) -> Dict[str, Enrichment]:
+        results = {}
+        for hostname in keys:
+            entry = self.location_map.host(hostname)
+            if entry is not None:
+                results[hostname] = Enrichment(entry.location)
+        return results
+
+
+class HostRulesStage(EnrichmentStage):
+    """Hostname-Muster und CIDR-Netze (inkl. DNS-Auflösung)"""
+
+    name = "host_rules"
+    key = "host"
+    provides = ('location',)
+    cache_ttl = 300.0
+
+    def __init__(self, location_rules):
+        self.location_rules = location_rules
+
+    def resolve_batch(self, keys: List[str]) -> Dict[str, Enrichment]:
+        return {hostname: Enrichment(location)
+                for hostname, location in self.location_rules.locate_many(keys).items()}
+
+
+class ActiveDirectoryStage(EnrichmentStage):
+    """Active Directory (gebündelte Abfrage über den AD Helper)"""
+
+    name = "active_directory"
+    key = "user"
+    cache_ttl = 30.0
+
+    def __init__(self, ad_helper):
+        self.ad_helper = ad_helper
+
+    def resolve_batch(self, keys: List[str]) -> Dict[str, Enrichment]:
+        results = {}
+        for username, info in self.ad_helper.get_users_info(keys).items():
+            location = info.location if info.location != UNKNOWN else ""
+            results[username] = Enrichment(location, info.department)
+        return results
+
+    def cacheable(self, result: Enrichment) -> bool:
+        # Noch nicht aufgelöste Benutzer im nächsten Zyklus erneut anfragen
+        return result.location != "pending"
+
+
+class StageCache:
+    """
+    TTL-Cache einer Stufe; wird einmal pro Zyklus aufgeräumt.
+    Mehrere Server werden parallel angereichert - alle Operationen sind
+    einzelne Dict-Zugriffe bzw. ein Austausch des Dicts und brauchen keinen Lock.
+    """
+
+    def __init__(self, ttl: float, clock: Callable[[], float] = time.time):
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: Dict[str, Tuple[Enrichment, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Enrichment]:
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= self._clock():
+            return None
+        return entry[0]
+
+    def put(self, key: str, value: Enrichment):
+        if self.ttl > 0:
+            self._entries[key] = (value, self._clock() + self.ttl)
+
+    def purge(self):
+        now = self._clock()
+        self._entries = {key: entry for key, entry in self._entries.items() if entry[1] > now}
+
+
+class StageStats(NamedTuple):
+    """Messwerte einer Stufe in einem Zyklus"""
+    stage: str
+    requested: int
+    cache_hits: int
+    resolved: int
+    answered: int
+    duration: float
+    error: bool
+
+
+class EnrichmentPipeline:
+    """
+    Führt die Stufen in Prioritätsreihenfolge aus (erste Stufe = höchste Priorität).
+
+    Eine Stufe wird nur für Schlüssel befragt, bei denen noch mindestens ein
+    Checkout ein Feld offen hat, das die Stufe liefern kann - sind z.B. alle
+    Standorte über Host-Regeln bekannt und die Abteilungen aus der
+    Standort-Datei, fällt die AD-Stufe ganz weg. Der optionale `observer`
+    erhält nach jedem Zyklus die StageStats jeder Stufe.
+    """
+
+    def __init__(self, stages: Iterable[EnrichmentStage],
+                 observer: Optional[Callable[[StageStats], None]] = None,
+                 clock: Callable[[], float] = time.time):
+        self.stages = list(stages)
+        self.observer = observer
+        self._caches = {stage.name: StageCache(stage.cache_ttl, clock) for stage in self.stages}
+        self.last_stats: List[StageStats] = []
+
+    def cache(self, stage_name: str) -> StageCache:
+        return self._caches[stage_name]
+
+    def run(self, checkouts: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], Tuple[str, str]]:
+        """
+        Reichert (Benutzer, Host)-Paare an und liefert {(Benutzer, Host): (Standort, Abteilung)}.
+        Unbekannte Felder werden mit "Unknown" belegt.
+        """
+        merged: Dict[Tuple[str, str], Dict[str, str]] = {pair: {} for pair in checkouts}
+        stats = [self._run_stage(stage, merged) for stage in self.stages]
+        self.last_stats = [s for s in stats if s is not None]
+        if self.observer:
+            for stage_stats in self.last_stats:
+                self.observer(stage_stats)
+        return {
+            pair: (fields.get('location') or UNKNOWN, fields.get('department') or UNKNOWN)
+            for pair, fields in merged.items()
+        }
+
+    def _run_stage(self, stage: EnrichmentStage, merged: Dict[Tuple[str, str], Dict[str, str]]) -> Optional[StageStats]:
+        """Befragt eine Stufe für alle noch offenen Schlüssel und übernimmt ihre Ergebnisse"""
+        index = 0 if stage.key == 'user' else 1
+        open_pairs = [pair for pair, fields in merged.items()
+                      if any(not fields.get(field) for field in stage.provides)]
+        keys = list(dict.fromkeys(pair[index] for pair in open_pairs))
+        if not keys:
+            return None
+
+        start = time.perf_counter()
+        cache = self._caches[stage.name]
+        cache.purge()
+        results: Dict[str, Enrichment] = {}
+        missing = []
+        for key in keys:
+            cached = cache.get(key)
+            if cached is None:
+                missing.append(key)
+            else:
+                results[key] = cached
+
+        error = False
+        if missing:
+            try:
+                resolved = stage.resolve_batch(missing)
+            except Exception as e:
+                logger.warning(f"Anreicherung '{stage.name}' fehlgeschlagen: {e}")
+                resolved = {}
+                error = True
+            for key in missing:
+                result = resolved.get(key, NO_RESULT)
+                if not error and stage.cacheable(result):
+                    cache.put(key, result)
+                results[key] = result
+
+        for pair in open_pairs:
+            result = results.get(pair[index], NO_RESULT)
+            fields = merged[pair]
+            for field in stage.provides:
+                value = getattr(result, field)
+                if value and not fields.get(field):
+                    fields[field] = value
+
+        return StageStats(
+            stage=stage.name,
+            requested=len(keys),
+            cache_hits=len(keys) - len(missing),
+            resolved=len(missing),
+            answered=sum(1 for key in keys if results.get(key, NO_RESULT) != NO_RESULT),
+            duration=time.perf_counter() - start,
+            error=error
+        )
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Vorgerenderte Prometheus-Ausgabe pro Snapshot
+Der Text der Metriken wird nur einmal pro neuem Snapshot erzeugt und
+zusammen mit einer gzip-komprimierten Fassung und einem ETag gehalten.
+Alle Scrapes bis zum nächsten Snapshot erhalten dieselben Bytes - egal
+wie viele Prometheus-Replikas oder Agents den Exporter abfragen.
+"""
+
+import gzip
+import time
+import hashlib
+import logging
+import threading
+from typing import Callable, Iterable, NamedTuple, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.registry import CollectorRegistry
+
+logger = logging.getLogger(__name__)
+
+# Schneller als Stufe 9 bei kaum größerer Ausgabe; das Ergebnis wird ohnehin wiederverwendet
+GZIP_LEVEL = 6
+
+
+class Exposition(NamedTuple):
+    """Gerenderte Ausgabe eines Snapshots"""
+    plain: bytes
+    gzip: bytes
+    etag: str
+    generation: object
+    rendered_at: float
+    rendered_clock: float = 0.0  # Zeitpunkt des Renderns auf der Uhr des Caches (für max_age)
+    content_type: str = CONTENT_TYPE_LATEST
+
+
+class ExpositionCache:
+    """
+    Rendert die Registry, sobald sich `generation()` ändert.
+
+    `generation` liefert ein Objekt, das sich mit jedem neuen Snapshot
+    ändert (verglichen wird die Identität, z.B. das Snapshot-Mapping der
+    Collection Engine). Werte, die erst beim Scrape entstehen (z.B. das Alter
+    des Snapshots oder HTTP-Zähler), zeigen den Stand beim Rendern - mit
+    `max_age` wird spätestens nach so vielen Sekunden neu gerendert, auch
+    wenn kein neuer Snapshot kommt (z.B. weil das Polling hängt). Treffen
+    mehrere Scrapes gleichzeitig auf einen neuen Snapshot, rendert nur einer.
+    """
+
+    def __init__(self, registry: CollectorRegistry, generation: Callable[[], object],
+                 max_age: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.registry = registry
+        self._generation = generation
+        self.max_age = max_age
+        self._clock = clock
+        self._current: Optional[Exposition] = None
+        self._lock = threading.Lock()
+        self.renders = 0
+        self.hits = 0
+
+    def get(self) -> Exposition:
+        """Aktuelle Ausgabe, bei neuem Snapshot zuvor neu gerendert"""
+        generation = self._generation()
+        current = self._current
+        if self._valid(current, generation):
+            self.hits += 1
+            return current
+        with self._lock:
+            current = self._current
+            if not self._valid(current, generation):
+                current = self._current = self._render(generation)
+            else:
+                self.hits += 1
+        return current
+
+    def _valid(self, current: Optional[Exposition], generation: object) -> bool:
+        """Gehört die Ausgabe zum aktuellen Snapshot und ist sie jung genug?"""
+        if current is None or current.generation is not generation:
+            return False
+        return self.max_age is None or self._clock() - current.rendered_clock < self.max_age
+
+    def invalidate(self):
+        """Erzwingt ein neues Rendern beim nächsten Scrape"""
+        self._current = None
+
+    def _render(self, generation: object) -> Exposition:
+        self.renders += 1
+        return render_exposition(self.registry, generation)._replace(rendered_clock=self._clock())
+
+
+def render_exposition(registry, generation: object = None) -> Exposition:
+    """Rendert eine Registry (oder ein Objekt mit collect()) samt gzip-Fassung und ETag"""
+    start = time.perf_counter()
+    plain = generate_latest(registry)
+    compressed = gzip.compress(plain, compresslevel=GZIP_LEVEL)
+    etag = '"' + hashlib.blake2b(plain, digest_size=16).hexdigest() + '"'
+    logger.debug(f"Metriken gerendert: {len(plain)} Bytes, gzip {len(compressed)} Bytes "
+                 f"in {time.perf_counter() - start:.3f}s")
+    return Exposition(plain=plain, gzip=compressed, etag=etag, generation=generation,
+                      rendered_at=time.time())
+
+
+class StaticCollector:
+    """Collector über eine feste Liste von Metrik-Familien (z.B. für ein Probe-Ergebnis)"""
+
+    def __init__(self, families: Iterable):
+        self.families = list(families)
+
+    def collect(self):
+        return iter(self.families)
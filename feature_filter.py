@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Filter für Features und Vendor Daemons
+Allow- und Deny-Listen aus Glob-Mustern (`SW*`) oder regulären Ausdrücken
+(`re:^SIM_.*`). Ein Muster muss den ganzen Namen treffen, Groß-/Kleinschreibung
+wird nicht beachtet. Deny gewinnt vor Allow; eine leere Allow-Liste lässt
+alles zu.
+
+Besteht die Feature-Allow-Liste nur aus festen Namen, kann der Exporter
+gezielt mit `lmstat -f <feature>` pollen. PollStrategy entscheidet pro
+Server anhand der gemessenen lmutil-Zeit, ob das günstiger ist als ein
+gefiltertes `lmstat -a`.
+"""
+
+import re
+import fnmatch
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+REGEX_PREFIX = "re:"
+GLOB_CHARS = frozenset('*?[')
+
+# Poll-Arten
+MODE_ALL = "all"          # lmstat -a (bzw. -A), unerwünschte Features beim Parsen verwerfen
+MODE_FEATURE = "feature"  # lmstat -f <feature> pro Feature, parallel
+
+
+def _compile(patterns: Tuple[str, ...]) -> Optional['re.Pattern']:
+    """Alle Muster als ein Ausdruck (ganzer Name, ohne Groß-/Kleinschreibung)"""
+    if not patterns:
+        return None
+    branches = []
+    for pattern in patterns:
+        if pattern.startswith(REGEX_PREFIX):
+            regex = pattern[len(REGEX_PREFIX):]
+            try:
+                re.compile(regex)
+            except re.error as e:
+                raise ValueError(f"Ungültiger Ausdruck '{pattern}': {e}")
+            branches.append(f"(?:{regex})")
+        else:
+            branches.append(fnmatch.translate(pattern))
+    return re.compile(r"(?:{})\Z".format("|".join(branches)), re.IGNORECASE)
+
+
+class FeatureFilter:
+    """Allow-/Deny-Listen für Feature-Namen und Vendor Daemons"""
+
+    def __init__(self, allow: Iterable[str] = (), deny: Iterable[str] = (),
+                 vendor_allow: Iterable[str] = (), vendor_deny: Iterable[str] = ()):
+        self.allow = tuple(p.strip() for p in allow if p.strip())
+        self.deny = tuple(p.strip() for p in deny if p.strip())
+        self.vendor_allow = tuple(p.strip() for p in vendor_allow if p.strip())
+        self.vendor_deny = tuple(p.strip() for p in vendor_deny if p.strip())
+        self._allow = _compile(self.allow)
+        self._deny = _compile(self.deny)
+        self._vendor_allow = _compile(self.vendor_allow)
+        self._vendor_deny = _compile(self.vendor_deny)
+
+    def __bool__(self) -> bool:
+        return bool(self.allow or self.deny or self.vendor_allow or self.vendor_deny)
+
+    @property
+    def filters_vendors(self) -> bool:
+        return bool(self.vendor_allow or self.vendor_deny)
+
+    def allows_feature(self, name: str) -> bool:
+        if self._deny is not None and self._deny.match(name):
+            return False
+        return self._allow is None or self._allow.match(name) is not None
+
+    def allows_vendor(self, vendor: str) -> bool:
+        """Unbekannter Vendor ('') wird zugelassen - er lässt sich noch nicht prüfen"""
+        if not vendor:
+            return True
+        if self._vendor_deny is not None and self._vendor_deny.match(vendor):
+            return False
+        return self._vendor_allow is None or self._vendor_allow.match(vendor) is not None
+
+    @property
+    def explicit_features(self) -> Optional[Tuple[str, ...]]:
+        """Feste Feature-Namen der Allow-Liste für `lmstat -f` (None bei Mustern oder ohne Liste)"""
+        if not self.allow:
+            return None
+        if any(p.startswith(REGEX_PREFIX) or GLOB_CHARS & set(p) for p in self.allow):
+            return None
+        return tuple(name for name in dict.fromkeys(self.allow) if self.allows_feature(name))
+
+
+class PollStrategy:
+    """
+    Wählt pro Server zwischen `lmstat -f` je Feature und gefiltertem `lmstat -a`.
+
+    Als Kosten zählt die Summe der lmutil-Laufzeiten eines Polls (bei `-f`
+    also aller Einzelaufrufe) - ein Maß für die Arbeit auf dem License Server.
+    Beide Varianten werden als gleitender Mittelwert (EWMA) geführt; gewählt
+    wird die günstigere. Fehlt eine Messung, wird die Variante einmal probiert,
+    und jeder `explore_every`-te Poll misst die andere Variante erneut.
+    `-f` kommt nur in Frage, wenn die Aufrufe in `call_budget` passen.
+    """
+
+    def __init__(self, features: Tuple[str, ...], call_budget: Optional[int] = None,
+                 alpha: float = 0.3, explore_every: int = 20):
+        self.features = features
+        self.call_budget = call_budget
+        self.alpha = alpha
+        self.explore_every = max(2, explore_every)
+        self.costs: Dict[str, Dict[str, float]] = {}
+        self._polls: Dict[str, int] = {}
+        self.current: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def feature_mode_possible(self) -> bool:
+        return bool(self.features) and (self.call_budget is None or len(self.features) <= self.call_budget)
+
+    def choose(self, server: str) -> str:
+        """Poll-Art für den nächsten Poll eines Servers"""
+        if not self.feature_mode_possible:
+            mode = MODE_ALL
+        else:
+            with self._lock:
+                costs = self.costs.get(server, {})
+                polls = self._polls[server] = self._polls.get(server, 0) + 1
+                if MODE_ALL not in costs:
+                    mode = MODE_ALL
+                elif MODE_FEATURE not in costs:
+                    mode = MODE_FEATURE
+                else:
+                    mode = min((MODE_ALL, MODE_FEATURE), key=costs.get)
+                    if polls % self.explore_every == 0:
+                        mode = MODE_FEATURE if mode == MODE_ALL else MODE_ALL
+        self.current[server] = mode
+        return mode
+
+    def record(self, server: str, mode: str, cost: float):
+        """Gemessene Kosten eines erfolgreichen Polls übernehmen"""
+        with self._lock:
+            costs = self.costs.setdefault(server, {})
+            previous = costs.get(mode)
+            costs[mode] = cost if previous is None else previous + self.alpha * (cost - previous)
+
+    def forget(self, server: str):
+        """Entfernt Messwerte eines Servers, der nicht mehr abgefragt wird"""
+        with self._lock:
+            self.costs.pop(server, None)
+            self._polls.pop(server, None)
+            self.current.pop(server, None)
@@ -9,14 +9,32 @@ Erweitert um Active Directory Integration für Standort-Informationen.
 """
 
 import time
+import dataclasses
 import subprocess
-import re
+import tempfile
 import logging
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, Iterable, List, Mapping, Tuple, Optional
 from datetime import datetime
 import threading
-from prometheus_client import Counter, Gauge, Info, start_http_server, REGISTRY
-from prometheus_client.core import CollectorRegistry
+from concurrent.futures import ThreadPoolExecutor
+from prometheus_client import Counter, Histogram, Info, REGISTRY
+from prometheus_client.core import CollectorRegistry, CounterMetricFamily, GaugeMetricFamily
+
+from lmstat_parser import parse_lmstat, parse_lmstat_lines, parse_lmstat_inventory
+from location_map import LocationMap
+from cardinality import CardinalityBudget
+from exposition import Exposition, ExpositionCache, StaticCollector, render_exposition
+from probe import ProbeCache
+from lmutil_guard import LmutilGuard, LmutilThrottled
+from circuit_breaker import CircuitBreaker, CLOSED, HALF_OPEN, STATE_VALUES
+from http_server import start_metrics_server, stop_metrics_server
+from location_rules import LocationRules
+from enrichment import (EnrichmentPipeline, StageStats, ActiveDirectoryStage, HostRulesStage,
+                        LocationMapHostStage, LocationMapUserStage)
+from feature_filter import FeatureFilter, PollStrategy, MODE_ALL, MODE_FEATURE
+from collection_engine import (CollectionEngine, LicenseSnapshot, LicenseTarget, DaemonState,
+                               FeatureInventory, FeatureState, UserCheckout, summarize_checkouts)
+from scheduler import ScheduledTask
 
 # Active Directory Helper importieren
 try:
@@ -33,6 +51,43 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Maximale Laufzeit eines lmutil-Aufrufs in Sekunden
+LMUTIL_TIMEOUT = 30
+
+# Maximale Laufzeit der kurzen Erreichbarkeitsprüfung bei offenem Circuit Breaker
+PROBE_TIMEOUT = 10
+
+# Abstand in Sekunden, wenn eine Prüfung bei offenem Circuit Breaker am lmutil-Limit scheitert
+THROTTLE_RETRY = 5.0
+
+# Name der Scheduler-Aufgabe für das Feature-Inventar
+INVENTORY_TASK = "lmstat_i"
+
+# Name der Scheduler-Aufgabe für die vollständige Feature-Liste im Active-Only-Modus
+FEATURES_TASK = "lmstat_a_full"
+
+# Wert des vendor-Labels der Feature- und Benutzer-Metriken (Annahme für SolidWorks)
+DEFAULT_VENDOR = 'solidworks'
+
+# Maximale Anzahl paralleler `lmstat -f` Aufrufe pro Poll
+FEATURE_POLL_WORKERS = 8
+
+# Spätestens nach so vielen Sekunden wird /metrics neu gerendert, auch ohne neuen Snapshot
+EXPOSITION_MAX_AGE = 5.0
+
+
+class ServerState:
+    """Zustand eines License Servers zwischen den Polls"""
+    
+    def __init__(self, breaker: CircuitBreaker):
+        self.breaker = breaker
+        self.last_good: Optional[LicenseSnapshot] = None
+        # Vendor Daemons aus dem letzten lmstat -a (lmstat -f nennt keine)
+        self.daemons: Tuple[DaemonState, ...] = ()
+        # Vendor je Feature aus lmstat -i (vor dem ersten Poll) und den vendor-Zeilen von lmstat
+        self.feature_vendors: Dict[str, str] = {}
+        self.vendors_loaded = False
+
 
 class FlexLMExporter:
     """FlexLM License Server Exporter für Prometheus"""
@@ -40,10 +95,48 @@ class FlexLMExporter:
     def __init__(self, license_server: str = "lic-solidworks-emea.patec.group", port: int = 25734, 
                  lmutil_path: str = r"C:\Temp\SolidWorks_Exporter\FlexLM_Export\lmutil.exe",
                  enable_ad: Optional[bool] = None, ad_server: Optional[str] = None, 
-                 ad_username: Optional[str] = None, ad_password: Optional[str] = None):
-        self.license_server = license_server
-        self.port = port
+                 ad_username: Optional[str] = None, ad_password: Optional[str] = None,
+                 update_interval: float = 30.0, targets: Optional[List] = None,
+                 registry: Optional[CollectorRegistry] = None, max_workers: int = 8,
+                 streaming: bool = False, ad_cache_file: Optional[str] = None,
+                 location_map_file: Optional[str] = None, location_rules_file: Optional[str] = None,
+                 cardinality: Optional[CardinalityBudget] = None,
+                 probe_min_interval: float = 30.0, probe_concurrency: int = 4,
+                 lmstat_rate: float = 12.0, lmstat_burst: float = 4.0,
+                 breaker_threshold: int = 3, breaker_max_backoff: float = 600.0,
+                 inventory_interval: float = 3600.0, active_only: bool = False,
+                 full_interval: float = 600.0, feature_filter: Optional[FeatureFilter] = None):
+        # Mehrere License Server (port@host / host:port oder LicenseTarget) oder Einzelserver
+        if targets:
+            self.targets = [t if isinstance(t, LicenseTarget) else LicenseTarget.parse(t) for t in targets]
+        else:
+            self.targets = [LicenseTarget(license_server, port)]
+        self.license_server = self.targets[0].host
+        self.port = self.targets[0].port
         self.lmutil_path = lmutil_path
+        self.update_interval = update_interval
+        self.inventory_interval = inventory_interval  # lmstat -i (Versionen, Ablaufdaten), 0 = aus
+        # lmstat -A (nur aktive Features) pollen, ruhende Features aus einem selteneren lmstat -a
+        self.active_only = active_only
+        self.full_interval = full_interval
+        self.streaming = streaming  # lmutil stdout zeilenweise parsen statt puffern
+        # Gleichzeitige identische lmutil-Aufrufe zusammenfassen, Aufrufe pro Server begrenzen
+        self.lmutil_guard = LmutilGuard(rate_per_minute=lmstat_rate, burst=lmstat_burst)
+        # Circuit Breaker und letzter guter Snapshot pro konfiguriertem Server;
+        # der Zustand von /probe-Targets liegt im ProbeCache und verfällt mit ihm
+        self.breaker_threshold = breaker_threshold
+        self.breaker_max_backoff = breaker_max_backoff
+        self.server_states: Dict[str, ServerState] = {
+            target.label: self._new_server_state(target.label) for target in self.targets}
+        # Allow-/Deny-Listen; bei festen Feature-Namen wahlweise gezielt mit lmstat -f pollen
+        self.feature_filter = feature_filter if feature_filter else None
+        self.poll_strategy: Optional[PollStrategy] = None
+        self._feature_executor: Optional[ThreadPoolExecutor] = None
+        if self.feature_filter and self.feature_filter.explicit_features:
+            self.poll_strategy = PollStrategy(
+                self.feature_filter.explicit_features,
+                call_budget=int(self.lmutil_guard.burst) if lmstat_rate > 0 else None
+            )
         
         # AD-Integration automatisch basierend auf Umgebung aktivieren
         if enable_ad is None:
@@ -77,6 +170,8 @@ class FlexLMExporter:
                     ad_kwargs['username'] = ad_username
                 if ad_password:
                     ad_kwargs['password'] = ad_password
+                if ad_cache_file is not None:
+                    ad_kwargs['cache_file'] = ad_cache_file
                 
                 self.ad_helper = ActiveDirectoryHelper(**ad_kwargs)
                 
@@ -92,87 +187,101 @@ class FlexLMExporter:
         else:
             logger.info("ℹ️  Active Directory Integration deaktiviert")
         
-        # Prometheus Metriken definieren
-        self.setup_metrics()
+        # Statische Standort-Zuordnung (CSV/JSON) - z.B. für Hosts ohne Domain
+        self.location_map = LocationMap(location_map_file) if location_map_file else None
         
-        # Registrierung beim Prometheus Registry
-        REGISTRY.register(self)
+        # Standort-Regeln für Hostnamen und IP-Netze - Standort des Rechners statt des Benutzers
+        self.location_rules = LocationRules.from_file(location_rules_file) if location_rules_file else None
         
-    def setup_metrics(self):
-        """Initialisiert alle Prometheus-Metriken"""
+        # Top-N und Label-Verzicht für Metriken mit Benutzer- und Host-Labels
+        self.cardinality = cardinality if cardinality is not None else CardinalityBudget()
         
-        # Server Status
-        self.server_up = Gauge(
-            'flexlm_server_up',
-            'FlexLM Server erreichbar (1 = up, 0 = down)',
-            ['server']
-        )
+        # Prometheus Metriken definieren
+        self.setup_metrics()
         
-        # Feature Informationen
-        self.feature_total = Gauge(
-            'flexlm_feature_total_licenses',
-            'Gesamtanzahl der verfügbaren Lizenzen pro Feature',
-            ['server', 'vendor', 'feature']
-        )
+        # Anreicherung: Stufen in Prioritätsreihenfolge
+        stages = []
+        if self.location_map:
+            stages += [LocationMapUserStage(self.location_map), LocationMapHostStage(self.location_map)]
+        if self.location_rules:
+            stages.append(HostRulesStage(self.location_rules))
+        if self.enable_ad and self.ad_helper:
+            stages.append(ActiveDirectoryStage(self.ad_helper))
+        self.enrichment = EnrichmentPipeline(stages, observer=self.observe_enrichment)
         
-        self.feature_used = Gauge(
-            'flexlm_feature_used_licenses',
-            'Anzahl der verwendeten Lizenzen pro Feature',
-            ['server', 'vendor', 'feature']
+        # Collection Engine: pollt alle Server parallel und unabhängig von Scrapes,
+        # das Inventar (lmstat -i) ändert sich selten und läuft im eigenen Intervall
+        tasks = []
+        if self.inventory_interval > 0:
+            tasks.append(ScheduledTask(INVENTORY_TASK, self.inventory_interval, self.poll_inventory))
+        if self.active_only:
+            tasks.append(ScheduledTask(FEATURES_TASK, self.full_interval, self.poll_feature_totals))
+        self.engine = CollectionEngine(
+            lambda target: self.build_snapshot(target, active_only=self.active_only),
+            self.targets,
+            interval=self.update_interval,
+            on_snapshot=self.apply_snapshot,
+            max_workers=max_workers,
+            tasks=tasks,
+            merge=self.merge_snapshot
         )
         
-        self.feature_available = Gauge(
-            'flexlm_feature_available_licenses',
-            'Anzahl der verfügbaren Lizenzen pro Feature',
-            ['server', 'vendor', 'feature']
-        )
+        # Registrierung beim Prometheus Registry - ohne Angabe eine eigene Registry
+        # pro Instanz, damit mehrere Exporter im selben Prozess nicht kollidieren
+        self.registry = registry if registry is not None else CollectorRegistry()
+        self.registry.register(self)
         
-        # Benutzer Informationen (erweitert um Standort)
-        self.user_licenses = Gauge(
-            'flexlm_user_licenses',
-            'Anzahl der von einem Benutzer verwendeten Lizenzen',
-            ['server', 'vendor', 'feature', 'user', 'hostname', 'display', 'location', 'department']
-        )
+        # Ausgabe einmal pro Snapshot rendern - die Engine ersetzt das Mapping bei jedem Zyklus;
+        # Alter und HTTP-Zähler werden trotzdem alle EXPOSITION_MAX_AGE Sekunden aktualisiert
+        self.exposition = ExpositionCache(self.registry, lambda: self.engine.snapshots,
+                                          max_age=EXPOSITION_MAX_AGE)
         
-        # Standort-spezifische Metriken
-        self.location_licenses = Gauge(
-            'flexlm_location_licenses_total',
-            'Gesamtanzahl der Lizenzen pro Standort',
-            ['server', 'location', 'feature']
-        )
+        # /probe?target=...: License Server aus der Service Discovery, pro Target gecacht
+        self.probe = ProbeCache(self.build_snapshot, self.render_probe,
+                                min_interval=probe_min_interval, max_concurrency=probe_concurrency,
+                                state_factory=self._new_server_state, on_expire=self._forget_probe_target)
         
-        self.location_users = Gauge(
-            'flexlm_location_users_total',
-            'Anzahl der Benutzer pro Standort',
-            ['server', 'location']
-        )
+    def setup_metrics(self):
+        """
+        Initialisiert die Prometheus-Metriken, die über Zyklen hinweg zählen.
+        Die Metriken werden nicht global registriert, sondern über collect() ausgeliefert.
+        Alle Werte eines Snapshots (Features, Benutzer, Standorte) entstehen bei
+        jedem Scrape neu in _snapshot_metric_families.
+        """
         
-        # Computer/Hostname Informationen
-        self.host_licenses = Gauge(
-            'flexlm_host_licenses_total',
-            'Gesamtanzahl der Lizenzen pro Host',
-            ['server', 'hostname', 'location']
+        # Scrape-Fehler (kumulativ pro Server)
+        self.scrape_errors = Counter(
+            'flexlm_scrape_errors_total',
+            'Anzahl der Fehler beim Sammeln der Metriken',
+            ['server'],
+            registry=None
         )
         
-        # Daemon Status
-        self.daemon_up = Gauge(
-            'flexlm_daemon_up',
-            'Status der License Daemons (1 = up, 0 = down)',
-            ['server', 'daemon', 'version']
+        # Anreicherungs-Pipeline pro Stufe
+        self.enrichment_duration = Histogram(
+            'flexlm_enrichment_stage_seconds',
+            'Dauer einer Anreicherungs-Stufe pro Zyklus',
+            ['stage'],
+            buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+            registry=None
         )
         
-        # Scrape Informationen
-        self.scrape_duration = Gauge(
-            'flexlm_scrape_duration_seconds',
-            'Zeit für das Sammeln der Metriken'
+        self.enrichment_hit_ratio = Histogram(
+            'flexlm_enrichment_stage_hit_ratio',
+            'Anteil der Schlüssel, für die eine Stufe ein Ergebnis lieferte, pro Zyklus',
+            ['stage'],
+            buckets=(0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0),
+            registry=None
         )
         
-        self.scrape_errors = Counter(
-            'flexlm_scrape_errors_total',
-            'Anzahl der Fehler beim Sammeln der Metriken'
+        self.enrichment_cache = Counter(
+            'flexlm_enrichment_cache_lookups_total',
+            'Cache-Zugriffe der Anreicherungs-Stufen (hit, miss)',
+            ['stage', 'result'],
+            registry=None
         )
 
-    def run_lmutil_command(self, args: List[str]) -> Tuple[int, str, str]:
+    def run_lmutil_command(self, args: List[str], timeout: float = LMUTIL_TIMEOUT) -> Tuple[int, str, str]:
         """
         Führt lmutil mit einer Liste von Argumenten aus.
         Gibt (returncode, stdout, stderr) zurück.
@@ -185,7 +294,7 @@ class FlexLMExporter:
                 cmd,
                 capture_output=True,
                 text=True,
-                timeout=30
+                timeout=timeout
             )
             logger.debug(f"lmutil returncode={res.returncode}")
             logger.debug(f"lmutil stdout:\n{res.stdout}")
@@ -198,266 +307,939 @@ class FlexLMExporter:
         except Exception as e:
             logger.error(f"lmutil exception: {e}")
             return -1, "", str(e)
-        
 
-    def parse_lmstat_output(self, output: str) -> Dict:
-        """Parsed die Ausgabe von lmstat -a"""
-        data = {
-            'server_status': False,
-            'daemons': [],
-            'features': [],
-            'users': []
-        }
-        
-        lines = output.split('\n')
-        current_feature = None
-        in_users_section = False
-        
-        for line in lines:
-            original_line = line
-            line = line.strip()
-            
-            # Server Status prüfen
-            if 'license server UP' in line:
-                data['server_status'] = True
-            elif 'Cannot connect to license server' in line:
-                data['server_status'] = False
-            
-            # Daemon Status
-            daemon_match = re.search(r'(\w+): UP v([0-9.]+)', line)
-            if daemon_match:
-                daemon_name = daemon_match.group(1)
-                version = daemon_match.group(2)
-                data['daemons'].append({
-                    'name': daemon_name,
-                    'status': 'UP',
-                    'version': version
-                })
-            
-            # Feature Informationen
-            feature_match = re.search(r'Users of (\w+):\s+\(Total of (\d+) license[s]? issued;\s+Total of (\d+) license[s]? in use\)', line)
-            if feature_match:
-                feature_name = feature_match.group(1)
-                total_licenses = int(feature_match.group(2))
-                used_licenses = int(feature_match.group(3))
-                
-                current_feature = {
-                    'name': feature_name,
-                    'total': total_licenses,
-                    'used': used_licenses,
-                    'available': total_licenses - used_licenses,
-                    'users': []
-                }
-                data['features'].append(current_feature)
-                in_users_section = True
+    def run_lmutil_stream(self, args: List[str], parser: Callable[[Iterable[str]], Dict]) -> Tuple[int, Optional[Dict], str]:
+        """
+        Führt lmutil aus und speist stdout zeilenweise direkt in den Parser.
+        Das Parsen überlappt so mit der Netzwerk-Wartezeit von lmutil, und die
+        Rohausgabe wird nie komplett gepuffert.
+        Gibt (returncode, geparste Daten, stderr) zurück.
+        """
+        cmd = [self.lmutil_path] + args
+        logger.debug(f"Calling lmutil (streaming): {cmd!r}")
+
+        try:
+            # stderr in eine Temp-Datei, damit ein volles stderr-Pipe lmutil nicht blockiert
+            with tempfile.TemporaryFile(mode='w+') as stderr_file:
+                process = subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.PIPE,
+                    stderr=stderr_file,
+                    text=True,
+                    errors='replace'
+                )
+                # Timeout-Überwachung: hängt lmutil, wird der Prozess beendet und der Pipe geschlossen
+                timed_out = threading.Event()
+
+                def kill_on_timeout():
+                    timed_out.set()
+                    process.kill()
+
+                watchdog = threading.Timer(LMUTIL_TIMEOUT, kill_on_timeout)
+                watchdog.daemon = True
+                watchdog.start()
+                try:
+                    with process.stdout:
+                        data = parser(process.stdout)
+                    returncode = process.wait()
+                except BaseException:
+                    # Parser-Fehler: lmutil nicht als Waise/Zombie zurücklassen
+                    process.kill()
+                    process.wait()
+                    raise
+                finally:
+                    watchdog.cancel()
+
+                stderr_file.seek(0)
+                stderr = stderr_file.read()
+
+            if timed_out.is_set():
+                logger.error(f"lmutil timeout nach {LMUTIL_TIMEOUT}s")
+                return -1, None, "TimeoutExpired"
+
+            logger.debug(f"lmutil returncode={returncode}")
+            logger.debug(f"lmutil stderr:\n{stderr}")
+            return returncode, data, stderr
+
+        except Exception as e:
+            logger.error(f"lmutil exception: {e}")
+            return -1, None, str(e)
+
+    def parse_lmstat_output(self, output: str, feature_vendors: Optional[Mapping[str, str]] = None) -> Dict:
+        """Parsed die Ausgabe von lmstat -a (Single-Pass Parser, siehe lmstat_parser)"""
+        return parse_lmstat(output, self.feature_filter, feature_vendors)
+
+    def parse_lmstat_stream(self, lines: Iterable[str], feature_vendors: Optional[Mapping[str, str]] = None) -> Dict:
+        """Parsed lmstat -a zeilenweise aus dem stdout-Pipe (mit Feature-Filter)"""
+        return parse_lmstat_lines(lines, self.feature_filter, feature_vendors)
+
+    @staticmethod
+    def _timed(fn: Callable[[], Tuple]) -> Tuple:
+        """Ergebnis eines lmutil-Aufrufs plus dessen Laufzeit (ohne Wartezeit auf ein Token)"""
+        start = time.perf_counter()
+        result = fn()
+        return (*result, time.perf_counter() - start)
+
+    def _poll_features(self, target: LicenseTarget) -> Tuple[int, Optional[Dict], str, int, float]:
+        """
+        Pollt die Features der Allow-Liste parallel mit `lmstat -f <feature>` und
+        fasst die Ergebnisse zusammen. Gibt (returncode, Daten, stderr,
+        Ausgabegröße, Summe der lmutil-Laufzeiten) zurück.
+        `lmstat -f` gibt weder den Server- noch den Daemon-Status aus: der Server
+        gilt als UP, wenn alle Aufrufe erfolgreich waren; die Daemons übernimmt
+        _poll_lmstat aus dem letzten `lmstat -a`.
+        """
+        features = self.poll_strategy.features
+        vendors = self.server_state(target.label).feature_vendors
+        if self._feature_executor is None:
+            self._feature_executor = ThreadPoolExecutor(max_workers=min(FEATURE_POLL_WORKERS, len(features)),
+                                                        thread_name_prefix="lmstat-f")
+
+        def poll(name: str):
+            args = ["lmstat", "-f", name, "-c", target.spec]
+            return self.lmutil_guard.run(target.label, tuple(args),
+                                         lambda: self._timed(lambda: self.run_lmutil_command(args)))
+
+        data = {'server_status': False, 'daemons': [], 'features': [], 'users': []}
+        output_bytes = 0
+        cost = 0.0
+        for rc, output, error, seconds in self._feature_executor.map(poll, features):
+            cost += seconds
+            if rc != 0:
+                return rc, None, error, output_bytes, cost
+            output_bytes += len(output)
+            start = time.perf_counter()
+            part = self.parse_lmstat_output(output, vendors)
+            cost += time.perf_counter() - start
+            data['features'] += part['features']
+            data['users'] += part['users']
+        data['server_status'] = True
+        return 0, data, "", output_bytes, cost
+
+    def _load_feature_vendors(self, target: LicenseTarget):
+        """
+        Liest vor dem ersten Poll eines Servers die Vendor je Feature aus
+        `lmstat -i`, damit Vendor-Ausschlüsse auch ruhende Features ohne
+        vendor-Zeile sofort treffen. Nur mit Vendor-Filter; schlägt die
+        Abfrage fehl, wird es beim nächsten Poll erneut versucht.
+        """
+        state = self.server_state(target.label)
+        if state.vendors_loaded or not (self.feature_filter and self.feature_filter.filters_vendors):
+            return
+        args = ["lmstat", "-i", "-c", target.spec]
+        try:
+            rc, output, err = self.lmutil_guard.run(target.label, tuple(args),
+                                                    lambda: self.run_lmutil_command(args))
+        except LmutilThrottled as e:
+            logger.warning(f"⏳ Vendor-Zuordnung für {target.label} verschoben: {e}")
+            return
+        if rc != 0:
+            logger.warning(f"Vendor-Zuordnung für {target.label} nicht lesbar (lmstat -i, rc={rc}): {err.strip()}")
+            return
+        self._learn_feature_vendors(state, parse_lmstat_inventory(output))
+
+    @staticmethod
+    def _learn_feature_vendors(state: ServerState, entries: Iterable[Dict]):
+        """Übernimmt die Vendor aus den Zeilen von `lmstat -i` in die Zuordnung eines Servers"""
+        state.feature_vendors.update((entry['name'], entry['vendor']) for entry in entries if entry['vendor'])
+        state.vendors_loaded = True
+
+    def _allowed_features(self, server_label: str, features: List[Dict]) -> List[Dict]:
+        """
+        Verwirft Features ausgeschlossener Vendor Daemons - auch ruhende, deren
+        lmstat-Ausgabe keine vendor-Zeile enthält (Vendor früher gelernt).
+        Der Vendor dient nur dem Filter; das vendor-Label bleibt DEFAULT_VENDOR.
+        """
+        known = self.server_state(server_label).feature_vendors
+        result = []
+        for feature in features:
+            vendor = feature.get('vendor') or known.get(feature['name'], '')
+            if feature.get('vendor'):
+                known[feature['name']] = vendor
+            if self.feature_filter and not self.feature_filter.allows_vendor(vendor):
                 continue
-            
-            # Neues Feature beginnt - beende aktuellen Benutzer-Bereich
-            if line.startswith('Users of ') and current_feature:
-                in_users_section = False
-                current_feature = None
-            
-            # Benutzer Informationen (erweitert für Computer-Namen)
-            if in_users_section and current_feature:
-                # Pattern für Benutzer-Zeilen: "    username hostname display (v2022.1105) (license_server/27000 1234), start ..."
-                user_match = re.search(r'^\s+(\S+)\s+(\S+)\s+(\S+)\s+\([^)]+\)\s+\([^)]+\s+\d+\)', original_line)
-                if user_match:
-                    username = user_match.group(1)
-                    hostname = user_match.group(2)
-                    display = user_match.group(3)
-                    
-                    user_info = {
-                        'username': username,
-                        'hostname': hostname,
-                        'display': display,
-                        'feature': current_feature['name']
-                    }
-                    
-                    current_feature['users'].append(user_info)
-                    data['users'].append(user_info)
-                    continue
-        
-        return data
+            result.append(feature)
+        return result
 
-    def collect_metrics(self):
-        """Sammelt alle Metriken vom FlexLM Server"""
+    def _new_server_state(self, server_label: str) -> ServerState:
+        return ServerState(CircuitBreaker(
+            failure_threshold=self.breaker_threshold,
+            initial_backoff=min(self.update_interval, self.breaker_max_backoff),
+            max_backoff=self.breaker_max_backoff
+        ))
+    
+    def server_state(self, server_label: str) -> ServerState:
+        """Zustand eines konfigurierten Servers bzw. eines /probe-Targets (aus dem ProbeCache)"""
+        state = self.server_states.get(server_label)
+        return state if state is not None else self.probe.state(server_label)
+    
+    def breaker(self, server_label: str) -> CircuitBreaker:
+        """Circuit Breaker eines Servers"""
+        return self.server_state(server_label).breaker
+    
+    def _forget_probe_target(self, server_label: str):
+        """Räumt beim Verfall eines /probe-Targets dessen lmutil-Zähler und Poll-Messwerte auf"""
+        if server_label in self.server_states:
+            return
+        self.lmutil_guard.forget(server_label)
+        if self.poll_strategy:
+            self.poll_strategy.forget(server_label)
+
+    def build_snapshot(self, target: Optional[LicenseTarget] = None, active_only: bool = False) -> LicenseSnapshot:
+        """
+        Pollt einen FlexLM Server und baut daraus einen unveränderlichen Snapshot.
+        Schlägt der Poll fehl, wird der letzte gute Snapshot als veraltet (stale)
+        zurückgegeben - die Serien verschwinden also nicht, bis der Breaker öffnet.
+        Ist der Circuit Breaker des Servers offen, wird lmutil nicht aufgerufen;
+        nach Ablauf des Backoffs prüft zuerst ein kurzes `lmstat` die Erreichbarkeit.
+        Mit `active_only` wird `lmstat -A` verwendet - der Snapshot enthält dann
+        nur Features mit Benutzern (ruhende ergänzt merge_snapshot).
+        """
+        target = target or self.targets[0]
         start_time = time.time()
+        state = self.server_state(target.label)
+        breaker = state.breaker
         
+        if not breaker.allow():
+            return self._stale_snapshot(target, start_time, skipped=True)
         try:
-            # lmstat -a ausführen für detaillierte Informationen
-            rc, output, error = self.run_lmutil_command([
-                "lmstat", "-a", "-c", f"{self.port}@{self.license_server}"
-            ])
+            if breaker.state == HALF_OPEN and not self._server_reachable(target):
+                breaker.record_failure()
+                logger.warning(f"🔌 {target.label} weiterhin nicht erreichbar - nächste Prüfung in "
+                               f"{breaker.retry_in():.0f}s")
+                return self._stale_snapshot(target, start_time, skipped=True)
+            snapshot = self._poll_lmstat(target, start_time, active_only)
+        except LmutilThrottled as e:
+            # Lokales Rate-Limit - sagt nichts über den Server aus, weder Fehler noch Backoff
+            logger.warning(f"⏳ {e}")
+            breaker.defer(THROTTLE_RETRY)
+            return self._stale_snapshot(target, start_time, skipped=True, error=str(e))
+        
+        if snapshot.success and snapshot.server_up:
+            if breaker.state != CLOSED:
+                logger.info(f"✅ {target.label} wieder erreichbar - Circuit Breaker geschlossen")
+            breaker.record_success()
+            state.last_good = snapshot
+        else:
+            was_closed = breaker.state == CLOSED
+            breaker.record_failure()
+            if was_closed and breaker.state != CLOSED:
+                logger.warning(f"🔌 {target.label} nach {breaker.failures} Fehlern übersprungen - "
+                               f"nächste Prüfung in {breaker.retry_in():.0f}s")
+            return self._stale_snapshot(target, start_time, failed=snapshot)
+        return snapshot
+
+    def _server_reachable(self, target: LicenseTarget) -> bool:
+        """
+        Günstige Prüfung bei offenem Breaker: `lmstat` ohne -a mit kurzem Timeout.
+        LmutilThrottled wird weitergereicht - das Limit ist kein Ergebnis der Prüfung.
+        """
+        args = ["lmstat", "-c", target.spec]
+        rc, output, _ = self.lmutil_guard.run(
+            target.label, tuple(args), lambda: self.run_lmutil_command(args, timeout=PROBE_TIMEOUT))
+        return rc == 0 and 'license server UP' in output
+
+    def _stale_snapshot(self, target: LicenseTarget, start_time: float, skipped: bool = False,
+                        failed: Optional[LicenseSnapshot] = None, error: str = "") -> LicenseSnapshot:
+        """
+        Letzter guter Snapshot, als veraltet markiert. `failed` ist der Snapshot
+        eines fehlgeschlagenen Polls - ohne guten Stand wird er selbst geliefert,
+        sonst übernimmt die Kopie seinen Fehler. `skipped`: lmutil wurde wegen
+        des offenen Circuit Breakers nicht aufgerufen. `error` kennzeichnet einen
+        Poll, der am lokalen lmutil-Limit gescheitert ist - ohne guten Stand ist
+        der Zustand des Servers dann unbekannt (weder stale noch down).
+        """
+        last_good = self.server_state(target.label).last_good
+        if last_good is not None:
+            if failed is not None:
+                error = failed.error or "Server DOWN"
+            return dataclasses.replace(last_good, stale=True, skipped=skipped, error=error)
+        if failed is not None:
+            return failed
+        if error:
+            return LicenseSnapshot(server=target.label, created_at=time.time(),
+                                   duration=time.time() - start_time, success=False, skipped=True, error=error)
+        return LicenseSnapshot(server=target.label, created_at=time.time(),
+                               duration=time.time() - start_time, success=False, stale=True, skipped=True,
+                               error="Server nicht erreichbar (Circuit Breaker offen)")
+
+    def _poll_lmstat(self, target: LicenseTarget, start_time: float, active_only: bool = False) -> LicenseSnapshot:
+        """Ruft lmstat -a bzw. -A auf und baut den Snapshot (ohne Circuit Breaker)"""
+        server_label = target.label
+        state = self.server_state(server_label)
+        output_bytes = 0
+        
+        try:
+            self._load_feature_vendors(target)
+            vendors = state.feature_vendors
+            # Feste Feature-Liste: gezielt mit -f oder per -a, je nachdem was zuletzt günstiger war
+            mode = self.poll_strategy.choose(server_label) if self.poll_strategy else MODE_ALL
+            if mode == MODE_FEATURE:
+                rc, data, error, output_bytes, cost = self._poll_features(target)
+            else:
+                # lmstat -a ausführen für detaillierte Informationen (-A: nur Features in Benutzung)
+                args = ["lmstat", "-A" if active_only else "-a", "-c", target.spec]
+                if self.streaming:
+                    rc, data, error, cost = self.lmutil_guard.run(
+                        server_label, ('stream', *args),
+                        lambda: self._timed(lambda: self.run_lmutil_stream(
+                            args, lambda lines: self.parse_lmstat_stream(lines, vendors))))
+                else:
+                    rc, output, error, cost = self.lmutil_guard.run(
+                        server_label, tuple(args), lambda: self._timed(lambda: self.run_lmutil_command(args)))
 
-            # 2) Fehler-Metrik setzen
             if rc != 0:
-                self.server_up.labels(server=f"{self.license_server}:{self.port}").set(0)
-                self.scrape_errors.inc()
                 logger.error("lmutil fehlerhaft, rc=%d, err=%s", rc, error)
-                return
-
-            # 3) Ausgabe verarbeiten
-            self.server_up.labels(server=f"{self.license_server}:{self.port}").set(1)
-            data = self.parse_lmstat_output(output)
+                return LicenseSnapshot(server=server_label, created_at=time.time(),
+                                       duration=time.time() - start_time,
+                                       success=False, error=str(error))
 
-            server_label = f"{self.license_server}:{self.port}"
-            self.server_up.labels(server=server_label).set(1 if data['server_status'] else 0)
+            if mode == MODE_ALL and not self.streaming:
+                output_bytes = len(output)
+                parse_start = time.perf_counter()
+                data = self.parse_lmstat_output(output, vendors)
+                cost += time.perf_counter() - parse_start
+            if self.poll_strategy:
+                self.poll_strategy.record(server_label, mode, cost)
             
-            # Daemon Status
-            for daemon in data['daemons']:
-                self.daemon_up.labels(
-                    server=server_label,
-                    daemon=daemon['name'],
-                    version=daemon['version']
-                ).set(1 if daemon['status'] == 'UP' else 0)
+            if mode == MODE_FEATURE:
+                daemons = state.daemons
+            else:
+                daemons = state.daemons = tuple(
+                    DaemonState(name=daemon['name'], version=daemon['version'], up=daemon['status'] == 'UP')
+                    for daemon in data['daemons']
+                )
             
-            # Feature Metriken
-            for feature in data['features']:
-                vendor = 'solidworks'  # Annahme für SolidWorks
-                
-                self.feature_total.labels(
-                    server=server_label,
-                    vendor=vendor,
-                    feature=feature['name']
-                ).set(feature['total'])
-                
-                self.feature_used.labels(
-                    server=server_label,
-                    vendor=vendor,
-                    feature=feature['name']
-                ).set(feature['used'])
-                
-                self.feature_available.labels(
-                    server=server_label,
-                    vendor=vendor,
-                    feature=feature['name']
-                ).set(feature['available'])
-                
-                # Benutzer-spezifische Metriken (erweitert um AD-Informationen)
-                location_counts = {}  # Zähler für Standorte
-                
-                for user in feature['users']:
-                    # Standort-Informationen aus AD abrufen
-                    location = "Unknown"
-                    department = "Unknown"
-                    
-                    if self.enable_ad and self.ad_helper:
-                        try:
-                            user_info = self.ad_helper.get_user_info(user['username'])
-                            location = user_info.location if user_info.location else "Unknown"
-                            department = user_info.department if user_info.department else "Unknown"
-                            logger.debug(f"AD Info für {user['username']}: {location}, {department}")
-                        except Exception as e:
-                            logger.warning(f"AD-Abfrage für {user['username']} fehlgeschlagen: {e}")
-                    
-                    # Benutzer-Metrik mit Standort
-                    self.user_licenses.labels(
-                        server=server_label,
-                        vendor=vendor,
-                        feature=feature['name'],
-                        user=user['username'],
-                        hostname=user['hostname'],
-                        display=user['display'],
-                        location=location,
-                        department=department
-                    ).set(1)  # 1 Lizenz pro Benutzer/Feature Kombination
-                    
-                    # Standort-Zähler aktualisieren
-                    location_key = f"{location}_{feature['name']}"
-                    if location_key in location_counts:
-                        location_counts[location_key] += 1
-                    else:
-                        location_counts[location_key] = 1
-                
-                # Standort-basierte Metriken setzen
-                for location_key, count in location_counts.items():
-                    location, feature_name = location_key.rsplit('_', 1)
-                    self.location_licenses.labels(
-                        server=server_label,
-                        location=location,
-                        feature=feature_name
-                    ).set(count)
+            kept = self._allowed_features(server_label, data['features'])
             
-            # Host-basierte Metriken (Computer-Namen aggregieren) - erweitert um Standort
-            host_counts = {}
-            location_user_counts = {}
+            # Standort/Abteilung einmal pro Benutzer/Host über alle Stufen der Pipeline
+            enriched = self.enrichment.run((user['username'], user['hostname'])
+                                           for feature in kept for user in feature['users'])
             
-            for user in data['users']:
-                hostname = user['hostname']
-                
-                # Standort für Host ermitteln
-                location = "Unknown"
-                if self.enable_ad and self.ad_helper:
-                    try:
-                        user_info = self.ad_helper.get_user_info(user['username'])
-                        location = user_info.location if user_info.location else "Unknown"
-                    except Exception:
-                        pass
-                
-                # Host-Zähler
-                host_key = f"{hostname}_{location}"
-                if host_key in host_counts:
-                    host_counts[host_key] += 1
-                else:
-                    host_counts[host_key] = 1
-                
-                # Benutzer pro Standort zählen
-                if location in location_user_counts:
-                    location_user_counts[location].add(user['username'])
-                else:
-                    location_user_counts[location] = {user['username']}
+            features = tuple(
+                FeatureState(name=feature['name'], vendor=DEFAULT_VENDOR, total=feature['total'],
+                             used=feature['used'], available=feature['available'])
+                for feature in kept
+            )
             
-            # Host-Metriken setzen
-            for host_key, count in host_counts.items():
-                hostname, location = host_key.rsplit('_', 1)
-                self.host_licenses.labels(
-                    server=server_label,
-                    hostname=hostname,
-                    location=location
-                ).set(count)
+            # Checkouts erzeugen und alle Zähler in einem Durchlauf aggregieren
+            summary = summarize_checkouts(
+                # Standort und Abteilung als letzte Felder direkt aus dem Anreicherungs-Ergebnis
+                UserCheckout(feature['name'], DEFAULT_VENDOR, user['username'], user['hostname'], user['display'],
+                             *enriched[(user['username'], user['hostname'])])
+                for feature in kept
+                for user in feature['users']
+            )
+            users = summary.users
             
-            # Benutzer pro Standort Metriken
-            for location, users in location_user_counts.items():
-                self.location_users.labels(
-                    server=server_label,
-                    location=location
-                ).set(len(users))
+            logger.info(f"Metriken erfolgreich gesammelt. Features: {len(features)}, Users: {len(users)}")
             
-            logger.info(f"Metriken erfolgreich gesammelt. Features: {len(data['features'])}, Users: {len(data['users'])}")
+            return LicenseSnapshot(
+                server=server_label,
+                created_at=time.time(),
+                duration=time.time() - start_time,
+                success=True,
+                server_up=data['server_status'],
+                daemons=daemons,
+                features=features,
+                users=users,
+                user_licenses=summary.user_licenses,
+                location_licenses=summary.location_licenses,
+                host_licenses=summary.host_licenses,
+                location_users=summary.location_users,
+                output_bytes=output_bytes
+            )
             
+        except LmutilThrottled:
+            raise
         except Exception as e:
             logger.error(f"Fehler beim Sammeln der Metriken: {e}")
-            self.scrape_errors.inc()
-        
-        finally:
-            # Scrape-Dauer aufzeichnen
-            duration = time.time() - start_time
-            self.scrape_duration.set(duration)
+            return LicenseSnapshot(server=server_label, created_at=time.time(),
+                                   duration=time.time() - start_time,
+                                   success=False, error=str(e))
+
+    def poll_inventory(self, target: LicenseTarget) -> Optional[Tuple[FeatureInventory, ...]]:
+        """
+        Fragt das Feature-Inventar (`lmstat -i`) eines Servers ab. Solange der
+        Circuit Breaker nicht geschlossen ist, entfällt die Abfrage.
+        """
+        if self.breaker(target.label).state != CLOSED:
+            return None
+        args = ["lmstat", "-i", "-c", target.spec]
+        rc, output, err = self.lmutil_guard.run(target.label, tuple(args), lambda: self.run_lmutil_command(args))
+        if rc != 0:
+            raise RuntimeError(f"lmutil fehlerhaft, rc={rc}, err={err.strip()}")
+        entries = parse_lmstat_inventory(output)
+        self._learn_feature_vendors(self.server_state(target.label), entries)
+        entries = [entry for entry in entries
+                   if not self.feature_filter or self.feature_filter.allows_feature(entry['name'])]
+        return tuple(
+            FeatureInventory(entry['name'], entry['vendor'], entry['version'], entry['licenses'], entry['expires'])
+            for entry in self._allowed_features(target.label, entries)
+        )
+
+    def poll_feature_totals(self, target: LicenseTarget) -> Optional[Tuple[FeatureState, ...]]:
+        """
+        Vollständige Feature-Liste (`lmstat -a`) für den Active-Only-Modus - liefert
+        die Lizenzzahlen ruhender Features. Benutzer werden nicht angereichert.
+        """
+        if self.breaker(target.label).state != CLOSED:
+            return None
+        vendors = self.server_state(target.label).feature_vendors
+        args = ["lmstat", "-a", "-c", target.spec]
+        if self.streaming:
+            rc, data, err = self.lmutil_guard.run(
+                target.label, ('stream', *args),
+                lambda: self.run_lmutil_stream(args, lambda lines: self.parse_lmstat_stream(lines, vendors)))
+        else:
+            rc, output, err = self.lmutil_guard.run(target.label, tuple(args), lambda: self.run_lmutil_command(args))
+            data = self.parse_lmstat_output(output, vendors) if rc == 0 else None
+        if rc != 0:
+            raise RuntimeError(f"lmutil fehlerhaft, rc={rc}, err={str(err).strip()}")
+        return tuple(FeatureState(feature['name'], DEFAULT_VENDOR, feature['total'], feature['used'],
+                                  feature['available'])
+                     for feature in self._allowed_features(target.label, data['features']))
+
+    def merge_snapshot(self, snapshot: LicenseSnapshot, results: Mapping[str, Tuple[float, object]]) -> LicenseSnapshot:
+        """
+        Mischt die Ergebnisse der selteneren Aufgaben in den Snapshot eines Polls:
+        das Inventar (`lmstat -i`) und im Active-Only-Modus die ruhenden Features
+        aus der letzten vollständigen Liste - ohne Benutzer, also 0 belegt.
+        """
+        changes = {}
+        if INVENTORY_TASK in results:
+            changes['inventory_at'], changes['inventory'] = results[INVENTORY_TASK]
+        if FEATURES_TASK in results and snapshot.success:
+            _, all_features = results[FEATURES_TASK]
+            active = {feature.name for feature in snapshot.features}
+            idle = tuple(feature._replace(used=0, available=feature.total)
+                         for feature in all_features if feature.name not in active)
+            if idle:
+                changes['features'] = snapshot.features + idle
+        return dataclasses.replace(snapshot, **changes) if changes else snapshot
+
+    def observe_enrichment(self, stats: StageStats):
+        """Überträgt die Messwerte einer Anreicherungs-Stufe in die Histogramme"""
+        self.enrichment_duration.labels(stage=stats.stage).observe(stats.duration)
+        self.enrichment_hit_ratio.labels(stage=stats.stage).observe(stats.answered / stats.requested)
+        self.enrichment_cache.labels(stage=stats.stage, result='hit').inc(stats.cache_hits)
+        self.enrichment_cache.labels(stage=stats.stage, result='miss').inc(stats.resolved)
+
+    def apply_snapshot(self, snapshot: LicenseSnapshot):
+        """Zählt fehlgeschlagene Polls - alle übrigen Werte rendert collect() aus dem Snapshot"""
+        # Auch wenn statt des Fehlers der letzte gute Stand ausgeliefert wird;
+        # bei offenem Circuit Breaker wurde lmutil gar nicht aufgerufen
+        if (not snapshot.success or snapshot.stale) and not snapshot.skipped:
+            self.scrape_errors.labels(server=snapshot.server).inc()
+
+    def collect_metrics(self):
+        """Sammelt alle Metriken von allen FlexLM Servern (ein Zyklus der Collection Engine)"""
+        return self.engine.poll_once()
 
     def collect(self):
-        """Prometheus Collector Interface"""
-        self.collect_metrics()
-        return []
+        """
+        Prometheus Collector Interface
+        Rendert nur den aktuellen Snapshot - lmutil wird hier nie aufgerufen.
+        """
+        yield from self._snapshot_metric_families(self.engine.snapshots)
+        
+        for metric in (self.scrape_errors, self.enrichment_duration, self.enrichment_hit_ratio,
+                       self.enrichment_cache):
+            yield from metric.collect()
+        
+        if self.enable_ad and self.ad_helper:
+            yield from self._ad_metric_families()
+        
+        if self.location_map:
+            entries = GaugeMetricFamily(
+                'flexlm_location_map_entries',
+                'Einträge der Standort-Datei (user, host)',
+                labels=['kind']
+            )
+            entries.add_metric(['user'], self.location_map.users)
+            entries.add_metric(['host'], self.location_map.hosts)
+            yield entries
+            yield CounterMetricFamily(
+                'flexlm_location_map_reload_errors',
+                'Fehlgeschlagene Ladeversuche der Standort-Datei',
+                value=self.location_map.reload_errors
+            )
+        
+        if self.location_rules:
+            dns = self.location_rules.dns
+            lookups = CounterMetricFamily(
+                'flexlm_dns_cache_lookups',
+                'DNS-Abfragen der Standort-Regeln (hit = aus Cache, miss = aufgelöst, failed = fehlgeschlagen)',
+                labels=['result']
+            )
+            lookups.add_metric(['hit'], dns.hits)
+            lookups.add_metric(['miss'], dns.misses)
+            lookups.add_metric(['failed'], dns.failures)
+            yield lookups
+        
+        breaker_state = GaugeMetricFamily(
+            'flexlm_circuit_breaker_state',
+            'Circuit Breaker pro Server (0 = geschlossen, 1 = offen, 2 = Prüfung läuft)',
+            labels=['server']
+        )
+        breaker_opens = CounterMetricFamily(
+            'flexlm_circuit_breaker_opens',
+            'Anzahl der Wechsel in den Zustand offen pro Server',
+            labels=['server']
+        )
+        # Nur konfigurierte Server - /probe-Targets verfallen und erscheinen nur in /probe
+        for server, state in sorted(self.server_states.items()):
+            breaker_state.add_metric([server], STATE_VALUES[state.breaker.state])
+            breaker_opens.add_metric([server], state.breaker.opens)
+        yield breaker_state
+        yield breaker_opens
+        
+        if self.poll_strategy:
+            poll_mode = GaugeMetricFamily(
+                'flexlm_poll_mode',
+                'Poll-Art des letzten Polls (feature = lmstat -f je Feature, all = lmstat -a mit Filter)',
+                labels=['server', 'mode']
+            )
+            poll_cost = GaugeMetricFamily(
+                'flexlm_poll_cost_seconds',
+                'Gleitender Mittelwert der lmutil-Laufzeit eines Polls je Poll-Art',
+                labels=['server', 'mode']
+            )
+            for server, mode in sorted(self.poll_strategy.current.items()):
+                if server not in self.server_states:
+                    continue
+                for candidate in (MODE_ALL, MODE_FEATURE):
+                    poll_mode.add_metric([server, candidate], 1 if candidate == mode else 0)
+            for server, costs in sorted(self.poll_strategy.costs.items()):
+                if server not in self.server_states:
+                    continue
+                for mode, cost in sorted(costs.items()):
+                    poll_cost.add_metric([server, mode], cost)
+            yield poll_mode
+            yield poll_cost
+        
+        calls = CounterMetricFamily(
+            'flexlm_lmutil_calls',
+            'lmutil-Aufrufe pro Server (executed, coalesced = Ergebnis eines laufenden Aufrufs geteilt, '
+            'throttled = durch Rate-Limit verzögert, rejected = durch Rate-Limit entfallen)',
+            labels=['server', 'result']
+        )
+        for server, counts in sorted(self.lmutil_guard.stats.items()):
+            if server not in self.server_states:
+                continue
+            for result, count in counts.items():
+                calls.add_metric([server, result], count)
+        yield calls
+        
+        if len(self.probe) or self.probe.polls:
+            probes = CounterMetricFamily(
+                'flexlm_probes',
+                'Anfragen an /probe (cache_hit, coalesced = an laufenden Poll angehängt, polled, rejected)',
+                labels=['result']
+            )
+            probes.add_metric(['cache_hit'], self.probe.cache_hits)
+            probes.add_metric(['coalesced'], self.probe.coalesced)
+            probes.add_metric(['polled'], self.probe.polls)
+            probes.add_metric(['rejected'], self.probe.rejected)
+            yield probes
+            yield GaugeMetricFamily(
+                'flexlm_probe_cached_targets',
+                'Targets mit gecachtem Probe-Ergebnis',
+                value=len(self.probe)
+            )
+        
+        scheduler = self.engine.scheduler
+        if scheduler is not None:
+            runs = CounterMetricFamily(
+                'flexlm_collection_task_runs',
+                'Läufe der Scheduler-Aufgaben (ok, error, overlap = voriger Lauf noch aktiv, missed = Deadline verpasst)',
+                labels=['task', 'result']
+            )
+            duration = GaugeMetricFamily(
+                'flexlm_collection_task_duration_seconds',
+                'Dauer des letzten Laufs einer Scheduler-Aufgabe',
+                labels=['task']
+            )
+            lag = GaugeMetricFamily(
+                'flexlm_collection_task_lag_seconds',
+                'Startverzögerung des letzten Laufs gegenüber dem geplanten Zeitpunkt',
+                labels=['task']
+            )
+            for task, stats in sorted(scheduler.task_stats().items()):
+                runs.add_metric([task, 'ok'], stats.runs - stats.errors)
+                runs.add_metric([task, 'error'], stats.errors)
+                runs.add_metric([task, 'overlap'], stats.overlaps)
+                runs.add_metric([task, 'missed'], stats.missed)
+                if stats.last_duration is not None:
+                    duration.add_metric([task], stats.last_duration)
+                    lag.add_metric([task], stats.last_lag)
+            yield from (runs, duration, lag)
 
-    def start_server(self, port: int = 9090):
-        """Startet den HTTP Server für Prometheus Metriken"""
-        logger.info(f"Starte FlexLM Exporter auf Port {port}")
-        logger.info(f"Metriken verfügbar unter: http://localhost:{port}/metrics")
-        logger.info(f"Überwachung von FlexLM Server: {self.license_server}:{self.port}")
+    def _snapshot_metric_families(self, snapshots: Mapping[str, LicenseSnapshot],
+                                  suppressed_series: Optional[Dict[str, int]] = None):
+        """
+        Baut die Metriken bei jedem Scrape neu aus den aktuellen Snapshots.
+        Zurückgegebene Lizenzen verschwinden so mit dem nächsten Snapshot aus
+        der Ausgabe, und der Speicher wächst nicht mit allen je gesehenen Benutzern.
+        Eingesparte Serien landen in `suppressed_series` (Standard: die von /metrics).
+        """
+        if suppressed_series is None:
+            suppressed_series = self.cardinality.suppressed
+        server_up = GaugeMetricFamily(
+            'flexlm_server_up',
+            'FlexLM Server erreichbar (1 = up, 0 = down)',
+            labels=['server']
+        )
+        feature_total = GaugeMetricFamily(
+            'flexlm_feature_total_licenses',
+            'Gesamtanzahl der verfügbaren Lizenzen pro Feature',
+            labels=['server', 'vendor', 'feature']
+        )
+        feature_used = GaugeMetricFamily(
+            'flexlm_feature_used_licenses',
+            'Anzahl der verwendeten Lizenzen pro Feature',
+            labels=['server', 'vendor', 'feature']
+        )
+        feature_available = GaugeMetricFamily(
+            'flexlm_feature_available_licenses',
+            'Anzahl der verfügbaren Lizenzen pro Feature',
+            labels=['server', 'vendor', 'feature']
+        )
+        location_users = GaugeMetricFamily(
+            'flexlm_location_users_total',
+            'Anzahl der Benutzer pro Standort',
+            labels=['server', 'location']
+        )
+        daemon_up = GaugeMetricFamily(
+            'flexlm_daemon_up',
+            'Status der License Daemons (1 = up, 0 = down)',
+            labels=['server', 'daemon', 'version']
+        )
+        scrape_duration = GaugeMetricFamily(
+            'flexlm_scrape_duration_seconds',
+            'Zeit für das Sammeln der Metriken',
+            labels=['server']
+        )
+        snapshot_age = GaugeMetricFamily(
+            'flexlm_snapshot_age_seconds',
+            'Alter des zuletzt gesammelten Snapshots in Sekunden',
+            labels=['server']
+        )
+        snapshot_timestamp = GaugeMetricFamily(
+            'flexlm_snapshot_timestamp_seconds',
+            'Zeitpunkt des zuletzt gesammelten Snapshots als Unix-Zeit',
+            labels=['server']
+        )
+        feature_expiry = GaugeMetricFamily(
+            'flexlm_feature_expiry_timestamp_seconds',
+            'Ablaufdatum der Lizenzen als Unix-Zeit (aus lmstat -i, unbefristete Lizenzen fehlen)',
+            labels=['server', 'vendor', 'feature', 'version']
+        )
+        feature_issued = GaugeMetricFamily(
+            'flexlm_feature_issued_licenses',
+            'Ausgestellte Lizenzen pro Feature-Version (aus lmstat -i)',
+            labels=['server', 'vendor', 'feature', 'version']
+        )
+        output_bytes = GaugeMetricFamily(
+            'flexlm_lmstat_output_bytes',
+            'Größe der letzten lmstat-Ausgabe in Zeichen (ohne --stream-lmutil)',
+            labels=['server']
+        )
+        inventory_age = GaugeMetricFamily(
+            'flexlm_inventory_age_seconds',
+            'Alter des zuletzt abgefragten Feature-Inventars in Sekunden',
+            labels=['server']
+        )
+        snapshot_stale = GaugeMetricFamily(
+            'flexlm_snapshot_stale',
+            'Letzter guter Snapshot wird weiter ausgeliefert, Server nicht erreichbar (1 = veraltet)',
+            labels=['server']
+        )
         
-        start_http_server(port)
+        # Metriken mit Benutzer-, Host- oder Standort-Labels laufen durch das Kardinalitäts-Budget
+        user_rows = []
+        location_rows = []
+        host_rows = []
         
-        # Initiale Metriken sammeln
-        self.collect_metrics()
+        now = time.time()
+        for server, snapshot in snapshots.items():
+            scrape_duration.add_metric([server], snapshot.duration)
+            snapshot_age.add_metric([server], snapshot.age(now))
+            snapshot_timestamp.add_metric([server], snapshot.created_at)
+            # Ohne Poll und ohne guten Stand (lmutil-Limit) ist der Zustand unbekannt - keine Serie statt 0
+            if not snapshot.skipped or snapshot.stale:
+                server_up.add_metric([server], 1 if snapshot.success and snapshot.server_up and not snapshot.stale else 0)
+            snapshot_stale.add_metric([server], 1 if snapshot.stale else 0)
+            
+            for daemon in snapshot.daemons:
+                daemon_up.add_metric([server, daemon.name, daemon.version], 1 if daemon.up else 0)
+            
+            for feature in snapshot.features:
+                labels = [server, feature.vendor, feature.name]
+                feature_total.add_metric(labels, feature.total)
+                feature_used.add_metric(labels, feature.used)
+                feature_available.add_metric(labels, feature.available)
+            
+            for user, count in snapshot.user_licenses:
+                user_rows.append(((server, user.vendor, user.feature, user.username, user.hostname,
+                                   user.display, user.location, user.department), count))
+            location_rows.extend(((server, location, feature_name), count)
+                                 for location, feature_name, count in snapshot.location_licenses)
+            host_rows.extend(((server, hostname, location), count)
+                             for hostname, location, count in snapshot.host_licenses)
+            
+            for location, count in snapshot.location_users:
+                location_users.add_metric([server, location], count)
         
-        # Kontinuierliche Aktualisierung in separatem Thread
-        def update_metrics():
-            while True:
-                time.sleep(30)  # Alle 30 Sekunden aktualisieren
-                self.collect_metrics()
+        yield from (server_up, feature_total, feature_used, feature_available)
+        # Benutzer Informationen (erweitert um Standort)
+        yield self._budgeted_family(
+            'flexlm_user_licenses',
+            'Anzahl der von einem Benutzer verwendeten Lizenzen',
+            ['server', 'vendor', 'feature', 'user', 'hostname', 'display', 'location', 'department'],
+            user_rows,
+            suppressed_series
+        )
+        # Standort-spezifische Metriken
+        yield self._budgeted_family(
+            'flexlm_location_licenses_total',
+            'Gesamtanzahl der Lizenzen pro Standort',
+            ['server', 'location', 'feature'],
+            location_rows,
+            suppressed_series
+        )
+        yield location_users
+        # Computer/Hostname Informationen
+        yield self._budgeted_family(
+            'flexlm_host_licenses_total',
+            'Gesamtanzahl der Lizenzen pro Host',
+            ['server', 'hostname', 'location'],
+            host_rows,
+            suppressed_series
+        )
+        for server, snapshot in snapshots.items():
+            if snapshot.output_bytes:
+                output_bytes.add_metric([server], snapshot.output_bytes)
+        yield from (daemon_up, scrape_duration, snapshot_age, snapshot_timestamp, snapshot_stale, output_bytes)
+        
+        for server, snapshot in snapshots.items():
+            if not snapshot.inventory_at:
+                continue
+            inventory_age.add_metric([server], time.time() - snapshot.inventory_at)
+            # Mehrere INCREMENT-Zeilen derselben Version: Anzahl addieren, frühestes Ablaufdatum
+            issued: Dict[Tuple[str, str, str], int] = {}
+            expiry: Dict[Tuple[str, str, str], float] = {}
+            for item in snapshot.inventory:
+                key = (item.vendor, item.name, item.version)
+                issued[key] = issued.get(key, 0) + item.licenses
+                if item.expires and (key not in expiry or item.expires < expiry[key]):
+                    expiry[key] = item.expires
+            for key, count in issued.items():
+                feature_issued.add_metric([server, *key], count)
+            for key, expires in expiry.items():
+                feature_expiry.add_metric([server, *key], expires)
+        yield from (feature_issued, feature_expiry, inventory_age)
+        
+        if self.cardinality:
+            suppressed = GaugeMetricFamily(
+                'flexlm_suppressed_series',
+                'Durch Top-N und Label-Verzicht beim letzten Scrape eingesparte Serien',
+                labels=['metric']
+            )
+            for family, count in sorted(suppressed_series.items()):
+                suppressed.add_metric([family], count)
+            yield suppressed
+
+    def render_probe(self, snapshot: LicenseSnapshot) -> Exposition:
+        """Rendert die Metriken eines einzelnen Probe-Snapshots"""
+        # Eigener Zähler für eingesparte Serien - /metrics bleibt unberührt
+        families = list(self._snapshot_metric_families({snapshot.server: snapshot}, suppressed_series={}))
+        families.append(GaugeMetricFamily(
+            'flexlm_probe_success',
+            'Probe erfolgreich (1 = Server erreichbar und UP, 0 auch bei veraltetem Snapshot)',
+            value=1 if snapshot.success and snapshot.server_up and not snapshot.stale else 0
+        ))
+        families.append(GaugeMetricFamily(
+            'flexlm_probe_duration_seconds',
+            'Dauer des lmutil-Aufrufs für diesen Probe',
+            value=snapshot.duration
+        ))
+        return render_exposition(StaticCollector(families))
+
+    def _budgeted_family(self, name: str, documentation: str, labelnames: List[str], rows: List,
+                         suppressed_series: Optional[Dict[str, int]] = None) -> GaugeMetricFamily:
+        """Erzeugt eine Metrik-Familie nach Anwendung des Kardinalitäts-Budgets"""
+        labelnames, rows = self.cardinality.apply(name, labelnames, rows, suppressed_series)
+        family = GaugeMetricFamily(name, documentation, labels=labelnames)
+        for labels, value in rows:
+            family.add_metric(labels, value)
+        return family
+
+    def _ad_metric_families(self):
+        """Metriken der gebündelten AD-Abfragen"""
+        totals = dict(self.ad_helper.batch_stats_total)
+        last = dict(self.ad_helper.last_batch_stats)
+        
+        lookups = CounterMetricFamily(
+            'flexlm_ad_lookups',
+            'AD-Benutzerabfragen nach Ergebnis (cache_hit, found, not_found, failed, stale, pending)',
+            labels=['result']
+        )
+        lookups.add_metric(['cache_hit'], totals['cache_hits'])
+        lookups.add_metric(['found'], totals['found'])
+        lookups.add_metric(['not_found'], totals['not_found'])
+        lookups.add_metric(['failed'], totals['failed'])
+        lookups.add_metric(['stale'], totals['stale'])
+        lookups.add_metric(['pending'], totals['pending'])
+        yield lookups
+        
+        # Hintergrund-Refresher
+        yield GaugeMetricFamily(
+            'flexlm_ad_refresh_queue',
+            'Benutzer, die auf die Auflösung durch den AD-Refresher warten',
+            value=self.ad_helper.refresh_queue_size()
+        )
+        yield CounterMetricFamily(
+            'flexlm_ad_refreshed_users',
+            'Vom AD-Refresher im Hintergrund gesuchte Benutzer (neue und bald ablaufende)',
+            value=self.ad_helper.refreshed_users
+        )
+        
+        yield CounterMetricFamily(
+            'flexlm_ad_ldap_searches',
+            'Anzahl der ausgeführten LDAP-Operationen (inkl. rootDSE-Abfrage)',
+            value=self.ad_helper.ldap_operations
+        )
+        if self.ad_helper.ldap_lookup_users:
+            yield GaugeMetricFamily(
+                'flexlm_ad_ldap_operations_per_lookup',
+                'Durchschnittliche Anzahl LDAP-Suchen pro im AD gesuchtem Benutzer',
+                value=self.ad_helper.ldap_lookup_operations / self.ad_helper.ldap_lookup_users
+            )
         
-        update_thread = threading.Thread(target=update_metrics, daemon=True)
-        update_thread.start()
+        # Vorab geladenes Verzeichnis
+        index = self.ad_helper.directory_index
+        if index is not None:
+            yield GaugeMetricFamily(
+                'flexlm_ad_directory_users',
+                'Benutzer im vorab geladenen AD-Verzeichnis',
+                value=len(index)
+            )
+            syncs = CounterMetricFamily(
+                'flexlm_ad_directory_syncs',
+                'Abgleiche des AD-Verzeichnisses (full = komplett geladen, incremental = über uSNChanged)',
+                labels=['mode']
+            )
+            for mode, count in self.ad_helper.directory_syncs.items():
+                syncs.add_metric([mode], count)
+            yield syncs
+            if index.synced_at is not None:
+                yield GaugeMetricFamily(
+                    'flexlm_ad_directory_sync_age_seconds',
+                    'Sekunden seit dem letzten Abgleich des AD-Verzeichnisses',
+                    value=max(0.0, time.time() - index.synced_at)
+                )
+        
+        # Connection Pool
+        if self.ad_helper.pool:
+            pool = self.ad_helper.pool.stats()
+            connections = GaugeMetricFamily(
+                'flexlm_ad_pool_connections',
+                'LDAP-Verbindungen im Pool nach Zustand',
+                labels=['state']
+            )
+            connections.add_metric(['idle'], pool['idle'])
+            connections.add_metric(['in_use'], pool['in_use'])
+            yield connections
+            yield CounterMetricFamily(
+                'flexlm_ad_pool_wait_seconds',
+                'Summe der Wartezeit auf eine freie LDAP-Verbindung',
+                value=pool['wait_seconds']
+            )
+            yield CounterMetricFamily(
+                'flexlm_ad_pool_acquisitions',
+                'Anzahl der aus dem Pool bezogenen LDAP-Verbindungen',
+                value=pool['acquisitions']
+            )
+            yield CounterMetricFamily(
+                'flexlm_ad_pool_reconnects',
+                'Neu aufgebaute LDAP-Verbindungen nach Abbruch oder fehlgeschlagenem Health-Check',
+                value=pool['reconnects']
+            )
+            yield CounterMetricFamily(
+                'flexlm_ad_pool_connect_failures',
+                'Fehlgeschlagene LDAP-Verbindungsaufbauten',
+                value=pool['connect_failures']
+            )
+        
+        # Cache-Zähler
+        cache = self.ad_helper.user_cache.stats()
+        hits = CounterMetricFamily(
+            'flexlm_ad_cache_hits',
+            'Treffer im AD-Cache (positive = Benutzer gefunden, negative = als nicht vorhanden gecacht)',
+            labels=['kind']
+        )
+        hits.add_metric(['positive'], cache['hits'])
+        hits.add_metric(['negative'], cache['negative_hits'])
+        yield hits
+        yield CounterMetricFamily(
+            'flexlm_ad_cache_misses',
+            'Fehlende oder abgelaufene Einträge im AD-Cache',
+            value=cache['misses']
+        )
+        yield CounterMetricFamily(
+            'flexlm_ad_cache_evictions',
+            'Wegen der Größenbegrenzung verdrängte Einträge im AD-Cache',
+            value=cache['evictions']
+        )
+        yield CounterMetricFamily(
+            'flexlm_ad_cache_expirations',
+            'Beim Aufräumen entfernte abgelaufene Einträge im AD-Cache',
+            value=cache['expirations']
+        )
+        yield GaugeMetricFamily(
+            'flexlm_ad_cache_entries',
+            'Aktuelle Anzahl der Einträge im AD-Cache',
+            value=cache['entries']
+        )
+        if last:
+            yield GaugeMetricFamily(
+                'flexlm_ad_batch_duration_seconds',
+                'Dauer der letzten gebündelten AD-Abfrage',
+                value=last['duration']
+            )
+
+    def start_collection(self):
+        """Startet die Hintergrund-Threads für lmutil-Polling und AD-Anreicherung"""
+        if self.location_map:
+            self.location_map.start()
+        # AD-Refresher zuerst: der Poll-Zyklus wartet dann nie auf das AD
+        if self.enable_ad and self.ad_helper and self.ad_helper.is_enabled():
+            self.ad_helper.start_refresher()
+        # Collection Engine pollt im eigenen Takt, Scrapes lesen nur den Snapshot
+        self.engine.start()
+
+    def start_server(self, port: int = 9090, poll_targets: bool = True):
+        """
+        Startet den HTTP Server für Prometheus Metriken.
+        Mit poll_targets=False werden License Server nur über /probe abgefragt.
+        """
+        logger.info(f"Starte FlexLM Exporter auf Port {port}")
+        logger.info(f"Metriken verfügbar unter: http://localhost:{port}/metrics (/health, /ready, /probe)")
+        
+        if poll_targets:
+            logger.info(f"Überwachung von FlexLM Server: {', '.join(t.label for t in self.targets)}")
+            # /ready meldet sich erst, wenn der erste Snapshot vorliegt
+            ready = lambda: bool(self.engine.snapshots)
+        else:
+            logger.info("Nur /probe: License Server kommen aus der Service Discovery")
+            ready = None
+        server = start_metrics_server(port, self.exposition, ready=ready, probe=self.probe)
+        
+        if poll_targets:
+            self.start_collection()
+        elif self.location_map:
+            self.location_map.start()
         
         logger.info("FlexLM Exporter gestartet. Drücken Sie Ctrl+C zum Beenden.")
         
@@ -465,6 +1247,14 @@ class FlexLMExporter:
             while True:
                 time.sleep(1)
         except KeyboardInterrupt:
+            stop_metrics_server(server)
+            self.engine.stop(timeout=5)
+            if self._feature_executor:
+                self._feature_executor.shutdown(wait=False)
+            if self.ad_helper:
+                self.ad_helper.close()
+            if self.location_map:
+                self.location_map.stop(timeout=1)
             logger.info("FlexLM Exporter beendet.")
 
 
@@ -481,6 +1271,15 @@ def main():
                        help='Port für den Prometheus Exporter (default: 9090)')
     parser.add_argument('--lmutil-path', default=r'C:\Temp\SolidWorks_Exporter\FlexLM_Export\lmutil.exe',
                        help='Pfad zur lmutil Binary (default: C:\\Temp\\SolidWorks_Exporter\\FlexLM_Export\\lmutil.exe)')
+    parser.add_argument('--target', action='append', dest='targets', metavar='PORT@HOST',
+                       help='License Server als port@host, mehrfach angebbar '
+                            '(ersetzt --license-server/--license-port)')
+    parser.add_argument('--max-workers', type=int, default=8,
+                       help='Maximale Anzahl parallel gepollter License Server (default: 8)')
+    parser.add_argument('--stream-lmutil', action='store_true',
+                       help='lmutil-Ausgabe zeilenweise aus dem Pipe parsen statt komplett zu puffern')
+    parser.add_argument('--update-interval', type=float, default=30.0,
+                       help='Poll-Intervall für lmutil in Sekunden, unabhängig von Scrapes (default: 30)')
     parser.add_argument('--verbose', '-v', action='store_true',
                        help='Verbose Logging aktivieren')
     
@@ -495,9 +1294,66 @@ def main():
                        help='AD Benutzername für explizite Anmeldung (optional)')
     parser.add_argument('--ad-password', type=str,
                        help='AD Passwort für explizite Anmeldung (optional)')
+    parser.add_argument('--ad-cache-file', type=str,
+                       help='SQLite-Datei für den persistenten AD-Cache (default: cache_file aus ad_config.ini, '
+                            'leer = nur im Speicher)')
+    
+    parser.add_argument('--location-rules', type=str,
+                       help='JSON-Datei mit Hostname-Mustern und CIDR-Netzen für den Standort der Rechner')
+    parser.add_argument('--location-map', type=str,
+                       help='CSV- oder JSON-Datei mit Standorten für Benutzer und Hosts '
+                            '(wird bei Änderungen automatisch neu geladen)')
+    
+    # Kardinalitäts-Budget
+    parser.add_argument('--top-n', action='append', default=[], metavar='METRIK=N',
+                       help='Nur die N Benutzer/Hosts/Standorte mit den meisten Lizenzen behalten, '
+                            'Rest als "other", z.B. flexlm_user_licenses=200 (mehrfach angebbar)')
+    parser.add_argument('--drop-label', action='append', default=[], metavar='METRIK=LABEL',
+                       help='Label einer Metrik weglassen, z.B. flexlm_user_licenses=display (mehrfach angebbar)')
+    
+    # Probe-Betrieb (Blackbox-Exporter-Stil)
+    parser.add_argument('--probe-only', action='store_true',
+                       help='Keine License Server im Hintergrund pollen, nur /probe?target=port@host beantworten')
+    parser.add_argument('--probe-min-interval', type=float, default=30.0,
+                       help='Mindestabstand zwischen zwei lmutil-Aufrufen pro Probe-Target in Sekunden (default: 30)')
+    parser.add_argument('--probe-concurrency', type=int, default=4,
+                       help='Maximale Anzahl gleichzeitiger Probe-Polls (default: 4)')
+    
+    parser.add_argument('--lmstat-rate', type=float, default=12.0,
+                       help='Maximale lmstat-Aufrufe pro Minute und License Server, 0 = unbegrenzt (default: 12)')
+    parser.add_argument('--lmstat-burst', type=float, default=4.0,
+                       help='Maximal direkt hintereinander erlaubte Aufrufe pro License Server (default: 4)')
+    
+    parser.add_argument('--breaker-threshold', type=int, default=3,
+                       help='Fehlschläge in Folge, nach denen ein License Server übersprungen wird (default: 3)')
+    parser.add_argument('--breaker-max-backoff', type=float, default=600.0,
+                       help='Maximaler Abstand der Erreichbarkeitsprüfungen in Sekunden (default: 600)')
+    
+    parser.add_argument('--active-only', action='store_true',
+                       help='Mit lmstat -A nur Features in Benutzung pollen, ruhende Features aus einem selteneren lmstat -a')
+    parser.add_argument('--full-interval', type=float, default=600.0,
+                       help='Intervall für das vollständige lmstat -a im Active-Only-Modus in Sekunden (default: 600)')
+    parser.add_argument('--inventory-interval', type=float, default=3600.0,
+                       help='Intervall für lmstat -i (Versionen, Ablaufdaten) in Sekunden, 0 = aus (default: 3600)')
+    
+    # Feature- und Vendor-Filter
+    parser.add_argument('--feature', action='append', default=[], metavar='MUSTER',
+                       help='Nur diese Features überwachen (Glob oder re:Ausdruck, mehrfach angebbar)')
+    parser.add_argument('--exclude-feature', action='append', default=[], metavar='MUSTER',
+                       help='Features ausschließen (Glob oder re:Ausdruck, mehrfach angebbar)')
+    parser.add_argument('--vendor', action='append', default=[], metavar='MUSTER',
+                       help='Nur Features dieser Vendor Daemons überwachen (mehrfach angebbar)')
+    parser.add_argument('--exclude-vendor', action='append', default=[], metavar='MUSTER',
+                       help='Vendor Daemons ausschließen (mehrfach angebbar)')
     
     args = parser.parse_args()
     
+    try:
+        cardinality = CardinalityBudget.parse(args.top_n, args.drop_label)
+        feature_filter = FeatureFilter(args.feature, args.exclude_feature, args.vendor, args.exclude_vendor)
+    except ValueError as e:
+        parser.error(str(e))
+    
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
     
@@ -517,10 +1373,29 @@ def main():
         enable_ad=enable_ad,
         ad_server=args.ad_server,
         ad_username=args.ad_username,
-        ad_password=args.ad_password
+        ad_password=args.ad_password,
+        update_interval=args.update_interval,
+        targets=args.targets,
+        registry=REGISTRY,
+        max_workers=args.max_workers,
+        streaming=args.stream_lmutil,
+        ad_cache_file=args.ad_cache_file,
+        location_map_file=args.location_map,
+        location_rules_file=args.location_rules,
+        cardinality=cardinality,
+        probe_min_interval=args.probe_min_interval,
+        probe_concurrency=args.probe_concurrency,
+        lmstat_rate=args.lmstat_rate,
+        lmstat_burst=args.lmstat_burst,
+        breaker_threshold=args.breaker_threshold,
+        breaker_max_backoff=args.breaker_max_backoff,
+        inventory_interval=args.inventory_interval,
+        active_only=args.active_only,
+        full_interval=args.full_interval,
+        feature_filter=feature_filter
     )
     
-    exporter.start_server(args.exporter_port)
+    exporter.start_server(args.exporter_port, poll_targets=not args.probe_only)
 
 
 if __name__ == '__main__':
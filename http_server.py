@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+HTTP-Server für den FlexLM Exporter
+Ein Thread pro Verbindung, HTTP/1.1 mit Keep-Alive und Timeout pro
+Verbindung - ein langsamer Client hält andere Scraper nicht auf.
+
+Endpunkte (keiner ruft lmutil auf):
+    /metrics  vorgerenderte Ausgabe des ExpositionCache, gzip-komprimiert für
+              Clients mit `Accept-Encoding: gzip` (q=0 schließt gzip aus), ETag für
+              `If-None-Match` -> 304 (schwacher Vergleich, `*` passt immer)
+    /health   200, solange der Prozess Anfragen beantwortet
+    /ready    200 sobald der erste Snapshot vorliegt, vorher 503
+    /probe    `?target=port@host` pollt einen License Server bei Bedarf (siehe probe.py)
+
+Anzahl und Dauer der Anfragen pro Pfad werden als Metriken ausgegeben.
+"""
+
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from prometheus_client import Counter, Histogram
+
+from collection_engine import LicenseTarget
+from exposition import Exposition, ExpositionCache
+from probe import ProbeBusy, ProbeCache
+
+logger = logging.getLogger(__name__)
+
+# Sekunden ohne Daten, nach denen eine (Keep-Alive-)Verbindung geschlossen wird
+REQUEST_TIMEOUT = 30.0
+
+# Bekannte Pfade - alle übrigen werden als "other" gezählt, damit Scans die Labels nicht aufblähen
+PATHS = ('/metrics', '/health', '/ready', '/probe')
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Beantwortet /metrics, /health und /ready"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        # Timeout gilt für jedes Lesen und Schreiben auf der Verbindung
+        self.timeout = self.server.request_timeout
+        super().setup()
+
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
+
+    def do_GET(self):
+        start = time.perf_counter()
+        self._status = 0
+        url = urlsplit(self.path)
+        path = url.path
+        if path == '/':
+            path = '/metrics'
+        try:
+            if path == '/metrics':
+                self._send_exposition(self.server.exposition.get())
+            elif path == '/probe' and self.server.probe is not None:
+                self._send_probe(parse_qs(url.query).get('target', []))
+            elif path == '/health':
+                self._send_text(200, b'OK\n')
+            elif path == '/ready':
+                if self.server.ready():
+                    self._send_text(200, b'OK\n')
+                else:
+                    self._send_text(503, b'Noch kein Snapshot vorhanden\n')
+            else:
+                self.send_error(404)
+        finally:
+            self.server.observe(path, self._status, time.perf_counter() - start)
+
+    def _send_text(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_probe(self, targets):
+        if len(targets) != 1:
+            self._send_text(400, b'Genau ein Parameter target=port@host erforderlich\n')
+            return
+        try:
+            target = LicenseTarget.parse(targets[0])
+        except ValueError as e:
+            self._send_text(400, f"{e}\n".encode())
+            return
+        try:
+            result = self.server.probe.probe(target)
+        except ProbeBusy as e:
+            self._send_text(503, f"{e}\n".encode())
+            return
+        self._send_exposition(result.exposition)
+
+    def _send_exposition(self, exposition: Exposition):
+        if self._etag_matches(exposition.etag):
+            self.send_response(304)
+            self.send_header('ETag', exposition.etag)
+            self.end_headers()
+            return
+
+        accepts_gzip = self._accepts_gzip()
+        body = exposition.gzip if accepts_gzip else exposition.plain
+        self.send_response(200)
+        self.send_header('Content-Type', exposition.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', exposition.etag)
+        self.send_header('Vary', 'Accept-Encoding')
+        if accepts_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _header_values(self, name: str):
+        """Kommagetrennte Werte eines Headers als Liste von (Wert, Parameter-Dict)"""
+        values = []
+        for item in self.headers.get(name, '').split(','):
+            value, *params = item.split(';')
+            value = value.strip()
+            if not value:
+                continue
+            parameters = {}
+            for param in params:
+                key, _, param_value = param.partition('=')
+                parameters[key.strip().lower()] = param_value.strip()
+            values.append((value, parameters))
+        return values
+
+    def _accepts_gzip(self) -> bool:
+        """gzip akzeptiert, wenn gzip (oder sonst *) mit q > 0 angeboten wird - q=0 heißt 'nicht erlaubt'"""
+        weights = {}
+        for coding, parameters in self._header_values('Accept-Encoding'):
+            try:
+                weights[coding.lower()] = float(parameters.get('q', '1'))
+            except ValueError:
+                weights[coding.lower()] = 0.0
+        weight = weights.get('gzip', weights.get('*', 0.0))
+        return weight > 0
+
+    def _etag_matches(self, etag: str) -> bool:
+        """If-None-Match mit schwachem Vergleich: * passt immer, W/"..." wie "..." """
+        for tag, _ in self._header_values('If-None-Match'):
+            if tag == '*' or tag.removeprefix('W/') == etag:
+                return True
+        return False
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """
+    HTTP-Server mit einem Thread pro Verbindung.
+    Als Collector registriert liefert er die eigenen Anfrage-Metriken; da
+    /metrics pro Snapshot gerendert wird, zeigen sie den Stand beim Rendern.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, exposition: ExpositionCache, ready: Optional[Callable[[], bool]] = None,
+                 request_timeout: float = REQUEST_TIMEOUT, probe: Optional[ProbeCache] = None):
+        self.exposition = exposition
+        self.probe = probe
+        self.ready = ready or (lambda: True)
+        self.request_timeout = request_timeout
+        self.requests = Counter(
+            'flexlm_http_requests_total',
+            'HTTP-Anfragen an den Exporter nach Pfad und Status',
+            ['path', 'code'],
+            registry=None
+        )
+        self.request_duration = Histogram(
+            'flexlm_http_request_duration_seconds',
+            'Dauer der HTTP-Anfragen an den Exporter nach Pfad',
+            ['path'],
+            buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+            registry=None
+        )
+        super().__init__(address, MetricsHandler)
+
+    def observe(self, path: str, status: int, duration: float):
+        """Zählt eine beantwortete Anfrage"""
+        if path not in PATHS:
+            path = 'other'
+        self.requests.labels(path=path, code=str(status)).inc()
+        self.request_duration.labels(path=path).observe(duration)
+
+    def collect(self):
+        yield from self.requests.collect()
+        yield from self.request_duration.collect()
+
+
+def start_metrics_server(port: int, exposition: ExpositionCache, addr: str = '',
+                         ready: Optional[Callable[[], bool]] = None,
+                         request_timeout: float = REQUEST_TIMEOUT,
+                         probe: Optional[ProbeCache] = None) -> MetricsServer:
+    """Startet den Server in einem Hintergrund-Thread und registriert seine Metriken"""
+    server = MetricsServer((addr, port), exposition, ready=ready, request_timeout=request_timeout,
+                           probe=probe)
+    exposition.registry.register(server)
+    thread = threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True)
+    thread.start()
+    return server
+
+
+def stop_metrics_server(server: MetricsServer):
+    """Beendet den Server und entfernt seine Metriken aus der Registry"""
+    server.shutdown()
+    server.server_close()
+    server.exposition.registry.unregister(server)
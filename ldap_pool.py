@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Connection Pool für LDAP-Verbindungen
+Hält eine kleine Anzahl gebundener Verbindungen, prüft länger ungenutzte
+Verbindungen vor der Verwendung und baut abgebrochene Verbindungen
+transparent neu auf. Schlägt der Neuaufbau fehl, wird mit exponentiellem
+Backoff gewartet, statt den Domain Controller bei jeder Abfrage erneut
+anzusprechen.
+"""
+
+import time
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LdapPoolUnavailable(Exception):
+    """Es konnte keine gebundene Verbindung bereitgestellt werden"""
+
+
+class LdapConnectionPool:
+    """
+    Pool gebundener LDAP-Verbindungen.
+
+    `factory` liefert eine neue, gebundene Verbindung oder wirft eine
+    Exception. Verbindungen werden erst bei Bedarf bis `size` aufgebaut.
+    Eine Verbindung wird immer nur von einem Thread gleichzeitig benutzt,
+    dadurch laufen bis zu `size` Abfragen parallel.
+    """
+
+    def __init__(self, factory: Callable[[], Any], size: int = 4,
+                 health_check_interval: float = 60, initial_backoff: float = 1,
+                 max_backoff: float = 60, clock: Callable[[], float] = time.monotonic):
+        self.factory = factory
+        self.size = max(1, size)
+        self.health_check_interval = health_check_interval
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self._clock = clock
+        self._idle: 'queue.LifoQueue' = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._broken = 0  # verworfene Verbindungen, deren Neuaufbau als Reconnect zählt
+        self._backoff = 0.0
+        self._next_attempt = 0.0
+
+        self.in_use = 0
+        self.connects = 0
+        self.reconnects = 0
+        self.connect_failures = 0
+        self.health_check_failures = 0
+        self.acquisitions = 0
+        self.wait_seconds = 0.0
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """
+        Stellt eine gebundene Verbindung für die Dauer des with-Blocks bereit.
+        Wirft der Block eine Exception, wird die Verbindung verworfen und bei
+        der nächsten Anforderung neu aufgebaut.
+        """
+        start = self._clock()
+        if not self._slots.acquire(timeout=timeout):
+            raise LdapPoolUnavailable(f"Keine freie LDAP-Verbindung innerhalb von {timeout}s")
+        waited = self._clock() - start
+
+        try:
+            conn = self._checkout()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self.acquisitions += 1
+            self.wait_seconds += waited
+            self.in_use += 1
+
+        try:
+            yield conn
+        except Exception:
+            self._discard(conn)
+            conn = None
+            raise
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            if conn is not None:
+                self._idle.put((conn, self._clock()))
+            self._slots.release()
+
+    def run(self, operation: Callable[[Any], Any], timeout: Optional[float] = None) -> Any:
+        """
+        Führt `operation(connection)` aus. Bricht die Verbindung dabei ab,
+        wird die Operation einmal auf einer neu aufgebauten Verbindung wiederholt.
+        """
+        try:
+            with self.connection(timeout) as conn:
+                return operation(conn)
+        except LdapPoolUnavailable:
+            raise
+        except Exception as e:
+            logger.debug(f"LDAP-Operation fehlgeschlagen, neuer Versuch mit neuer Verbindung: {e}")
+        with self.connection(timeout) as conn:
+            return operation(conn)
+
+    def _checkout(self):
+        """Holt eine geprüfte Verbindung aus dem Pool oder baut eine neue auf"""
+        while True:
+            try:
+                conn, returned_at = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if self._is_healthy(conn, returned_at):
+                return conn
+            self._discard(conn)
+
+    def _is_healthy(self, conn, returned_at: float) -> bool:
+        """Prüft eine Verbindung aus dem Pool; länger ungenutzte werden per rootDSE-Abfrage getestet"""
+        if getattr(conn, 'closed', False) or not getattr(conn, 'bound', True):
+            self.health_check_failures += 1
+            return False
+        if self._clock() - returned_at < self.health_check_interval:
+            return True
+        try:
+            if conn.search(search_base="", search_filter="(objectClass=*)", search_scope="BASE"):
+                return True
+        except Exception as e:
+            logger.debug(f"LDAP-Verbindung hat den Health-Check nicht bestanden: {e}")
+        self.health_check_failures += 1
+        return False
+
+    def _connect(self):
+        """Baut eine neue Verbindung auf - mit Backoff nach fehlgeschlagenen Versuchen"""
+        now = self._clock()
+        with self._lock:
+            if now < self._next_attempt:
+                raise LdapPoolUnavailable(
+                    f"LDAP-Verbindungsaufbau pausiert noch {self._next_attempt - now:.1f}s")
+
+        try:
+            conn = self.factory()
+        except Exception as e:
+            with self._lock:
+                self.connect_failures += 1
+                self._backoff = min(self.max_backoff, max(self.initial_backoff, self._backoff * 2))
+                self._next_attempt = self._clock() + self._backoff
+            logger.warning(f"LDAP-Verbindung fehlgeschlagen, nächster Versuch in {self._backoff:.0f}s: {e}")
+            raise LdapPoolUnavailable(str(e)) from e
+
+        with self._lock:
+            self._backoff = 0.0
+            self._next_attempt = 0.0
+            self.connects += 1
+            if self._broken:
+                self._broken -= 1
+                self.reconnects += 1
+        return conn
+
+    def _discard(self, conn):
+        """Verwirft eine defekte Verbindung"""
+        with self._lock:
+            self._broken = min(self.size, self._broken + 1)
+        self._unbind(conn)
+
+    @staticmethod
+    def _unbind(conn):
+        """Trennt eine Verbindung, Fehler dabei werden ignoriert"""
+        try:
+            conn.unbind()
+        except Exception:
+            pass
+
+    def close(self):
+        """Schließt alle ungenutzten Verbindungen"""
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._unbind(conn)
+
+    def stats(self) -> Dict[str, float]:
+        """Zählerstände für die Prometheus-Metriken"""
+        with self._lock:
+            return {
+                'size': self.size,
+                'idle': self._idle.qsize(),
+                'in_use': self.in_use,
+                'connects': self.connects,
+                'reconnects': self.reconnects,
+                'connect_failures': self.connect_failures,
+                'health_check_failures': self.health_check_failures,
+                'acquisitions': self.acquisitions,
+                'wait_seconds': self.wait_seconds
+            }
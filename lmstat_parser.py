@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Parser für die Ausgabe von `lmutil lmstat`
+Single-Pass State Machine über einen vorkompilierten Gesamt-Ausdruck:
+ein einziger finditer-Lauf über den Ausgabepuffer liefert nur die
+relevanten Zeilen, die Verzweigung erfolgt über den Namen der Treffergruppe.
+
+Für den Streaming-Betrieb speist parse_lmstat_lines dieselbe State Machine
+zeilenweise aus einem Iterator (z.B. dem stdout-Pipe von lmutil).
+
+parse_lmstat_inventory liest die Feature-Tabelle von `lmstat -i`
+(Versionen, Anzahl und Ablaufdatum der Lizenzen).
+
+Mit einem `feature_filter` (siehe feature_filter.FeatureFilter) werden
+unerwünschte Features und Vendor Daemons schon beim Parsen verworfen - die
+Benutzer-Zeilen ausgefilterter Features durchlaufen keinen Python-Code mehr.
+Ruhende Features haben in `lmstat -a` keine vendor-Zeile; `feature_vendors`
+(Feature -> Vendor, z.B. aus `lmstat -i`) ordnet sie trotzdem zu.
+"""
+
+import re
+import calendar
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional
+
+# Ein Ausdruck für alle relevanten Zeilentypen. Jede Alternative ist in eine
+# äußere benannte Gruppe gekapselt, damit `match.lastgroup` den Zeilentyp liefert.
+# Zeilen ohne Treffer (Leerzeilen, Lizenzdatei-Pfade, ...) werden vom Regex-Engine
+# übersprungen, ohne dass Python-Code für sie läuft.
+LMSTAT_PATTERN = re.compile(r'''
+    ^(?:
+        # "Users of SOLIDWORKS:  (Total of 10 licenses issued;  Total of 3 licenses in use)"
+        [ \t]*(?P<FEATURE>Users\ of\ (?P<feature>\w+):[ \t]+
+            \(Total\ of\ (?P<total>\d+)\ licenses?\ issued;[ \t]+
+            Total\ of\ (?P<used>\d+)\ licenses?\ in\ use\))
+        # "Users of X:  (Uncounted, node-locked)" o.ä. - beendet den Benutzer-Bereich
+      | [ \t]*(?P<USERS_OF>Users\ of\ )
+        # "    user1 WORKSTATION-01 WORKSTATION-01 (v2023.0400) (localhost/27000 1234), start ..."
+      | (?P<USER>[ \t]+(?P<username>\S+)[ \t]+(?P<hostname>\S+)[ \t]+(?P<display>\S+)[ \t]+
+            \([^)\n]+\)[ \t]+\([^)\n]+[ \t]\d+\))
+        # '  "SOLIDWORKS" v2023.0400, vendor: SolidWorksNetworkLicense' - Vendor des aktuellen Features
+      | [ \t]*(?P<VENDOR>"[^"\n]+"[ \t]+v\S+,[ \t]+vendor:[ \t]+(?P<vendor>[^\s,]+))
+        # Status-Informationen können an beliebiger Stelle der Zeile stehen
+      | [^\n]*?(?:
+            (?P<UP>license\ server\ UP)
+          | (?P<DOWN>Cannot\ connect\ to\ license\ server)
+          | (?P<DAEMON>(?P<daemon>\w+):\ UP\ v(?P<version>[0-9.]+))
+        )
+    )
+''', re.MULTILINE | re.VERBOSE)
+
+
+def parse_lmstat(output: str, feature_filter=None, feature_vendors: Optional[Mapping[str, str]] = None) -> Dict:
+    """Parsed die Ausgabe von lmstat -a in einem Durchlauf"""
+    return _parse_matches(LMSTAT_PATTERN.finditer(output), feature_filter, feature_vendors)
+
+
+def parse_lmstat_lines(lines: Iterable[str], feature_filter=None,
+                       feature_vendors: Optional[Mapping[str, str]] = None) -> Dict:
+    """
+    Parsed lmstat -a zeilenweise aus einem beliebigen Iterator.
+    Die Zeilen werden erst beim Weiterlesen angefordert - bei einem Pipe
+    läuft das Parsen also parallel zur Ausgabe von lmutil, und die
+    Rohausgabe wird nie vollständig im Speicher gehalten.
+    """
+    return _parse_matches(iter_lmstat_matches(lines), feature_filter, feature_vendors)
+
+
+def iter_lmstat_matches(lines: Iterable[str]) -> Iterator[re.Match]:
+    """Generator: liefert für jede relevante Zeile den Treffer, irrelevante Zeilen werden verworfen"""
+    match_line = LMSTAT_PATTERN.match
+    for line in lines:
+        match = match_line(line)
+        if match is not None:
+            yield match
+
+
+def _parse_matches(matches: Iterable[re.Match], feature_filter=None,
+                   feature_vendors: Optional[Mapping[str, str]] = None) -> Dict:
+    """State Machine über die Treffer von LMSTAT_PATTERN"""
+    data = {
+        'server_status': False,
+        'daemons': [],
+        'features': [],
+        'users': []
+    }
+    daemons = data['daemons']
+    features = data['features']
+    users = data['users']
+
+    current_feature = None
+    current_users = None
+
+    for match in matches:
+        kind = match.lastgroup
+
+        if kind == 'USER':
+            # Benutzer-Zeilen zählen nur innerhalb eines Feature-Blocks
+            if current_feature is not None:
+                username, hostname, display = match.group('username', 'hostname', 'display')
+                user_info = {
+                    'username': username,
+                    'hostname': hostname,
+                    'display': display,
+                    'feature': current_feature['name']
+                }
+                current_users.append(user_info)
+                users.append(user_info)
+
+        elif kind == 'FEATURE':
+            name, total, used = match.group('feature', 'total', 'used')
+            vendor = feature_vendors.get(name, '') if feature_vendors else ''
+            if feature_filter is not None and not (feature_filter.allows_feature(name)
+                                                   and feature_filter.allows_vendor(vendor)):
+                # Benutzer-Zeilen dieses Features werden übersprungen
+                current_feature = None
+                current_users = None
+                continue
+            total = int(total)
+            used = int(used)
+            current_users = []
+            current_feature = {
+                'name': name,
+                'vendor': vendor,
+                'total': total,
+                'used': used,
+                'available': total - used,
+                'users': current_users
+            }
+            features.append(current_feature)
+
+        elif kind == 'VENDOR':
+            if current_feature is not None:
+                vendor = match.group('vendor')
+                current_feature['vendor'] = vendor
+                if feature_filter is not None and not feature_filter.allows_vendor(vendor):
+                    # Feature samt bereits gelesener Benutzer wieder verwerfen
+                    features.pop()
+                    if current_users:
+                        del users[-len(current_users):]
+                    current_feature = None
+                    current_users = None
+
+        elif kind == 'USERS_OF':
+            # Neues Feature ohne verwertbare Zahlen - beende aktuellen Benutzer-Bereich
+            current_feature = None
+            current_users = None
+
+        elif kind == 'DAEMON':
+            if feature_filter is not None and not feature_filter.allows_vendor(match.group('daemon')):
+                continue
+            daemons.append({
+                'name': match.group('daemon'),
+                'status': 'UP',
+                'version': match.group('version')
+            })
+
+        elif kind == 'UP':
+            data['server_status'] = True
+
+        elif kind == 'DOWN':
+            data['server_status'] = False
+
+    return data
+
+
+# Kopfzeile von `lmstat -i` - Reihenfolge der Spalten unterscheidet sich je nach lmutil-Version
+INVENTORY_HEADER = re.compile(r'^[ \t]*Feature[ \t]+Version[ \t]', re.MULTILINE)
+INVENTORY_COLUMNS = {'feature': 'name', 'version': 'version', '#licenses': 'licenses',
+                     'vendor': 'vendor', 'expires': 'expires'}
+EXPIRY_DATE = re.compile(r'^(\d{1,2})-([a-z]{3})-(\d{1,4})$', re.IGNORECASE)
+MONTHS = {name: number for number, name in enumerate(
+    ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'), start=1)}
+
+
+def parse_expiry(value: str) -> float:
+    """
+    Ablaufdatum aus `lmstat -i` (z.B. "31-dec-2025") als Unix-Zeit (00:00 UTC).
+    Unbefristete Lizenzen ("permanent", Jahr 0) und unbekannte Angaben liefern 0.
+    """
+    match = EXPIRY_DATE.match(value.strip())
+    if match is None:
+        return 0.0
+    day, month, year = int(match.group(1)), MONTHS.get(match.group(2).lower()), int(match.group(3))
+    if month is None or year == 0:
+        return 0.0
+    try:
+        return float(calendar.timegm((year, month, day, 0, 0, 0)))
+    except (ValueError, OverflowError):
+        return 0.0
+
+
+def parse_lmstat_inventory(output: str) -> List[Dict]:
+    """
+    Parsed die Feature-Tabelle von `lmstat -i` (eine Zeile pro INCREMENT/FEATURE).
+    Die Spalten werden über die Kopfzeile zugeordnet; Zeilen mit abweichender
+    Spaltenzahl (Meldungen, Trennlinien) werden übersprungen.
+    """
+    header = INVENTORY_HEADER.search(output)
+    if header is None:
+        return []
+    lines = output[header.start():].splitlines()
+    columns = [INVENTORY_COLUMNS.get(column.lower()) for column in lines[0].split()]
+    entries = []
+    for line in lines[1:]:
+        fields = line.split()
+        if len(fields) != len(columns) or fields[0].startswith('_'):
+            continue
+        entry = {column: value for column, value in zip(columns, fields) if column}
+        licenses = entry.get('licenses', '0')
+        if licenses.isdigit():
+            entry['licenses'] = int(licenses)
+        elif licenses.lower() == 'uncounted':
+            entry['licenses'] = 0
+        else:
+            continue
+        entry['expires'] = parse_expiry(entry.get('expires', ''))
+        entry.setdefault('vendor', '')
+        entry.setdefault('version', '')
+        entries.append(entry)
+    return entries
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Schutz der License Server vor zu vielen lmutil-Aufrufen
+FlexLM-Server protokollieren und drosseln Clients mit vielen lmstat-
+Abfragen. Gleichzeitige identische Aufrufe (gleiche Argumente) teilen sich
+deshalb ein Ergebnis (Single-Flight), und pro License Server begrenzt ein
+Token Bucket die Anzahl der Aufrufe pro Zeit.
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class LmutilThrottled(Exception):
+    """Kein Token innerhalb der maximalen Wartezeit - der Aufruf entfällt"""
+
+
+class SingleFlight:
+    """Gleichzeitige Aufrufe mit demselben Schlüssel warten auf das Ergebnis des ersten"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """Führt fn aus oder wartet auf den laufenden Aufruf; liefert (Ergebnis, zusammengefasst)"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+class TokenBucket:
+    """
+    `rate` Tokens pro Sekunde, höchstens `burst` angespart.
+    Ein Aufruf verbraucht ein Token; fehlt es, wird bis `timeout` gewartet.
+    """
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Verbraucht ein Token, falls vorhanden, sonst Sekunden bis zum nächsten (unter Lock)"""
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout: float) -> Optional[float]:
+        """Wartet auf ein Token; liefert die Wartezeit oder None, wenn `timeout` nicht reicht"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                delay = self._reserve()
+            if delay == 0:
+                return waited
+            if waited + delay > timeout:
+                return None
+            self._sleep(delay)
+            waited += delay
+
+
+class LmutilGuard:
+    """
+    Single-Flight pro Aufruf und Token Bucket pro License Server.
+
+    Zusammengefasste Aufrufe verbrauchen kein Token. `rate_per_minute` <= 0
+    schaltet die Begrenzung ab. Zähler pro Server: executed, coalesced,
+    throttled (musste auf ein Token warten), rejected (Wartezeit überschritten).
+    """
+
+    def __init__(self, rate_per_minute: float = 12.0, burst: float = 4.0, max_wait: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.rate_per_minute = rate_per_minute
+        self.burst = max(1.0, burst)
+        self.max_wait = max_wait
+        self._clock = clock
+        self._sleep = sleep
+        self._flight = SingleFlight()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, server: str, result: str):
+        with self._lock:
+            counts = self.stats.setdefault(server, dict.fromkeys(
+                ('executed', 'coalesced', 'throttled', 'rejected'), 0))
+            counts[result] += 1
+
+    def _bucket(self, server: str) -> Optional[TokenBucket]:
+        if self.rate_per_minute <= 0:
+            return None
+        with self._lock:
+            bucket = self._buckets.get(server)
+            if bucket is None:
+                bucket = self._buckets[server] = TokenBucket(self.rate_per_minute / 60.0, self.burst,
+                                                             clock=self._clock, sleep=self._sleep)
+            return bucket
+
+    def forget(self, server: str):
+        """Entfernt Token Bucket und Zähler eines Servers, der nicht mehr abgefragt wird"""
+        with self._lock:
+            self._buckets.pop(server, None)
+            self.stats.pop(server, None)
+
+    def run(self, server: str, key: Hashable, fn: Callable[[], T]) -> T:
+        """Führt einen lmutil-Aufruf für `server` geschützt aus"""
+        result, coalesced = self._flight.do((server, key), lambda: self._limited(server, fn))
+        if coalesced:
+            self._count(server, 'coalesced')
+        return result
+
+    def _limited(self, server: str, fn: Callable[[], T]) -> T:
+        bucket = self._bucket(server)
+        if bucket is not None:
+            waited = bucket.acquire(self.max_wait)
+            if waited is None:
+                self._count(server, 'rejected')
+                raise LmutilThrottled(f"lmutil-Limit für {server} erreicht "
+                                      f"({self.rate_per_minute:g}/min, Burst {self.burst:g})")
+            if waited > 0:
+                self._count(server, 'throttled')
+                logger.info(f"⏳ lmutil-Aufruf für {server} um {waited:.1f}s verzögert (Rate-Limit)")
+        self._count(server, 'executed')
+        return fn()
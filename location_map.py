@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Statische Standort-Zuordnung aus CSV- oder JSON-Datei
+Alternative Quelle für Standort und Abteilung, z.B. auf Hosts ohne Domain.
+Die Datei wird in kompakte Dictionaries geladen und im Hintergrund
+atomar neu geladen, sobald sich ihr Änderungszeitpunkt ändert. Abfragen
+lesen nur den aktuellen Stand und führen nie Datei-I/O aus.
+
+CSV-Format (Kopfzeile erforderlich, `department` optional):
+
+    type,name,location,department
+    user,mmueller,Stuttgart,Konstruktion
+    host,WORKSTATION-01,Stuttgart,
+
+JSON-Format:
+
+    {"users": {"mmueller": {"location": "Stuttgart", "department": "Konstruktion"}},
+     "hosts": {"WORKSTATION-01": "Stuttgart"}}
+"""
+
+import os
+import csv
+import sys
+import json
+import logging
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class LocationEntry(NamedTuple):
+    """Standort und Abteilung eines Benutzers oder Hosts"""
+    location: str
+    department: str
+
+
+class LocationData(NamedTuple):
+    """Unveränderlicher Stand der Zuordnung - wird beim Neuladen als Ganzes ersetzt"""
+    users: Dict[str, LocationEntry]
+    hosts: Dict[str, LocationEntry]
+    mtime: float
+    size: int
+
+
+EMPTY_DATA = LocationData(users={}, hosts={}, mtime=0.0, size=0)
+
+
+class LocationMap:
+    """
+    Benutzer/Host -> Standort aus einer CSV- oder JSON-Datei.
+
+    Namen werden ohne Beachtung der Groß-/Kleinschreibung verglichen.
+    Wiederholte Standort- und Abteilungsnamen werden interniert, damit
+    auch 100.000 Zeilen nur wenig Speicher belegen. Ist die Datei nach
+    einer Änderung fehlerhaft, bleibt der letzte gültige Stand aktiv.
+    """
+
+    def __init__(self, path: str, check_interval: float = 10.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._data = EMPTY_DATA
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.reloads = 0
+        self.reload_errors = 0
+        self.reload()
+
+    @property
+    def users(self) -> int:
+        return len(self._data.users)
+
+    @property
+    def hosts(self) -> int:
+        return len(self._data.hosts)
+
+    @property
+    def loaded_mtime(self) -> float:
+        """Änderungszeitpunkt der aktuell geladenen Datei (0 = nichts geladen)"""
+        return self._data.mtime
+
+    def user(self, username: str) -> Optional[LocationEntry]:
+        """Zuordnung eines Benutzers oder None"""
+        return self._data.users.get(username.lower())
+
+    def host(self, hostname: str) -> Optional[LocationEntry]:
+        """Zuordnung eines Hosts oder None"""
+        return self._data.hosts.get(hostname.lower())
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Lädt die Datei neu, wenn sich Änderungszeitpunkt oder Größe geändert haben.
+        Gibt True zurück, wenn ein neuer Stand aktiv ist.
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError as e:
+            if self._data is EMPTY_DATA:
+                logger.warning(f"Standort-Datei {self.path} nicht lesbar: {e}")
+            return False
+
+        current = self._data
+        if not force and (stat.st_mtime, stat.st_size) == (current.mtime, current.size):
+            return False
+
+        try:
+            users, hosts = self._load(self.path)
+        except Exception as e:
+            self.reload_errors += 1
+            logger.warning(f"Standort-Datei {self.path} fehlerhaft, bisheriger Stand bleibt aktiv: {e}")
+            # Gleiche Datei nicht bei jeder Prüfung erneut parsen
+            self._data = current._replace(mtime=stat.st_mtime, size=stat.st_size)
+            return False
+
+        # Atomarer Austausch - Leser sehen entweder den alten oder den neuen Stand
+        self._data = LocationData(users=users, hosts=hosts, mtime=stat.st_mtime, size=stat.st_size)
+        self.reloads += 1
+        logger.info(f"Standort-Datei {self.path} geladen: {len(users)} Benutzer, {len(hosts)} Hosts")
+        return True
+
+    @classmethod
+    def _load(cls, path: str) -> Tuple[Dict[str, LocationEntry], Dict[str, LocationEntry]]:
+        """Liest die Datei abhängig von der Endung als JSON oder CSV"""
+        if path.lower().endswith('.json'):
+            return cls._load_json(path)
+        return cls._load_csv(path)
+
+    @staticmethod
+    def _entry(location, department, cache: Dict[Tuple[str, str], LocationEntry]) -> LocationEntry:
+        """Erzeugt einen Eintrag; gleiche Kombinationen teilen sich ein Objekt"""
+        key = (str(location or '').strip(), str(department or '').strip())
+        entry = cache.get(key)
+        if entry is None:
+            entry = cache[key] = LocationEntry(sys.intern(key[0]), sys.intern(key[1]))
+        return entry
+
+    @classmethod
+    def _load_csv(cls, path: str) -> Tuple[Dict[str, LocationEntry], Dict[str, LocationEntry]]:
+        users: Dict[str, LocationEntry] = {}
+        hosts: Dict[str, LocationEntry] = {}
+        entries: Dict[Tuple[str, str], LocationEntry] = {}
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            missing = {'type', 'name', 'location'} - set(reader.fieldnames or ())
+            if missing:
+                raise ValueError(f"Spalten fehlen: {', '.join(sorted(missing))}")
+            for line, row in enumerate(reader, start=2):
+                kind = (row['type'] or '').strip().lower()
+                name = (row['name'] or '').strip().lower()
+                if not name:
+                    continue
+                entry = cls._entry(row['location'], row.get('department'), entries)
+                if kind == 'user':
+                    users[name] = entry
+                elif kind == 'host':
+                    hosts[name] = entry
+                else:
+                    raise ValueError(f"Zeile {line}: unbekannter Typ '{row['type']}' (user oder host)")
+        return users, hosts
+
+    @classmethod
+    def _load_json(cls, path: str) -> Tuple[Dict[str, LocationEntry], Dict[str, LocationEntry]]:
+        with open(path, encoding='utf-8-sig') as f:
+            content = json.load(f)
+        entries: Dict[Tuple[str, str], LocationEntry] = {}
+        result = []
+        for section in ('users', 'hosts'):
+            mapping = {}
+            for name, value in (content.get(section) or {}).items():
+                if isinstance(value, dict):
+                    entry = cls._entry(value.get('location'), value.get('department'), entries)
+                else:
+                    entry = cls._entry(value, '', entries)
+                mapping[name.strip().lower()] = entry
+            result.append(mapping)
+        return result[0], result[1]
+
+    def start(self):
+        """Startet die Überwachung der Datei im Hintergrund"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name='location-map', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Beendet die Überwachung"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _watch(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                logger.warning(f"Fehler beim Prüfen der Standort-Datei {self.path}: {e}")
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Standort-Regeln für Hostnamen und IP-Netze
+Leitet den Standort eines Checkouts aus dem Hostnamen ab, ohne AD-Abfrage:
+zuerst über Hostname-Muster, danach über die per DNS aufgelöste Adresse
+und eine Tabelle von CIDR-Netzen.
+
+Regel-Datei (JSON):
+
+    {
+      "hostname_rules": [
+        {"pattern": "WS-STR-\\d+", "location": "Stuttgart"},
+        {"pattern": ".*-BER$", "location": "Berlin"}
+      ],
+      "networks": [
+        {"cidr": "10.20.0.0/16", "location": "Stuttgart"},
+        {"cidr": "10.20.99.0/24", "location": "Stuttgart Labor"}
+      ]
+    }
+
+Muster werden ab dem Anfang des Hostnamens ohne Beachtung der Groß-/
+Kleinschreibung geprüft, die erste passende Regel gewinnt. Inline-Flags
+wie (?x) am Anfang eines Musters gelten nur für diese Regel. Bei
+überlappenden Netzen gewinnt das spezifischste (längstes Präfix).
+"""
+
+import re
+import json
+import time
+import socket
+import logging
+import ipaddress
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Maximale Wartezeit auf DNS-Antworten pro Zyklus in Sekunden
+DNS_DEADLINE = 2.0
+
+# Globale Inline-Flags wie (?i) am Anfang eines Musters
+LEADING_FLAGS = re.compile(r'\(\?([aiLmsux]+)\)')
+
+
+class HostnameMatcher:
+    """Alle Hostname-Muster als ein kombinierter Ausdruck - ein Regex-Lauf pro Hostname"""
+
+    def __init__(self, rules: Iterable[Tuple[str, str]]):
+        self.locations: List[str] = []
+        branches = []
+        for index, (pattern, location) in enumerate(rules):
+            branch = f"(?P<r{index}>{self._scope_flags(pattern)})"
+            try:
+                # Fehler der einzelnen Regel mit verständlicher Meldung
+                re.compile(pattern)
+                re.compile(branch)
+            except re.error as e:
+                raise re.error(f"Ungültiges Hostname-Muster {pattern!r}: {e}") from None
+            branches.append(branch)
+            self.locations.append(location)
+        self._pattern = re.compile("|".join(branches), re.IGNORECASE) if branches else None
+
+    @staticmethod
+    def _scope_flags(pattern: str) -> str:
+        """
+        Schreibt führende globale Flags wie (?i) in eine Gruppe (?i:...) um -
+        im kombinierten Ausdruck stünden sie sonst nicht mehr am Anfang.
+        Globale Flags an anderer Stelle werden beim Kombinieren abgelehnt.
+        """
+        flags = ""
+        match = LEADING_FLAGS.match(pattern)
+        while match:
+            flags += match.group(1)
+            pattern = pattern[match.end():]
+            match = LEADING_FLAGS.match(pattern)
+        return f"(?{flags}:{pattern})" if flags else pattern
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    def match(self, hostname: str) -> Optional[str]:
+        """Standort der ersten passenden Regel oder None"""
+        if self._pattern is None:
+            return None
+        match = self._pattern.match(hostname)
+        if match is None:
+            return None
+        # Die äußere Gruppe der Regel schließt zuletzt - lastgroup liefert also die Regel
+        return self.locations[int(match.lastgroup[1:])]
+
+
+class NetworkTable:
+    """
+    CIDR-Netze -> Standort.
+    Pro IP-Version und Präfixlänge ein Dict Netzadresse -> Standort; eine
+    Abfrage maskiert die Adresse für jede vorhandene Präfixlänge, vom
+    längsten Präfix an. Damit gewinnt immer das spezifischste Netz.
+    """
+
+    def __init__(self, networks: Iterable[Tuple[str, str]]):
+        tables: Dict[int, Dict[int, Dict[int, str]]] = {4: {}, 6: {}}
+        count = 0
+        for cidr, location in networks:
+            network = ipaddress.ip_network(cidr, strict=False)
+            tables[network.version].setdefault(network.prefixlen, {})[int(network.network_address)] = location
+            count += 1
+        self._count = count
+        self._tables = {
+            version: [(self._mask(version, prefixlen), table)
+                      for prefixlen, table in sorted(by_prefix.items(), reverse=True)]
+            for version, by_prefix in tables.items()
+        }
+
+    def __len__(self) -> int:
+        return self._count
+
+    @staticmethod
+    def _mask(version: int, prefixlen: int) -> int:
+        bits = 32 if version == 4 else 128
+        return ((1 << prefixlen) - 1) << (bits - prefixlen)
+
+    def lookup(self, address: str) -> Optional[str]:
+        """Standort des spezifischsten passenden Netzes oder None"""
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return None
+        value = int(ip)
+        for mask, table in self._tables[ip.version]:
+            location = table.get(value & mask)
+            if location is not None:
+                return location
+        return None
+
+
+class DnsCache:
+    """
+    Cache für Vorwärts- (Hostname -> Adressen) und Rückwärtsauflösung
+    (Adresse -> Hostname). Fehlgeschlagene Auflösungen werden kürzer
+    gecacht. resolve_many() löst fehlende Einträge parallel auf und wartet
+    höchstens `deadline` Sekunden - noch laufende Auflösungen landen
+    anschließend im Cache und stehen im nächsten Zyklus zur Verfügung.
+    """
+
+    def __init__(self, ttl: float = 3600, negative_ttl: float = 300, max_workers: int = 8,
+                 forward: Optional[Callable[[str], List[str]]] = None,
+                 reverse: Optional[Callable[[str], Optional[str]]] = None,
+                 clock: Callable[[], float] = time.time):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._forward = forward or self._getaddrinfo
+        self._reverse = reverse or self._gethostbyaddr
+        self._clock = clock
+        self._cache: Dict[Tuple[str, str], Tuple[object, float]] = {}
+        self._inflight: Dict[Tuple[str, str], object] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dns')
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+
+    @staticmethod
+    def _getaddrinfo(hostname: str) -> List[str]:
+        return sorted({info[4][0] for info in socket.getaddrinfo(hostname, None)})
+
+    @staticmethod
+    def _gethostbyaddr(address: str) -> Optional[str]:
+        return socket.gethostbyaddr(address)[0]
+
+    def addresses(self, hostname: str) -> Optional[List[str]]:
+        """Gecachte Adressen eines Hostnamens (None = noch nicht aufgelöst)"""
+        return self._cached(('A', hostname.lower()))
+
+    def hostname(self, address: str) -> Optional[str]:
+        """Gecachter Hostname einer Adresse (None = noch nicht aufgelöst oder unbekannt)"""
+        return self._cached(('PTR', address)) or None
+
+    def _cached(self, key: Tuple[str, str]):
+        entry = self._cache.get(key)
+        if entry is None or entry[1] <= self._clock():
+            return None
+        return entry[0]
+
+    def resolve_many(self, hostnames: Iterable[str] = (), addresses: Iterable[str] = (),
+                     deadline: float = DNS_DEADLINE):
+        """Löst fehlende Hostnamen und Adressen parallel auf, wartet höchstens `deadline` Sekunden"""
+        # Schlüssel ohne Groß-/Kleinschreibung, aufgelöst wird der Name wie angegeben
+        keys = {('A', name.lower()): name for name in hostnames}
+        keys.update((('PTR', address), address) for address in addresses)
+        futures = []
+        with self._lock:
+            for key, name in keys.items():
+                if self._cached(key) is not None:
+                    self.hits += 1
+                    continue
+                self.misses += 1
+                future = self._inflight.get(key)
+                if future is None:
+                    future = self._inflight[key] = self._executor.submit(self._resolve, key, name)
+                futures.append(future)
+        if futures:
+            wait(futures, timeout=deadline)
+
+    def _resolve(self, key: Tuple[str, str], name: str):
+        kind = key[0]
+        failed = False
+        try:
+            value = (self._forward(name) if kind == 'A' else self._reverse(name)) or ([] if kind == 'A' else '')
+            ttl = self.ttl if value else self.negative_ttl
+        except Exception as e:
+            logger.debug(f"DNS-Auflösung von {name} fehlgeschlagen: {e}")
+            value = [] if kind == 'A' else ''
+            ttl = self.negative_ttl
+            failed = True
+        with self._lock:
+            if failed:
+                self.failures += 1
+            self._cache[key] = (value, self._clock() + ttl)
+            self._inflight.pop(key, None)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class LocationRules:
+    """Standort eines Hosts aus Hostname-Mustern und CIDR-Netzen (über DNS)"""
+
+    def __init__(self, hostname_rules: Iterable[Tuple[str, str]] = (),
+                 networks: Iterable[Tuple[str, str]] = (), dns: Optional[DnsCache] = None):
+        self.hostnames = HostnameMatcher(hostname_rules)
+        self.networks = NetworkTable(networks)
+        self.dns = dns if dns is not None else DnsCache()
+
+    @classmethod
+    def from_file(cls, path: str, dns: Optional[DnsCache] = None) -> 'LocationRules':
+        """Lädt die Regeln aus einer JSON-Datei"""
+        with open(path, encoding='utf-8-sig') as f:
+            content = json.load(f)
+        rules = cls(
+            hostname_rules=[(rule['pattern'], rule['location']) for rule in content.get('hostname_rules', [])],
+            networks=[(network['cidr'], network['location']) for network in content.get('networks', [])],
+            dns=dns
+        )
+        logger.info(f"Standort-Regeln aus {path} geladen: {len(rules.hostnames)} Hostname-Muster, "
+                    f"{len(rules.networks)} Netze")
+        return rules
+
+    @staticmethod
+    def _is_address(hostname: str) -> bool:
+        try:
+            ipaddress.ip_address(hostname)
+            return True
+        except ValueError:
+            return False
+
+    def locate_many(self, hostnames: Iterable[str], deadline: float = DNS_DEADLINE) -> Dict[str, str]:
+        """
+        Standorte für alle Hosts eines Zyklus; Hosts ohne Treffer fehlen im Ergebnis.
+        Nur Hosts, die kein Hostname-Muster trifft, werden per DNS aufgelöst.
+        """
+        result: Dict[str, str] = {}
+        unresolved_names = []
+        unresolved_addresses = []
+        for hostname in dict.fromkeys(hostnames):
+            location = self.hostnames.match(hostname)
+            if location is not None:
+                result[hostname] = location
+            elif self._is_address(hostname):
+                # IP statt Name: erst das Netz, sonst den Namen per Reverse-DNS für die Muster
+                location = self.networks.lookup(hostname)
+                if location is not None:
+                    result[hostname] = location
+                elif len(self.hostnames):
+                    unresolved_addresses.append(hostname)
+            elif len(self.networks):
+                unresolved_names.append(hostname)
+
+        if not unresolved_names and not unresolved_addresses:
+            return result
+
+        self.dns.resolve_many(unresolved_names, unresolved_addresses, deadline=deadline)
+        for hostname in unresolved_names:
+            for address in self.dns.addresses(hostname) or ():
+                location = self.networks.lookup(address)
+                if location is not None:
+                    result[hostname] = location
+                    break
+        for address in unresolved_addresses:
+            name = self.dns.hostname(address)
+            location = self.hostnames.match(name.split('.', 1)[0]) if name else None
+            if location is not None:
+                result[address] = location
+        return result
+
+    def locate(self, hostname: str, deadline: float = DNS_DEADLINE) -> Optional[str]:
+        """Standort eines einzelnen Hosts oder None"""
+        return self.locate_many([hostname], deadline=deadline).get(hostname)
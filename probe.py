@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+/probe-Endpunkt im Stil des Blackbox Exporters
+`/probe?target=27000@lic-ansys` pollt den angegebenen License Server bei
+Bedarf - die Liste der Server kommt so aus der Service Discovery von
+Prometheus statt aus `--license-server`. Ergebnisse werden pro Target für
+ein Mindestintervall gecacht und vorgerendert, gleichzeitige Probes
+desselben Targets teilen sich einen lmutil-Aufruf, und eine globale
+Obergrenze begrenzt die parallel laufenden lmutil-Prozesse.
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from collection_engine import LicenseSnapshot, LicenseTarget
+from exposition import Exposition
+
+logger = logging.getLogger(__name__)
+
+
+class ProbeBusy(Exception):
+    """Alle Probe-Plätze belegt - der Host ist ausgelastet"""
+
+
+class ProbeResult(NamedTuple):
+    """Gecachtes Ergebnis eines Probes"""
+    snapshot: LicenseSnapshot
+    exposition: Exposition
+    fetched_at: float
+
+
+class ProbeCache:
+    """
+    Pollt Targets bei Bedarf und cacht das gerenderte Ergebnis.
+
+    `poll` erzeugt den Snapshot eines Targets (FlexLMExporter.build_snapshot),
+    `render` die Ausgabe dazu. Ein Ergebnis gilt `min_interval` Sekunden;
+    fehlgeschlagene Polls werden ebenso gecacht, damit ein ausgefallener
+    Server nicht bei jedem Scrape erneut abgefragt wird. Höchstens
+    `max_concurrency` Polls laufen gleichzeitig; wer länger als
+    `queue_timeout` auf einen freien Platz wartet, erhält ProbeBusy.
+
+    Zustand, den der Poll über mehrere Probes eines Targets braucht (z.B.
+    Circuit Breaker), liefert `state(label)` aus `state_factory`. Nicht mehr
+    abgefragte Targets verschwinden nach `expire_after` Sekunden samt
+    Ergebnis und Zustand; `on_expire(label)` räumt zusätzlichen Zustand
+    außerhalb des Caches auf.
+    """
+
+    def __init__(self, poll: Callable[[LicenseTarget], LicenseSnapshot],
+                 render: Callable[[LicenseSnapshot], Exposition],
+                 min_interval: float = 30.0, max_concurrency: int = 4, queue_timeout: float = 10.0,
+                 expire_after: float = 3600.0, clock: Callable[[], float] = time.monotonic,
+                 state_factory: Optional[Callable[[str], Any]] = None,
+                 on_expire: Optional[Callable[[str], None]] = None):
+        self._poll = poll
+        self._render = render
+        self._state_factory = state_factory
+        self._on_expire = on_expire
+        self.min_interval = min_interval
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.expire_after = expire_after
+        self._clock = clock
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._results: Dict[str, ProbeResult] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._states: Dict[str, Any] = {}
+        self._touched: Dict[str, float] = {}  # letzte Anfrage pro Target
+        self.polls = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def state(self, label: str) -> Any:
+        """Zustand eines Targets, beim ersten Zugriff über `state_factory` angelegt"""
+        with self._lock:
+            state = self._states.get(label)
+            if state is None:
+                state = self._states[label] = self._state_factory(label)
+                self._touched.setdefault(label, self._clock())
+            return state
+
+    def probe(self, target: LicenseTarget) -> ProbeResult:
+        """Ergebnis eines Targets - aus dem Cache, von einem laufenden oder einem neuen Poll"""
+        label = target.label
+        with self._lock:
+            now = self._clock()
+            self._touched[label] = now
+            result = self._results.get(label)
+            if result is not None and now - result.fetched_at < self.min_interval:
+                self.cache_hits += 1
+                return result
+            future = self._inflight.get(label)
+            leader = future is None
+            if leader:
+                future = self._inflight[label] = Future()
+                self._expire(now)
+            else:
+                self.coalesced += 1
+
+        if leader:
+            self._run(target, future)
+        return future.result()
+
+    def _run(self, target: LicenseTarget, future: Future):
+        """Führt den Poll aus und übergibt das Ergebnis an alle wartenden Probes"""
+        label = target.label
+        try:
+            if not self._slots.acquire(timeout=self.queue_timeout):
+                with self._lock:
+                    self.rejected += 1
+                raise ProbeBusy(f"Mehr als {self.max_concurrency} gleichzeitige Probes")
+            try:
+                with self._lock:
+                    self.polls += 1
+                snapshot = self._poll(target)
+            finally:
+                self._slots.release()
+            result = ProbeResult(snapshot=snapshot, exposition=self._render(snapshot),
+                                 fetched_at=self._clock())
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(label, None)
+            future.set_exception(e)
+            return
+        with self._lock:
+            self._results[label] = result
+            self._inflight.pop(label, None)
+        future.set_result(result)
+
+    def _expire(self, now: float):
+        """Entfernt Ergebnisse und Zustand von Targets, die länger nicht abgefragt wurden (unter Lock)"""
+        expired = [label for label, result in self._results.items()
+                   if now - result.fetched_at > self.expire_after]
+        for label in expired:
+            del self._results[label]
+        idle = [label for label, touched in self._touched.items()
+                if now - touched > self.expire_after and label not in self._inflight]
+        for label in idle:
+            del self._touched[label]
+            self._results.pop(label, None)
+            if self._states.pop(label, None) is not None and self._on_expire is not None:
+                self._on_expire(label)
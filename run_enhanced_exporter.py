@@ -15,7 +15,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from flexlm_exporter import FlexLMExporter
-from prometheus_client import start_http_server
+from http_server import start_metrics_server
 
 # Logging konfigurieren
 logging.basicConfig(
@@ -70,8 +70,12 @@ def main():
         
         # HTTP Server für Prometheus Metriken starten
         prometheus_port = 8000
-        start_http_server(prometheus_port)
+        start_metrics_server(prometheus_port, exporter.exposition,
+                             ready=lambda: bool(exporter.engine.snapshots))
         logger.info(f"🌐 Prometheus HTTP Server gestartet auf Port {prometheus_port}")
+        
+        # Collection Engine und AD-Refresher starten - pollen unabhängig von den Scrapes
+        exporter.start_collection()
         print(f"🌐 Metriken verfügbar unter: http://localhost:{prometheus_port}/metrics")
         
         print("\n" + "="*60)
@@ -86,8 +90,11 @@ def main():
                 # Update-Zyklusinfo
                 logger.info("🔄 Aktualisiere License-Metriken...")
                 
-                # Metrics werden automatisch über collect() aktualisiert
-                # wenn Prometheus sie abruft
+                # Metriken werden von der Collection Engine im Hintergrund
+                # aktualisiert, Scrapes lesen nur den aktuellen Snapshot
+                age = exporter.engine.snapshot_age()
+                if age is not None:
+                    logger.info(f"📸 Aktueller Snapshot ist {age:.1f}s alt")
                 
                 logger.info(f"✅ Metriken aktualisiert - nächstes Update in {update_interval}s")
                 time.sleep(update_interval)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Gestaffelter Scheduler für lmutil-Abfragen
+Jede Aufgabe (z.B. `lmstat -a` für belegte Lizenzen, `lmstat -i` für das
+Feature-Inventar) läuft pro License Server in ihrem eigenen Intervall.
+Die Startzeitpunkte der Server werden gleichmäßig über das Intervall
+verteilt und zusätzlich gestreut, damit nicht alle Abfragen zur selben
+Sekunde starten. Eine Abfrage, die ihren Startzeitpunkt um mehr als
+`deadline` verpasst hat, entfällt - verpasste Läufe werden nie nachgeholt.
+"""
+
+import copy
+import time
+import heapq
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Zeitraum, über den die ersten Läufe nach dem Start verteilt werden (Sekunden)
+STARTUP_SPREAD = 5.0
+
+
+class ScheduledTask(NamedTuple):
+    """Eine Aufgabe, die pro Target im eigenen Intervall läuft"""
+    name: str
+    interval: float
+    run: Callable[[Any], Any]
+    deadline: Optional[float] = None  # maximale Startverzögerung, Standard: halbes Intervall
+
+    @property
+    def max_delay(self) -> float:
+        return self.deadline if self.deadline is not None else self.interval / 2
+
+
+class Job(NamedTuple):
+    """Ein fälliger Lauf einer Aufgabe für ein Target"""
+    task: ScheduledTask
+    target: Any
+    due: float
+
+
+class TaskStats:
+    """Zähler und letzte Messwerte einer Aufgabe über alle Targets"""
+
+    def __init__(self):
+        self.runs = 0
+        self.errors = 0
+        self.overlaps = 0  # übersprungen, weil der vorige Lauf noch nicht fertig war
+        self.missed = 0    # übersprungen, weil die Deadline überschritten war
+        self.last_duration: Optional[float] = None
+        self.last_lag: Optional[float] = None
+
+
+class TieredScheduler:
+    """
+    Plant alle (Aufgabe, Target)-Paare auf einem festen Raster ohne Drift:
+    Lauf k startet bei `anker + k * intervall` ± `jitter * intervall`. Der
+    Anker verteilt die Targets (und die Aufgaben eines Targets) gleichmäßig
+    über das Intervall. Die ersten Läufe starten innerhalb von
+    STARTUP_SPREAD Sekunden, damit nach dem Start schnell Daten vorliegen.
+
+    Targets müssen ein `label` besitzen. `on_result(task_name, target, result)`
+    erhält jedes Ergebnis im Worker-Thread.
+    """
+
+    def __init__(self, tasks: Iterable[ScheduledTask], targets: Iterable[Any],
+                 on_result: Callable[[str, Any, Any], None], max_workers: int = 8,
+                 jitter: float = 0.1, clock: Callable[[], float] = time.monotonic,
+                 random_uniform: Callable[[float, float], float] = random.uniform):
+        self.tasks = list(tasks)
+        self.targets = list(targets)
+        self.on_result = on_result
+        self.max_workers = max(1, max_workers)
+        self.jitter = jitter
+        self._clock = clock
+        self._uniform = random_uniform
+        self.stats: Dict[str, TaskStats] = {task.name: TaskStats() for task in self.tasks}
+        self._heap: List[Tuple[float, int, int, int]] = []  # (fällig, Sequenz, Raster-Index, Paar)
+        self._pairs: List[Tuple[ScheduledTask, Any, float]] = []  # (Aufgabe, Target, Anker)
+        self._running: set = set()
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, now: Optional[float] = None):
+        """Plant die ersten Läufe aller Paare ab `now`"""
+        now = self._clock() if now is None else now
+        count = len(self.tasks) * len(self.targets)
+        with self._lock:
+            self._heap = []
+            self._pairs = []
+            for target_index, target in enumerate(self.targets):
+                for task_index, task in enumerate(self.tasks):
+                    # Position im Raster: Targets gleichmäßig, Aufgaben eines Targets dazwischen versetzt
+                    slot = (target_index + task_index / len(self.tasks)) / len(self.targets)
+                    anchor = now + task.interval * slot
+                    pair = len(self._pairs)
+                    self._pairs.append((task, target, anchor))
+                    first = now + min(STARTUP_SPREAD, task.interval) * (target_index * len(self.tasks) + task_index) / count
+                    self._push(first, 0, pair)
+
+    def _push(self, due: float, index: int, pair: int):
+        self._sequence += 1
+        heapq.heappush(self._heap, (due, self._sequence, index, pair))
+
+    def _due_at(self, pair: int, index: int) -> float:
+        task, _, anchor = self._pairs[pair]
+        spread = task.interval * self.jitter
+        return anchor + index * task.interval + self._uniform(-spread, spread)
+
+    def next_due(self) -> Optional[float]:
+        """Zeitpunkt des nächsten geplanten Laufs"""
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> List[Job]:
+        """
+        Entnimmt alle bis `now` fälligen Läufe und plant den jeweils nächsten.
+        Läuft die vorige Abfrage desselben Paares noch, entfällt der Lauf.
+        """
+        now = self._clock() if now is None else now
+        jobs = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due, _, index, pair = heapq.heappop(self._heap)
+                task, target, anchor = self._pairs[pair]
+                # Nächster Rasterpunkt in der Zukunft - verpasste Punkte werden übersprungen
+                index = max(index + 1, int((now - anchor) // task.interval) + 1)
+                next_due = self._due_at(pair, index)
+                while next_due <= now:
+                    index += 1
+                    next_due = self._due_at(pair, index)
+                self._push(next_due, index, pair)
+                if (task.name, target.label) in self._running:
+                    self.stats[task.name].overlaps += 1
+                    logger.debug(f"{task.name} für {target.label} läuft noch - Lauf übersprungen")
+                    continue
+                self._running.add((task.name, target.label))
+                jobs.append(Job(task, target, due))
+        return jobs
+
+    def execute(self, job: Job):
+        """Führt einen Lauf aus (im Worker-Thread) und übergibt das Ergebnis"""
+        task, target, due = job
+        stats = self.stats[task.name]
+        try:
+            start = self._clock()
+            lag = start - due
+            if lag > task.max_delay:
+                with self._lock:
+                    stats.missed += 1
+                logger.warning(f"⏱️  {task.name} für {target.label} {lag:.1f}s zu spät - Lauf entfällt")
+                return
+            failed = False
+            try:
+                result = task.run(target)
+            except Exception as e:
+                failed = True
+                logger.error(f"{task.name} für {target.label} fehlgeschlagen: {e}")
+                return
+            finally:
+                # Alle Werte eines Laufs zusammen, damit task_stats() nie einen halben Lauf sieht
+                with self._lock:
+                    stats.runs += 1
+                    if failed:
+                        stats.errors += 1
+                    stats.last_lag = max(0.0, lag)
+                    stats.last_duration = self._clock() - start
+            try:
+                self.on_result(task.name, target, result)
+            except Exception as e:
+                logger.error(f"Fehler beim Übernehmen von {task.name} für {target.label}: {e}")
+        finally:
+            with self._lock:
+                self._running.discard((task.name, target.label))
+
+    def task_stats(self) -> Dict[str, TaskStats]:
+        """Kopie der Zähler aller Aufgaben, konsistent zum Zeitpunkt des Aufrufs"""
+        with self._lock:
+            return {name: copy.copy(stats) for name, stats in self.stats.items()}
+
+    def start(self):
+        """Startet den Scheduler-Thread und den Worker-Pool"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self.schedule()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="flexlm-task")
+        self._thread = threading.Thread(target=self._run, name="flexlm-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stoppt den Scheduler; laufende Abfragen werden nicht abgewartet"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            for job in self.pop_due():
+                self._executor.submit(self.execute, job)
+            next_due = self.next_due()
+            if next_due is None:
+                break
+            self._stop_event.wait(max(0.0, next_due - self._clock()))
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Tests für den AD-Benutzercache
+Prüft LRU-Verdrängung, getrennte TTLs und parallelen Zugriff
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.append('.')
+
+from ad_cache import UserInfoCache, SqliteCacheStore
+
+
+class FakeClock:
+    """Steuerbare Uhr für TTL-Tests"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_positive_and_negative_ttl():
+    """Treffer und nicht gefundene Benutzer laufen unabhängig voneinander ab"""
+    print("=== Test: Getrennte TTLs ===")
+    clock = FakeClock()
+    cache = UserInfoCache(positive_ttl=300, negative_ttl=60, clock=clock)
+    cache.put('mmueller', {'location': 'Stuttgart'})
+    cache.put('unbekannt', {})
+
+    assert cache.get('mmueller') == {'location': 'Stuttgart'}
+    assert cache.get('unbekannt') == {}
+
+    clock.now += 61
+    assert cache.get('unbekannt') is None
+    assert cache.get('mmueller') == {'location': 'Stuttgart'}
+
+    clock.now += 240
+    assert cache.get('mmueller') is None
+    assert cache.purge_expired() == 2
+    assert len(cache) == 0
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['negative_hits'], stats['misses'], stats['expirations']) == (2, 1, 2, 2)
+    print("✓ TTLs getrennt")
+
+
+def test_lru_eviction():
+    """Bei voller Kapazität wird der am längsten nicht genutzte Eintrag verdrängt"""
+    print("\n=== Test: LRU-Verdrängung ===")
+    cache = UserInfoCache(max_entries=3)
+    for name in ('a', 'b', 'c'):
+        cache.put(name, {'location': name})
+    cache.get('a')  # 'a' wird zuletzt genutzt, 'b' ist nun der älteste
+    cache.put('d', {'location': 'd'})
+
+    assert 'b' not in cache
+    assert all(name in cache for name in ('a', 'c', 'd'))
+    assert cache.stats()['evictions'] == 1
+    print("✓ Ältester Eintrag verdrängt")
+
+
+def test_concurrent_access():
+    """Paralleles Lesen und Schreiben hält die Größengrenze ein"""
+    print("\n=== Test: Paralleler Zugriff ===")
+    cache = UserInfoCache(max_entries=100)
+    errors = []
+
+    def worker(offset):
+        try:
+            for i in range(2000):
+                name = f"user{(i + offset) % 300}"
+                if cache.get(name) is None:
+                    cache.put(name, {'location': 'Berlin'})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n * 37,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors, errors
+    assert len(cache) <= 100
+    print(f"✓ {len(cache)} Einträge nach parallelem Zugriff")
+
+
+def test_persistent_store():
+    """Einträge überleben einen Neustart mit ihren ursprünglichen Zeitstempeln"""
+    print("\n=== Test: Persistenter Cache ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'cache.sqlite')
+        clock = FakeClock()
+
+        cache = UserInfoCache(max_entries=2, positive_ttl=300, negative_ttl=60, max_stale=100,
+                              store=SqliteCacheStore(path), clock=clock)
+        cache.put('mmueller', {'location': 'Stuttgart'})
+        clock.now += 10
+        cache.put('unbekannt', {})
+        # Noch nichts geschrieben - erst flush() schreibt gebündelt
+        assert SqliteCacheStore(path).load() == []
+        assert cache.flush() == 2
+        cache.store.close()
+
+        # "Neustart" 100s später
+        clock.now += 100
+        restarted = UserInfoCache(max_entries=2, positive_ttl=300, negative_ttl=60, max_stale=100,
+                                  store=SqliteCacheStore(path), clock=clock)
+        assert restarted.get('mmueller') == {'location': 'Stuttgart'}
+        assert restarted.get_entry('mmueller').stored_at == 1000.0
+        # Negativ-Eintrag ist abgelaufen, aber noch innerhalb von max_stale geladen
+        assert restarted.get('unbekannt') is None
+        assert 'unbekannt' in restarted
+
+        # Verdrängte Einträge werden auch aus der Datei gelöscht
+        restarted.put('a', {'location': 'A'})
+        restarted.put('b', {'location': 'B'})
+        restarted.flush()
+        assert sorted(row[0] for row in restarted.store.load()) == ['a', 'b']
+        restarted.store.close()
+
+        # Zu alte Einträge werden beim Start nicht mehr geladen
+        clock.now += 1000
+        late = UserInfoCache(positive_ttl=300, negative_ttl=60, max_stale=100,
+                             store=SqliteCacheStore(path), clock=clock)
+        assert len(late) == 0
+        late.store.close()
+    print("✓ Cache nach Neustart warm")
+
+
+def main():
+    """Führt alle Tests aus"""
+    print("AD Cache Tests")
+    print("=" * 40)
+    test_positive_and_negative_ttl()
+    test_lru_eviction()
+    test_concurrent_access()
+    test_persistent_store()
+    print("\n✓ Alle Tests erfolgreich abgeschlossen!")
+
+
+if __name__ == '__main__':
+    main()
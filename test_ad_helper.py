@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Unit-Tests für den Active Directory Helper
+Verwendet eine simulierte LDAP-Verbindung - läuft ohne Domain und ohne ldap3
+"""
+
+import re
+import sys
+import time
+
+sys.path.append('.')
+
+from active_directory_helper import ActiveDirectoryHelper, AD_BATCH_SIZE, PAGED_RESULTS_OID
+from ad_directory import DirectoryIndex
+from ldap_pool import LdapConnectionPool
+
+
+class FakeEntry:
+    """LDAP-Entry mit den Attributen eines AD-Benutzers"""
+
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+    def __getattr__(self, name):
+        return None
+
+
+class FakeConnection:
+    """Simuliert ldap3.Connection.search über eine Liste von Entries"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.entries = []
+        self.searches = []
+        self.bound = True
+        self.last_error = None
+        self.dc_name = 'dc1.corp.company.local'
+
+    def search(self, search_base, search_filter, search_scope=None, attributes=None, **kwargs):
+        self.searches.append(search_filter)
+        if search_scope == 'BASE':
+            # rootDSE
+            self.entries = [FakeEntry(defaultNamingContext='DC=corp,DC=company,DC=local',
+                                      dnsHostName=self.dc_name,
+                                      highestCommittedUSN=max([e.uSNChanged or 0 for e in self.directory] + [1]))]
+            return True
+        if 'paged_size' in kwargs:
+            return self._paged_search(search_filter, kwargs['paged_size'], kwargs.get('paged_cookie'))
+        # objectCategory/objectClass-Bedingung überspringen, nur die Namensterme auswerten
+        terms = re.findall(r'\((\w+)=([^()]*)\)', search_filter.split('(|', 1)[-1])
+        self.entries = [
+            entry for entry in self.directory
+            if any(str(getattr(entry, attr) or '').lower() == value.lower() for attr, value in terms)
+        ]
+        return bool(self.entries)
+
+    def _paged_search(self, search_filter, page_size, cookie):
+        """Paged Search über alle Benutzer, optional nur mit uSNChanged >= N"""
+        usn = re.search(r'\(uSNChanged>=(\d+)\)', search_filter)
+        matches = [entry for entry in self.directory
+                   if not usn or (entry.uSNChanged or 0) >= int(usn.group(1))]
+        offset = int(cookie or 0)
+        self.entries = matches[offset:offset + page_size]
+        next_offset = offset + page_size
+        cookie = str(next_offset).encode() if next_offset < len(matches) else b''
+        self.result = {'controls': {PAGED_RESULTS_OID: {'value': {'cookie': cookie}}}}
+        return True
+
+    def unbind(self):
+        self.bound = False
+
+
+def make_directory(count: int = 0):
+    """Erzeugt ein Test-Verzeichnis mit einigen Benutzern"""
+    directory = [
+        FakeEntry(sAMAccountName='mmueller', displayName='Max Müller', cn='mmueller',
+                  l='Stuttgart', department='Konstruktion'),
+        FakeEntry(sAMAccountName='aschmidt', displayName='Anna Schmidt', cn='Anna Schmidt',
+                  l='Berlin', physicalDeliveryOfficeName='B2', department='Simulation'),
+    ]
+    directory += [
+        FakeEntry(sAMAccountName=f'user{i}', displayName=f'User {i}', cn=f'user{i}', l='Hamburg')
+        for i in range(count)
+    ]
+    return directory
+
+
+def make_helper(directory) -> ActiveDirectoryHelper:
+    """AD Helper mit simulierter Verbindung (helper.connection nur für die Tests)"""
+    helper = ActiveDirectoryHelper(domain='company.local', cache_file='')
+    helper.enabled = True
+    helper.connection = FakeConnection(directory)
+    helper.pool = LdapConnectionPool(lambda: helper.connection, size=1)
+    return helper
+
+
+def test_batch_lookup():
+    """Viele unbekannte Benutzer werden mit wenigen OR-Filter-Suchen aufgelöst"""
+    print("=== Test: Gebündelte AD-Abfrage ===")
+    helper = make_helper(make_directory(120))
+    names = ['mmueller', 'Anna Schmidt', 'unbekannt'] + [f'user{i}' for i in range(120)]
+
+    infos = helper.get_users_info(names)
+    searches = len(helper.connection.searches)
+
+    assert infos['mmueller'].location == 'Stuttgart'
+    assert infos['mmueller'].department == 'Konstruktion'
+    # Über cn gefunden
+    assert infos['Anna Schmidt'].location == 'B2 - Berlin'
+    assert infos['unbekannt'].location == 'Unknown'
+    assert infos['user119'].location == 'Hamburg'
+    # 123 Namen: eine Suche mit kombiniertem Filter pro AD_BATCH_SIZE Namen
+    assert searches == -(-len(names) // AD_BATCH_SIZE), helper.connection.searches
+    assert helper.last_batch_stats['found'] == 122
+    assert helper.last_batch_stats['not_found'] == 1
+
+    # Zweiter Zyklus kommt komplett aus dem Cache
+    helper.get_users_info(names)
+    assert len(helper.connection.searches) == searches
+    assert helper.last_batch_stats['cache_hits'] == len(names)
+    print(f"✓ {len(names)} Benutzer mit {searches} LDAP-Suchen aufgelöst")
+
+
+def test_negative_cache_expires_separately():
+    """Nicht gefundene Benutzer werden nach der kürzeren Negativ-TTL erneut gesucht"""
+    print("\n=== Test: Negative Caching ===")
+    helper = make_helper(make_directory())
+    helper.user_cache.negative_ttl = 0
+    helper.get_users_info(['mmueller', 'unbekannt'])
+    searches = len(helper.connection.searches)
+
+    helper.get_users_info(['mmueller', 'unbekannt'])
+    # Nur 'unbekannt' wird erneut gesucht, 'mmueller' kommt aus dem Cache
+    assert len(helper.connection.searches) == searches + 1
+    assert helper.last_batch_stats['cache_hits'] == 1
+    print("✓ Negativ-Einträge laufen getrennt ab")
+
+
+def test_stale_fallback_when_ad_fails():
+    """Ist das AD nicht erreichbar, werden abgelaufene Einträge weiter verwendet"""
+    print("\n=== Test: Rückfall bei AD-Ausfall ===")
+    helper = make_helper(make_directory())
+    helper.user_cache.positive_ttl = 0
+    helper.user_cache.max_stale = 3600
+    helper.get_users_info(['mmueller'])
+
+    def broken_search(**kwargs):
+        raise ConnectionError("DC nicht erreichbar")
+
+    helper.connection.search = broken_search
+    infos = helper.get_users_info(['mmueller', 'neu'])
+    assert infos['mmueller'].location == 'Stuttgart'
+    assert infos['neu'].location == 'Unknown'
+    # Fehlgeschlagene Benutzer werden nicht als "nicht gefunden" gecacht
+    assert 'neu' not in helper.user_cache
+    assert (helper.last_batch_stats['failed'], helper.last_batch_stats['stale']) == (2, 1)
+    print("✓ Abgelaufene Einträge als Rückfall genutzt")
+
+
+def test_filter_escaping():
+    """Sonderzeichen in Benutzernamen werden im Filter escaped"""
+    print("\n=== Test: Filter-Escaping ===")
+    helper = make_helper(make_directory())
+    helper.get_users_info(['evil)(cn=*'])
+    assert '(sAMAccountName=evil\\29\\28cn=\\2a)' in helper.connection.searches[0]
+    print("✓ Filterwerte escaped")
+
+
+def test_rootdse_discovery():
+    """Suchbasis kommt einmalig aus dem rootDSE, jede Abfrage ist danach genau eine Suche"""
+    print("\n=== Test: rootDSE-Erkennung ===")
+    helper = make_helper(make_directory())
+    assert helper._discover_directory()
+    assert helper.search_base == 'DC=corp,DC=company,DC=local'
+    assert helper.ldap_operations == 1
+
+    bases = []
+    search = helper.connection.search
+
+    def recording_search(**kwargs):
+        bases.append(kwargs['search_base'])
+        return search(**kwargs)
+
+    helper.connection.search = recording_search
+    assert helper.get_user_info('mmueller').location == 'Stuttgart'
+    # Unbekannter Benutzer kostet ebenfalls nur eine Suche (vorher 12)
+    assert helper.get_user_info('unbekannt').location == 'Unknown'
+    assert bases == ['DC=corp,DC=company,DC=local'] * 2
+    assert (helper.ldap_lookup_operations, helper.ldap_lookup_users) == (2, 2)
+    assert helper.ldap_operations == 3
+    print("✓ Eine LDAP-Suche pro Abfrage auf der erkannten Suchbasis")
+
+
+def test_schema_filters_attributes():
+    """Standort-Attribute, die das Schema nicht kennt, werden nicht abgefragt"""
+    print("\n=== Test: Schema-Abgleich ===")
+    helper = make_helper(make_directory())
+
+    class FakeServer:
+        info = type('Info', (), {'other': {'defaultNamingContext': ['DC=company,DC=local']}})()
+        schema = type('Schema', (), {'attribute_types': {
+            'sAMAccountName': None, 'cn': None, 'l': None, 'department': None}})()
+
+    helper.server = FakeServer()
+    assert helper._discover_directory()
+    # defaultNamingContext aus den beim Bind geladenen Server-Informationen
+    assert helper.search_base == 'DC=company,DC=local'
+    assert helper.location_attributes == ['l', 'department']
+    print("✓ Nur vorhandene Attribute werden abgefragt")
+
+
+def test_entry_priority():
+    """Passen mehrere Entries auf einen Namen, gewinnt sAMAccountName vor cn/displayName"""
+    print("\n=== Test: Treffer-Priorität ===")
+    directory = [
+        FakeEntry(sAMAccountName='other', cn='jdoe', l='Berlin'),
+        FakeEntry(sAMAccountName='jdoe', cn='John Doe', l='München'),
+    ]
+    helper = make_helper(directory)
+    assert helper.get_user_location('jdoe') == 'München'
+    print("✓ sAMAccountName-Treffer bevorzugt")
+
+
+def test_non_blocking_lookup_marks_pending():
+    """Ohne Blockieren erhalten neue Benutzer location="pending", der Refresher löst sie auf"""
+    print("\n=== Test: Nicht-blockierende Abfrage ===")
+    helper = make_helper(make_directory())
+    infos = helper.get_users_info(['mmueller', 'unbekannt'], block=False)
+    assert infos['mmueller'].location == 'pending'
+    assert helper.connection.searches == []
+    assert helper.refresh_queue_size() == 2
+    assert helper.last_batch_stats['pending'] == 2
+
+    assert helper.refresh_pending() == 2
+    assert helper.refresh_queue_size() == 0
+    infos = helper.get_users_info(['mmueller', 'unbekannt'], block=False)
+    assert infos['mmueller'].location == 'Stuttgart'
+    assert infos['unbekannt'].location == 'Unknown'
+    assert helper.last_batch_stats['cache_hits'] == 2
+    print("✓ Neue Benutzer ausstehend, nach dem Refresh aufgelöst")
+
+
+def test_refresh_ahead():
+    """Angefragte Einträge werden vor Ablauf erneuert, abgelaufene bis dahin weiter geliefert"""
+    print("\n=== Test: Refresh-Ahead ===")
+    helper = make_helper(make_directory())
+    helper.get_users_info(['mmueller', 'aschmidt'])
+    searches = len(helper.connection.searches)
+
+    # Frische Einträge werden nicht erneuert
+    assert helper.refresh_pending() == 0
+
+    # Im letzten Viertel der TTL: Refresh im Hintergrund
+    entry = helper.user_cache.get_entry('mmueller')
+    helper.user_cache.put('mmueller', entry.value,
+                          stored_at=entry.stored_at - helper.cache_timeout * (1 - helper.refresh_ahead_ratio / 2))
+    assert helper.refresh_pending() == 1
+    assert len(helper.connection.searches) == searches + 1
+    assert helper.user_cache.get_entry('mmueller').stored_at >= entry.stored_at
+
+    # Abgelaufener Eintrag wird ohne Blockieren weiter geliefert
+    helper.user_cache.put('aschmidt', helper.user_cache.get_entry('aschmidt').value,
+                          stored_at=entry.stored_at - helper.cache_timeout - 1)
+    infos = helper.get_users_info(['aschmidt'], block=False)
+    assert infos['aschmidt'].location == 'B2 - Berlin'
+    assert helper.last_batch_stats['stale'] == 1
+    assert helper.refresh_queue_size() == 1
+    print("✓ Einträge vor Ablauf erneuert")
+
+
+def test_refresher_thread():
+    """Mit laufendem Refresher blockiert get_users_info nicht und neue Benutzer werden zeitnah aufgelöst"""
+    print("\n=== Test: Refresher-Thread ===")
+    helper = make_helper(make_directory())
+    helper.start_refresher(interval=60)
+    try:
+        assert helper.get_users_info(['mmueller'])['mmueller'].location == 'pending'
+        deadline = time.time() + 2
+        while helper.user_cache.get_entry('mmueller') is None and time.time() < deadline:
+            time.sleep(0.01)
+        assert helper.get_users_info(['mmueller'])['mmueller'].location == 'Stuttgart'
+    finally:
+        helper.stop_refresher(timeout=1)
+    assert not helper.refresher_running()
+    print("✓ Refresher löst neue Benutzer sofort auf")
+
+
+def test_directory_preload():
+    """Vollständiges Laden per Paged Search, danach nur geänderte Konten über uSNChanged"""
+    print("\n=== Test: Verzeichnis vorab laden ===")
+    directory = make_directory(2500)
+    for usn, entry in enumerate(directory, start=1):
+        entry.uSNChanged = usn
+    helper = make_helper(directory)
+    helper.directory_index = DirectoryIndex()
+    helper.preload_page_size = 1000
+
+    assert helper.sync_directory_if_due() == 'full'
+    assert len(helper.connection.searches) == 4  # rootDSE + 2502 Konten in Seiten zu 1000
+    assert len(helper.directory_index) == 2502
+    assert helper.directory_index.high_water_mark == 2502
+    assert helper.directory_index.server == 'dc1.corp.company.local'
+
+    # Abfragen im Poll-Zyklus sind reine Dictionary-Zugriffe
+    infos = helper.get_users_info(['mmueller', 'user2499', 'unbekannt'])
+    assert infos['mmueller'].location == 'Stuttgart'
+    assert infos['user2499'].location == 'Hamburg'
+    assert infos['unbekannt'].location == 'Unknown'
+    assert helper.get_user_location('aschmidt') == 'B2 - Berlin'
+    assert len(helper.connection.searches) == 4
+
+    # Vor Ablauf des Intervalls kein Abgleich
+    assert helper.sync_directory_if_due() is None
+
+    # Geändertes und neues Konto - nur diese werden übertragen
+    directory[0].l = 'München'
+    directory[0].uSNChanged = 2503
+    directory.append(FakeEntry(sAMAccountName='neu', cn='neu', l='Köln', uSNChanged=2504))
+    assert helper.sync_directory_if_due(now=time.time() + helper.preload_sync_interval) == 'incremental'
+    assert '(uSNChanged>=2503)' in helper.connection.searches[-1]
+    assert helper.last_directory_sync['users'] == 2
+    assert helper.get_users_info(['mmueller'])['mmueller'].location == 'München'
+    assert helper.get_users_info(['neu'])['neu'].location == 'Köln'
+    assert helper.directory_syncs == {'full': 1, 'incremental': 1}
+    
+    # Der Pool erreicht einen anderen DC - dessen uSNChanged passen nicht zur High-Water-Mark
+    helper.connection.dc_name = 'dc2.corp.company.local'
+    helper.connection.searches.clear()
+    assert helper.sync_directory_if_due(now=time.time() + 2 * helper.preload_sync_interval) == 'full'
+    assert not any('uSNChanged' in search for search in helper.connection.searches)
+    assert helper.directory_index.server == 'dc2.corp.company.local'
+    assert helper.directory_syncs == {'full': 2, 'incremental': 1}
+    print(f"✓ {len(helper.directory_index)} Konten geladen, 2 Änderungen inkrementell übernommen, "
+          f"DC-Wechsel lädt vollständig")
+
+
+def test_disabled_helper():
+    """Ohne AD liefert die Batch-Abfrage AD_Disabled ohne LDAP-Zugriff"""
+    print("\n=== Test: AD deaktiviert ===")
+    helper = make_helper(make_directory())
+    helper.enabled = False
+    infos = helper.get_users_info(['mmueller'])
+    assert infos['mmueller'].location == 'AD_Disabled'
+    assert helper.connection.searches == []
+    print("✓ Keine LDAP-Suche ohne AD")
+
+
+def main():
+    """Führt alle Tests aus"""
+    print("Active Directory Helper Tests")
+    print("=" * 40)
+    test_batch_lookup()
+    test_negative_cache_expires_separately()
+    test_stale_fallback_when_ad_fails()
+    test_filter_escaping()
+    test_rootdse_discovery()
+    test_schema_filters_attributes()
+    test_entry_priority()
+    test_non_blocking_lookup_marks_pending()
+    test_refresh_ahead()
+    test_refresher_thread()
+    test_directory_preload()
+    test_disabled_helper()
+    print("\n✓ Alle Tests erfolgreich abgeschlossen!")
+
+
+if __name__ == '__main__':
+    main()
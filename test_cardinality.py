@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests für das Kardinalitäts-Budget
+Prüft Top-N, "other"-Eintrag und Label-Verzicht ohne License Server
+"""
+
+import sys
+
+sys.path.append('.')
+
+from cardinality import CardinalityBudget, OTHER
+
+USER_LABELS = ('server', 'vendor', 'feature', 'user', 'hostname', 'display', 'location', 'department')
+
+
+def user_row(user, host, feature='SOLIDWORKS', count=1, location='Stuttgart'):
+    """Eine Serie von flexlm_user_licenses"""
+    return (('lic:27000', 'solidworks', feature, user, host, host, location, 'Konstruktion'), count)
+
+
+def test_top_n_folds_rest_into_other():
+    """Nur die Top-N Benutzer behalten ihre Labels, der Rest wird summiert"""
+    print("=== Test: Top-N ===")
+    rows = [
+        user_row('mmueller', 'WS1', count=3),
+        user_row('aschmidt', 'WS2', count=2),
+        user_row('aschmidt', 'WS2', feature='PDM', count=1),
+        user_row('gast1', 'WS3'),
+        user_row('gast2', 'WS4'),
+        user_row('gast3', 'WS5', location='Berlin'),
+    ]
+    budget = CardinalityBudget(top_n={'flexlm_user_licenses': 2})
+    labelnames, result = budget.apply('flexlm_user_licenses', USER_LABELS, rows)
+
+    assert labelnames == USER_LABELS
+    values = {labels[3:7]: value for labels, value in result}
+    assert values[('mmueller', 'WS1', 'WS1', 'Stuttgart')] == 3
+    # Der Rest wird pro verbleibender Label-Kombination (hier Standort) zusammengefasst
+    assert values[(OTHER, OTHER, OTHER, 'Stuttgart')] == 2
+    assert values[(OTHER, OTHER, OTHER, 'Berlin')] == 1
+    assert sum(value for _, value in result) == sum(value for _, value in rows)
+    assert budget.suppressed == {'flexlm_user_licenses': 1}
+    print(f"✓ {len(rows)} Serien -> {len(result)} Serien")
+
+
+def test_drop_labels():
+    """Entfallene Labels führen zu addierten Serien"""
+    print("\n=== Test: Label-Verzicht ===")
+    rows = [user_row('mmueller', 'WS1'), user_row('mmueller', 'WS2'), user_row('aschmidt', 'WS3')]
+    budget = CardinalityBudget.parse(drop_labels=['flexlm_user_licenses=hostname',
+                                                  'flexlm_user_licenses=display'])
+    labelnames, result = budget.apply('flexlm_user_licenses', USER_LABELS, rows)
+
+    assert 'hostname' not in labelnames and 'display' not in labelnames
+    values = {labels[3]: value for labels, value in result}
+    assert values == {'mmueller': 2, 'aschmidt': 1}
+    assert budget.suppressed['flexlm_user_licenses'] == 1
+    print("✓ hostname und display entfernt")
+
+
+def test_unconfigured_family_unchanged():
+    """Ohne Budget bleiben die Serien unverändert"""
+    print("\n=== Test: Ohne Budget ===")
+    rows = [user_row('mmueller', 'WS1'), user_row('aschmidt', 'WS2')]
+    budget = CardinalityBudget(top_n={'flexlm_host_licenses_total': 1})
+    assert budget.apply('flexlm_user_licenses', USER_LABELS, rows) == (USER_LABELS, rows)
+    assert budget.suppressed == {}
+    assert not CardinalityBudget()
+    print("✓ Unverändert")
+
+
+def test_invalid_configuration():
+    """Fehlerhafte Angaben werden beim Start abgelehnt, nicht erst beim Scrape"""
+    print("\n=== Test: Ungültige Angaben ===")
+    for top_n, drop in ((['flexlm_user_licenses'], []), (['flexlm_server_up=5'], []),
+                        (['flexlm_user_licenses=0'], []), ([], ['flexlm_user_licenses=server']),
+                        ([], ['flexlm_host_licenses_total=department'])):
+        try:
+            CardinalityBudget.parse(top_n, drop)
+            assert False, f"Angabe {top_n} {drop} wurde akzeptiert"
+        except ValueError:
+            pass
+    print("✓ Ungültige Angaben abgelehnt")
+
+
+def main():
+    """Führt alle Tests aus"""
+    print("Kardinalitäts-Budget Tests")
+    print("=" * 40)
+    test_top_n_folds_rest_into_other()
+    test_drop_labels()
+    test_unconfigured_family_unchanged()
+    test_invalid_configuration()
+    print("\n✓ Alle Tests erfolgreich abgeschlossen!")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Tests für den Circuit Breaker
+Verwendet eine steuerbare Uhr und festen Jitter - läuft ohne Wartezeiten
+"""
+
+import sys
+
+sys.path.append('.')
+
+from circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+class FakeClock:
+    """Steuerbare Uhr für den Backoff"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def no_jitter(low, high):
+    return 0.0
+
+
+def test_opens_after_threshold():
+    """Erst nach `failure_threshold` Fehlern in Folge wird der Server übersprungen"""
+    print("=== Test: Schwellwert ===")
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, initial_backoff=30, clock=clock, random_uniform=no_jitter)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    # Ein Erfolg setzt den Zähler zurück
+    breaker.record_success()
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == OPEN and breaker.opens == 1
+    assert not breaker.allow()
+    assert breaker.retry_in() == 30
+    print("✓ Offen nach 3 Fehlern in Folge")
+
+
+def test_exponential_backoff():
+    """Jede erfolglose Prüfung verdoppelt den Abstand bis zum Maximum, ein Erfolg schließt"""
+    print("\n=== Test: Exponentieller Backoff ===")
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, initial_backoff=10, max_backoff=40,
+                             clock=clock, random_uniform=no_jitter)
+    breaker.record_failure()
+
+    for expected in (20, 40, 40):
+        clock.now += breaker.backoff - 1
+        assert not breaker.allow()
+        clock.now += 1
+        assert breaker.allow() and breaker.state == HALF_OPEN
+        # Während der Prüfung wird kein zweiter Aufruf zugelassen
+        assert not breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == OPEN and breaker.backoff == expected
+    assert breaker.opens == 1
+
+    clock.now += breaker.backoff
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+    # Ein erneuter Ausfall beginnt wieder beim kleinsten Abstand
+    breaker.record_failure()
+    assert breaker.backoff == 10 and breaker.opens == 2
+    print("✓ Backoff 10s, 20s, 40s, 40s - nach Erfolg wieder 10s")
+
+
+def test_defer():
+    """Eine ausgefallene Prüfung öffnet den Breaker wieder, ohne Fehler und Backoff zu ändern"""
+    print("\n=== Test: Prüfung verschieben ===")
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, initial_backoff=10, clock=clock, random_uniform=no_jitter)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow() and breaker.state == HALF_OPEN
+
+    breaker.defer(5)
+    assert breaker.state == OPEN and breaker.retry_in() == 5
+    assert breaker.failures == 1 and breaker.backoff == 10
+    clock.now += 5
+    assert breaker.allow() and breaker.state == HALF_OPEN
+
+    # Geschlossen bleibt geschlossen
+    breaker.record_success()
+    breaker.defer(5)
+    assert breaker.state == CLOSED and breaker.allow()
+    print("✓ Zurück nach open, nächster Versuch nach 5s")
+
+
+def test_jitter():
+    """Der Abstand wird um ±jitter gestreut"""
+    print("\n=== Test: Jitter ===")
+    clock = FakeClock()
+    spreads = []
+
+    def uniform(low, high):
+        spreads.append((low, high))
+        return high
+
+    breaker = CircuitBreaker(failure_threshold=1, initial_backoff=100, jitter=0.2,
+                             clock=clock, random_uniform=uniform)
+    breaker.record_failure()
+    assert spreads == [(-20.0, 20.0)]
+    assert breaker.retry_in() == 120
+    print("✓ 100s ± 20s")
+
+
+def main():
+    """Führt alle Tests aus"""
+    print("Circuit Breaker Tests")
+    print("=" * 40)
+    test_opens_after_threshold()
+    test_exponential_backoff()
+    test_defer()
+    test_jitter()
+    print("\n✓ Alle Tests erfolgreich abgeschlossen!")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Tests für die Collection Engine
+Prüft Snapshot-Austausch und Poll-Takt ohne echten License Server
+"""
+
+import sys
+import time
+import dataclasses
+
+sys.path.append('.')
+
+from collection_engine import (CollectionEngine, LicenseSnapshot, LicenseTarget, FeatureState,
+                               UserCheckout, summarize_checkouts)
+
+
+def make_snapshot(server: str = "localhost:27000", used: int = 1) -> LicenseSnapshot:
+    """Erzeugt einen einfachen Test-Snapshot"""
+    return LicenseSnapshot(
+        server=server,
+        created_at=time.time(),
+        duration=0.01,
+        success=True,
+        server_up=True,
+        features=(FeatureState('SOLIDWORKS', 'solidworks', 10, used, 10 - used),)
+    )
+
+
+def test_snapshot_is_immutable():
+    """Snapshots dürfen nach dem Erzeugen nicht verändert werden"""
+    print("=== Test: Snapshot unveränderlich ===")
+    snapshot = make_snapshot()
+    try:
+        snapshot.server_up = False
+        assert False, "Snapshot konnte verändert werden"
+    except dataclasses.FrozenInstanceError:
+        pass
+    assert isinstance(snapshot.features, tuple)
+    print("✓ Snapshot ist unveränderlich")
+
+
+def test_target_parsing():
+    """Targets werden in lmutil- und host:port-Schreibweise akzeptiert"""
+    print("\n=== Test: Target-Parsing ===")
+    assert LicenseTarget.parse("27000@lic-ansys") == LicenseTarget("lic-ansys", 27000)
+    assert LicenseTarget.parse("lic-ansys:27000") == LicenseTarget("lic-ansys", 27000)
+    assert LicenseTarget("lic-ansys", 27000).spec == "27000@lic-ansys"
+    assert LicenseTarget("lic-ansys", 27000).label == "lic-ansys:27000"
+    try:
+        LicenseTarget.parse("lic-ansys")
+        assert False, "Ungültiges Target wurde akzeptiert"
+    except ValueError:
+        pass
+    print("✓ Targets korrekt geparst")
+
+
+def test_summarize_checkouts():
+    """Alle Zähler in einem Durchlauf, Unterstriche in Namen bleiben erhalten"""
+    print("\n=== Test: Aggregation ===")
+    checkouts = [
+        UserCheckout('SW_PREMIUM', 'solidworks', 'mmueller', 'WS_STR_01', 'WS_STR_01', 'Werk_2', 'Konstruktion'),
+        UserCheckout('SW_PREMIUM', 'solidworks', 'mmueller', 'WS_STR_01', 'WS_STR_01', 'Werk_2', 'Konstruktion'),
+        UserCheckout('SW_PDM', 'solidworks', 'aschmidt', 'WS_STR_02', 'WS_STR_02', 'Werk_2', 'Simulation'),
+        UserCheckout('SW_PDM', 'solidworks', 'mmueller', 'WS_STR_01', 'WS_STR_01', 'Werk_2', 'Konstruktion'),
+    ]
+    summary = summarize_checkouts(iter(checkouts))
+
+    assert summary.users == tuple(checkouts)
+    assert dict(summary.user_licenses)[checkouts[0]] == 2
+    assert sorted(summary.location_licenses) == [('Werk_2', 'SW_PDM', 2), ('Werk_2', 'SW_PREMIUM', 2)]
+    assert sorted(summary.host_licenses) == [('WS_STR_01', 'Werk_2', 3), ('WS_STR_02', 'Werk_2', 1)]
+    assert summary.location_users == (('Werk_2', 2),)
+    print("✓ Zähler korrekt, keine vermischten Serien")
+
+
+def test_poll_once_swaps_snapshot():
+    """poll_once veröffentlicht die neuen Snapshots und ruft den Callback auf"""
+    print("\n=== Test: Snapshot-Austausch ===")
+    calls = []
+    received = []
+    target = LicenseTarget("localhost", 27000)
+
+    def poll(target):
+        calls.append(1)
+        return make_snapshot(target.label, used=len(calls))
+
+    engine = CollectionEngine(poll, [target], interval=60, on_snapshot=received.append)
+    assert len(engine.snapshots) == 0
+    assert engine.snapshot_age() is None
+
+    first = engine.poll_once()[target.label]
+    assert engine.snapshots[target.label] is first
+    previous = engine.snapshots
+    second = engine.poll_once()[target.label]
+    assert engine.snapshots[target.label] is second
+    assert engine.snapshots[target.label].features[0].used == 2
+    # Das alte Mapping bleibt für Leser unverändert
+    assert previous[target.label] is first
+    assert received == [first, second]
+    assert 0 <= engine.snapshot_age() < 5
+    print("✓ Snapshot wird atomar ersetzt")
+
+
+def test_parallel_polling():
+    """Mehrere Server werden parallel gepollt - Zyklus dauert so lange wie der langsamste"""
+    print("\n=== Test: Paralleles Polling ===")
+    targets = [LicenseTarget(f"lic-{i}", 27000 + i) for i in range(4)]
+
+    def poll(target):
+        time.sleep(0.2)
+        return make_snapshot(target.label)
+
+    engine = CollectionEngine(poll, targets, interval=60, max_workers=4)
+    start = time.monotonic()
+    snapshots = engine.poll_once()
+    elapsed = time.monotonic() - start
+    engine.stop()
+
+    assert set(snapshots) == {t.label for t in targets}
+    assert elapsed < 0.6, f"Zyklus dauerte {elapsed:.2f}s - Polls liefen nicht parallel"
+    print(f"✓ 4 Server in {elapsed:.2f}s gepollt")
+
+
+def test_failed_poll_keeps_previous_snapshot():
+    """Wirft ein Poll eine Exception, bleibt der letzte Snapshot des Servers erhalten"""
+    print("\n=== Test: Fehlerhafter Poll ===")
+    target = LicenseTarget("localhost", 27000)
+    fail = []
+
+    def poll(target):
+        if fail:
+            raise RuntimeError("lmutil kaputt")
+        return make_snapshot(target.label)
+
+    engine = CollectionEngine(poll, [target], interval=60)
+    first = engine.poll_once()[target.label]
+    fail.append(True)
+    assert engine.poll_once()[target.label] is first
+    engine.stop()
+    print("✓ Letzter Snapshot bleibt erhalten")
+
+
+def test_background_thread_polls():
+    """Der Hintergrund-Thread pollt selbstständig im eingestellten Intervall"""
+    print("\n=== Test: Hintergrund-Poll ===")
+    calls = []
+
+    def poll(target):
+        calls.append(time.monotonic())
+        return make_snapshot(target.label)
+
+    engine = CollectionEngine(poll, [LicenseTarget("localhost", 27000)], interval=0.05)
+    engine.start()
+    try:
+        deadline = time.time() + 2
+        while len(calls) < 3 and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        engine.stop(timeout=1)
+
+    assert len(calls) >= 3, f"Nur {len(calls)} Polls"
+    assert engine.snapshots
+    print(f"✓ {len(calls)} Polls im Hintergrund")
+
+
+def main():
+    """Führt alle Tests aus"""
+    print("Collection Engine Tests")
+    print("=" * 40)
+    test_snapshot_is_immutable()
+    test_target_parsing()
+    test_summarize_checkouts()
+    test_poll_once_swaps_snapshot()
+    test_parallel_polling()
+    test_failed_poll_keeps_previous_snapshot()
+    test_background_thread_polls()
+    print("\n✓ Alle Tests erfolgreich abgeschlossen!")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Tests für die Anreicherungs-Pipeline
+Prüft Priorität, Caches und Messwerte mit einfachen Test-Stufen
+"""
+
+import sys
+
+sys.path.append('.')
+
+from enrichment import Enrichment, EnrichmentPipeline, EnrichmentStage, ActiveDirectoryStage
+from active_directory_helper import UserInfo
+
+
+class FakeClock:
+    """Steuerbare Uhr für die Stage-Caches"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class DictStage(EnrichmentStage):
+    """Stufe über ein festes Dict, zeichnet alle Batch-Abfragen auf"""
+
+    def __init__(self, name, key, data, provides=('location', 'department'), cache_ttl=0.0):
+        self.name = name
+        self.key = key
+        self.data = data
+        self.provides = provides
+        self.cache_ttl = cache_ttl
+        self.calls = []
+
+    def resolve_batch(self, keys):
+        self.calls.append(list(keys))
+        return {key: self.data[key] for key in keys if key in self.data}
+
+
+CHECKOUTS = [('mmueller', 'WS-STR-01'), ('aschmidt', 'WS-BER-07'), ('mmueller', 'WS-STR-01'),
+             ('gast', 'PC-ADMIN')]
+
+
+def test_priority_merge():
+    """Pro Feld gewinnt die erste Stufe mit Ergebnis, fehlende Felder werden "Unknown" """
+    print("=== Test: Priorität ===")
+    users = DictStage('users', 'user', {'mmueller': Enrichment('Stuttgart', 'Konstruktion')})
+    hosts = DictStage('hosts', 'host', {'WS-STR-01': Enrichment('Stuttgart Werk 2'),
+                                        'WS-BER-07': Enrichment('Berlin')}, provides=('location',))
+    directory = DictStage('ad', 'user', {'aschmidt': Enrichment('Hamburg', 'Simulation'),
+                                         'gast': Enrichment('', 'Extern')})
+    pipeline = EnrichmentPipeline([users, hosts, directory])
+
+    result = pipeline.run(CHECKOUTS)
+    assert result[('mmueller', 'WS-STR-01')] == ('Stuttgart', 'Konstruktion')
+    assert result[('aschmidt', 'WS-BER-07')] == ('Berlin', 'Simulation')
+    assert result[('gast', 'PC-ADMIN')] == ('Unknown', 'Extern')
+    print("✓ Felder nach Priorität zusammengeführt")
+
+
+def test_stages_only_asked_for_open_fields():
+    """Jeder Schlüssel wird einmal abgefragt, vollständige Checkouts überspringen spätere Stufen"""
+    print("\n=== Test: Nur offene Schlüssel ===")
+    users = DictStage('users', 'user', {'mmueller': Enrichment('Stuttgart', 'Konstruktion')})
+    hosts = DictStage('hosts', 'host', {}, provides=('location',))
+    directory = DictStage('ad', 'user', {})
+    EnrichmentPipeline([users, hosts, directory]).run(CHECKOUTS)
+
+    assert users.calls == [['mmueller', 'aschmidt', 'gast']]
+    # mmueller ist vollständig - weder Host- noch AD-Stufe werden für ihn gefragt
+    assert hosts.calls == [['WS-BER-07', 'PC-ADMIN']]
+    assert directory.calls == [['aschmidt', 'gast']]
+    print("✓ Keine überflüssigen Abfragen")
+
+
+def test_stage_cache():
+    """Jede Stufe hat ihren eigenen Cache mit eigener TTL"""
+    print("\n=== Test: Stage-Cache ===")
+    clock = FakeClock()
+    cached = DictStage('cached', 'host', {'WS-STR-01': Enrichment('Stuttgart')},
+                       provides=('location',), cache_ttl=60)
+    uncached = DictStage('uncached', 'user', {'mmueller': Enrichment('', 'Konstruktion')})
+    pipeline = EnrichmentPipeline([cached, uncached], clock=clock)
+
+    pipeline.run([('mmueller', 'WS-STR-01'), ('gast', 'PC-ADMIN')])
+    pipeline.run([('mmueller', 'WS-STR-01'), ('gast', 'PC-ADMIN')])
+    # Auch "nichts gefunden" wird gecacht
+    assert cached.calls == [['WS-STR-01', 'PC-ADMIN']]
+    assert len(uncached.calls) == 2
+    assert pipeline.last_stats[0].cache_hits == 2
+
+    clock.now += 61
+    pipeline.run([('mmueller', 'WS-STR-01')])
+    assert cached.calls[-1] == ['WS-STR-01']
+    print("✓ Cache pro Stufe mit TTL")
+
+
+def test_stats_and_errors():
+    """Messwerte pro Stufe; eine fehlerhafte Stufe bricht die Pipeline nicht ab"""
+    print("\n=== Test: Messwerte und Fehler ===")
+
+    class BrokenStage(EnrichmentStage):
+        name = 'broken'
+        cache_ttl = 60
+
+        def resolve_batch(self, keys):
+            raise ConnectionError("Quelle nicht erreichbar")
+
+    observed = []
+    hosts = DictStage('hosts', 'host', {'WS-STR-01': Enrichment('Stuttgart')}, provides=('location',))
+    pipeline = EnrichmentPipeline([BrokenStage(), hosts], observer=observed.append)
+    result = pipeline.run([('mmueller', 'WS-STR-01'), ('gast', 'PC-ADMIN')])
+
+    assert result[('mmueller', 'WS-STR-01')] == ('Stuttgart', 'Unknown')
+    assert [s.stage for s in observed] == ['broken', 'hosts']
+    assert observed[0].error and observed[0].answered == 0
+    # Fehler werden nicht gecacht
+    assert len(pipeline.cache('broken')) == 0
+    assert (observed[1].requested, observed[1].answered) == (2, 1)
+    print("✓ Messwerte erfasst, Fehler isoliert")
+
+
+def test_ad_stage_does_not_cache_pending():
+    """Noch nicht aufgelöste AD-Benutzer werden im nächsten Zyklus erneut angefragt"""
+    print("\n=== Test: AD-Stufe ===")
+
+    class FakeHelper:
+        def __init__(self):
+            self.calls = []
+
+        def get_users_info(self, usernames):
+            self.calls.append(list(usernames))
+            return {
+                'mmueller': UserInfo('mmueller', location='Stuttgart', department='Konstruktion'),
+                'neu': UserInfo('neu', location='pending'),
+                'unbekannt': UserInfo('unbekannt', location='Unknown'),
+            }
+
+    helper = FakeHelper()
+    pipeline = EnrichmentPipeline([ActiveDirectoryStage(helper)])
+    checkouts = [('mmueller', 'WS1'), ('neu', 'WS2'), ('unbekannt', 'WS3')]
+    result = pipeline.run(checkouts)
+    assert result[('neu', 'WS2')] == ('pending', 'Unknown')
+    assert result[('unbekannt', 'WS3')] == ('Unknown', 'Unknown')
+
+    pipeline.run(checkouts)
+    assert helper.calls[-1] == ['neu']
+    print("✓ 'pending' nicht gecacht")
+
+
+def main():
+    """Führt alle Tests aus"""
+    print("Anreicherungs-Pipeline Tests")
+    print("=" * 40)
+    test_priority_merge()
+    test_stages_only_asked_for_open_fields()
+    test_stage_cache()
+    test_stats_and_errors()
+    test_ad_stage_does_not_cache_pending()
+    print("\n✓ Alle Tests erfolgreich abgeschlossen!")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,8 +4,10 @@ Test-Skript für den FlexLM Exporter
 Testet die Funktionalität ohne echten License Server
 """
 
+import os
 import sys
 import time
+import tempfile
 import requests
 from unittest.mock import patch, MagicMock
 import threading
@@ -122,6 +124,635 @@ Users of SOLIDWORKS:  (Total of 5 licenses issued;  Total of 2 licenses in use)
             
             print("✓ Mock Exporter Test erfolgreich!")
 
+def test_multiple_targets():
+    """Testet mehrere License Server in einem Exporter ohne lmutil im Scrape-Pfad"""
+    print("\n=== Test: Mehrere License Server ===")
+    
+    sys.path.append('.')
+    from flexlm_exporter import FlexLMExporter
+    from prometheus_client import generate_latest
+    
+    calls = []
+    
+    def mock_run_lmutil_command(self, args):
+        calls.append(args[-1])
+        return 0, """
+localhost: license server UP (MASTER) v11.18.1
+SolidWorksNetworkLicense: UP v11.18.1
+Users of SOLIDWORKS:  (Total of 3 licenses issued;  Total of 1 licenses in use)
+    testuser TESTPC TESTPC (v2023.0400) (localhost/27000 1234), start Wed 8/4 14:25
+""", ""
+    
+    with patch.object(FlexLMExporter, 'run_lmutil_command', mock_run_lmutil_command):
+        exporter = FlexLMExporter(targets=["27000@lic-a", "27001@lic-b"], enable_ad=False)
+        # Zweite Instanz im selben Prozess darf nicht kollidieren
+        FlexLMExporter(targets=["27000@lic-a"], enable_ad=False)
+        
+        exporter.collect_metrics()
+        assert sorted(calls) == ["27000@lic-a", "27001@lic-b"]
+        
+        # Scrapes lesen nur den Snapshot
+        output = generate_latest(exporter.registry).decode()
+        assert len(calls) == 2
+        assert 'flexlm_server_up{server="lic-a:27000"} 1.0' in output
+        assert 'flexlm_server_up{server="lic-b:27001"} 1.0' in output
+        assert 'flexlm_snapshot_age_seconds{server="lic-b:27001"}' in output
+        from prometheus_client.utils import floatToGoString
+        created_at = floatToGoString(exporter.engine.snapshots["lic-b:27001"].created_at)
+        assert f'flexlm_snapshot_timestamp_seconds{{server="lic-b:27001"}} {created_at}' in output
+        
+    print("✓ Mehrere License Server Test erfolgreich!")
+
+def test_location_map():
+    """Testet die Standort-Zuordnung aus Standort-Datei und Standort-Regeln ohne AD"""
+    print("\n=== Test: Standort-Datei ===")
+    
+    sys.path.append('.')
+    from flexlm_exporter import FlexLMExporter
+    from prometheus_client import generate_latest
+    
+    def mock_run_lmutil_command(self, args):
+        return 0, """
+localhost: license server UP (MASTER) v11.18.1
+Users of SOLIDWORKS:  (Total of 3 licenses issued;  Total of 2 licenses in use)
+    mmueller WS-STR-01 WS-STR-01 (v2023.0400) (localhost/27000 1234), start Wed 8/4 14:25
+    gast WS-BER-07 WS-BER-07 (v2023.0400) (localhost/27000 1235), start Wed 8/4 14:25
+""", ""
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'locations.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("type,name,location,department\n"
+                    "user,mmueller,Stuttgart,Konstruktion\n"
+                    "host,WS-BER-07,Berlin,\n")
+        
+        with patch.object(FlexLMExporter, 'run_lmutil_command', mock_run_lmutil_command):
+            exporter = FlexLMExporter(targets=["27000@localhost"], enable_ad=False, location_map_file=path)
+            exporter.collect_metrics()
+            output = generate_latest(exporter.registry).decode()
+        
+        assert 'flexlm_location_users_total{location="Stuttgart",server="localhost:27000"} 1.0' in output
+        assert 'department="Konstruktion"' in output
+        # Kein Benutzer-Eintrag - Standort über den Hostnamen
+        assert 'flexlm_location_users_total{location="Berlin",server="localhost:27000"} 1.0' in output
+        
+        # Standort-Regeln: der Rechner bestimmt den Standort, der Benutzer-Eintrag hat Vorrang
+        rules_path = os.path.join(tmp, 'rules.json')
+        with open(rules_path, 'w', encoding='utf-8') as f:
+            f.write('{"hostname_rules": [{"pattern": "WS-BER-\\\\d+", "location": "Berlin Werk 2"}]}')
+        with patch.object(FlexLMExporter, 'run_lmutil_command', mock_run_lmutil_command):
+            exporter = FlexLMExporter(targets=["27000@localhost"], enable_ad=False,
+                                      location_rules_file=rules_path)
+            exporter.collect_metrics()
+            output = generate_latest(exporter.registry).decode()
+        assert 'flexlm_host_licenses_total{hostname="WS-BER-07",location="Berlin Werk 2",server="localhost:27000"} 1.0' in output
+        assert 'flexlm_host_licenses_total{hostname="WS-STR-01",location="Unknown",server="localhost:27000"} 1.0' in output
+    
+    print("✓ Standort-Datei Test erfolgreich!")
+
+def test_released_license_disappears():
+    """Zurückgegebene Lizenzen verschwinden mit dem nächsten Snapshot aus der Ausgabe"""
+    print("\n=== Test: Veraltete Serien ===")
+    
+    sys.path.append('.')
+    from flexlm_exporter import FlexLMExporter
+    from prometheus_client import generate_latest
+    
+    outputs = ["""
+localhost: license server UP (MASTER) v11.18.1
+Users of SOLIDWORKS:  (Total of 3 licenses issued;  Total of 2 licenses in use)
+    mmueller WS-STR-01 WS-STR-01 (v2023.0400) (localhost/27000 1234), start Wed 8/4 14:25
+    gast WS-BER-07 WS-BER-07 (v2023.0400) (localhost/27000 1235), start Wed 8/4 14:25
+""", """
+localhost: license server UP (MASTER) v11.18.1
+Users of SOLIDWORKS:  (Total of 3 licenses issued;  Total of 1 licenses in use)
+    mmueller WS-STR-01 WS-STR-01 (v2023.0400) (localhost/27000 1234), start Wed 8/4 14:25
+"""]
+    
+    def mock_run_lmutil_command(self, args):
+        return 0, outputs.pop(0), ""
+    
+    with patch.object(FlexLMExporter, 'run_lmutil_command', mock_run_lmutil_command):
+        exporter = FlexLMExporter(targets=["27000@localhost"], enable_ad=False)
+        exporter.collect_metrics()
+        output = generate_latest(exporter.registry).decode()
+        assert 'user="gast"' in output
+        assert 'hostname="WS-BER-07"' in output
+        
+        exporter.collect_metrics()
+        output = generate_latest(exporter.registry).decode()
+    
+    assert 'user="gast"' not in output
+    assert 'hostname="WS-BER-07"' not in output
+    assert 'user="mmueller"' in output
+    assert 'flexlm_feature_used_licenses{feature="SOLIDWORKS",server="localhost:27000",vendor="solidworks"} 1.0' in output
+    print("✓ Serie von 'gast' nach Rückgabe entfernt")
+
+def test_cardinality_budget():
+    """Top-N für flexlm_user_licenses mit Ausweis der eingesparten Serien"""
+    print("\n=== Test: Kardinalitäts-Budget ===")
+    
+    sys.path.append('.')
+    from flexlm_exporter import FlexLMExporter
+    from cardinality import CardinalityBudget
+    from prometheus_client import generate_latest
+    
+    def mock_run_lmutil_command(self, args):
+        return 0, """
+localhost: license server UP (MASTER) v11.18.1
+Users of SOLIDWORKS:  (Total of 5 licenses issued;  Total of 3 licenses in use)
+    mmueller WS-STR-01 WS-STR-01 (v2023.0400) (localhost/27000 1234), start Wed 8/4 14:25
+    gast1 WS-BER-07 WS-BER-07 (v2023.0400) (localhost/27000 1235), start Wed 8/4 14:25
+    gast2 WS-BER-08 WS-BER-08 (v2023.0400) (localhost/27000 1236), start Wed 8/4 14:25
+Users of SW_PDM:  (Total of 5 licenses issued;  Total of 1 licenses in use)
+    mmueller WS-STR-01 WS-STR-01 (v2023.0400) (localhost/27000 1237), start Wed 8/4 14:25
+""", ""
+    
+    budget = CardinalityBudget.parse(['flexlm_user_licenses=1'], ['flexlm_user_licenses=display'])
+    with patch.object(FlexLMExporter, 'run_lmutil_command', mock_run_lmutil_command):
+        exporter = FlexLMExporter(targets=["27000@localhost"], enable_ad=False, cardinality=budget)
+        exporter.collect_metrics()
+        output = generate_latest(exporter.registry).decode()
+    
+    assert 'user="gast1"' not in output and 'display=' not in output
+    assert ('flexlm_user_licenses{department="Unknown",feature="SOLIDWORKS",hostname="other",location="Unknown",'
+            'server="localhost:27000",user="other",vendor="solidworks"} 2.0') in output
+    assert 'flexlm_suppressed_series{metric="flexlm_user_licenses"} 1.0' in output
+    print("✓ Benutzer außerhalb der Top-N als 'other' zusammengefasst")
+
+def test_probe():
+    """Probe eines nicht konfigurierten Targets liefert dessen Metriken und probe_success"""
+    print("\n=== Test: Probe ===")
+    
+    sys.path.append('.')
+    from flexlm_exporter import FlexLMExporter
+    from collection_engine import LicenseTarget
+    from cardinality import CardinalityBudget
+    from prometheus_client import generate_latest
+    
+    calls = []
+    
+    def mock_run_lmutil_command(self, args):
+        calls.append(args[-1])
+        return 0, """
+lic-ansys: license server UP (MASTER) v11.18.1
+Users of SOLIDWORKS:  (Total of 3 licenses issued;  Total of 1 licenses in use)
+    testuser TESTPC TESTPC (v2023.0400) (lic-ansys/27000 1234), start Wed 8/4 14:25
+""", ""
+    
+    with patch.object(FlexLMExporter, 'run_lmutil_command', mock_run_lmutil_command):
+        exporter = FlexLMExporter(targets=["27000@localhost"], enable_ad=False,
+                                  cardinality=CardinalityBudget(top_n={'flexlm_user_licenses': 1}))
+        exporter.cardinality.suppressed['flexlm_user_licenses'] = 5
+        result = exporter.probe.probe(LicenseTarget.parse("27000@lic-ansys"))
+        exporter.probe.probe(LicenseTarget.parse("27000@lic-ansys"))
+        
+        body = result.exposition.plain.decode()
+        assert calls == ["27000@lic-ansys"]
+        assert 'flexlm_probe_success 1.0' in body
+        assert 'flexlm_user_licenses{' in body and 'server="lic-ansys:27000"' in body
+        # Eigener Zähler für eingesparte Serien - der von /metrics bleibt unverändert
+        assert 'flexlm_suppressed_series{metric="flexlm_user_licenses"} 0.0' in body
+        assert exporter.cardinality.suppressed['flexlm_user_licenses'] == 5
+        
+        # Das Probe-Target taucht nicht in /metrics auf - weder Snapshot noch Breaker oder lmutil-Zähler
+        assert not exporter.engine.snapshots
+        output = generate_latest(exporter.registry).decode()
+        assert 'lic-ansys' not in output
+        assert 'lic-ansys:27000' in exporter.lmutil_guard.stats
+        
+        # Nicht mehr abgefragte Targets verfallen samt Breaker und lmutil-Zählern
+        exporter.probe.expire_after = 0
+        time.sleep(0.01)
+        exporter.probe.probe(LicenseTarget.parse("27001@lic-ansys"))
+        assert exporter.probe._states.keys() == {'lic-ansys:27001'}
+        assert 'lic-ansys:27000' not in exporter.lmutil_guard.stats
+    print("✓ Probe gecacht und gerendert, Zustand verfällt")
+
+def test_lmutil_coalescing():
+    """Gleichzeitige Polls desselben Servers (z.B. Engine und Probe) teilen sich einen lmutil-Aufruf"""
+    print("\n=== Test: lmutil Single-Flight ===")
+    
+    sys.path.append('.')
+    from flexlm_exporter import FlexLMExporter
+    from prometheus_client import generate_latest
+    
+    calls = []
+    release = threading.Event()
+    
+    def mock_run_lmutil_command(self, args):
+        calls.append(args[-1])
+        release.wait(5)
+        return 0, """
+localhost: license server UP (MASTER) v11.18.1
+Users of SOLIDWORKS:  (Total of 3 licenses issued;  Total of 1 licenses in use)
+    testuser TESTPC TESTPC (v2023.0400) (localhost/27000 1234), start Wed 8/4 14:25
+""", ""
+    
+    with patch.object(FlexLMExporter, 'run_lmutil_command', mock_run_lmutil_command):
+        exporter = FlexLMExporter(targets=["27000@localhost"], enable_ad=False)
+        snapshots = []
+        threads = [threading.Thread(target=lambda: snapshots.append(exporter.build_snapshot()))
+                   for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        release.set()
+        for thread in threads:
+            thread.join()
+        exporter.collect_metrics()
+        output = generate_latest(exporter.registry).decode()
+    
+    assert len(calls) == 2  # 3 gleichzeitige Polls + 1 späterer Poll
+    assert all(snapshot.success for snapshot in snapshots)
+    assert 'flexlm_lmutil_calls_total{result="coalesced",server="localhost:27000"} 2.0' in output
+    assert 'flexlm_lmutil_calls_total{result="executed",server="localhost:27000"} 2.0' in output
+    print("✓ 3 gleichzeitige Polls, 1 lmutil-Aufruf")
+
+def test_circuit_breaker():
+    """Ein ausgefallener Server wird übersprungen, der letzte gute Snapshot als veraltet ausgeliefert"""
+    print("\n=== Test: Circuit Breaker ===")
+    
+    sys.path.append('.')
+    from flexlm_exporter import FlexLMExporter
+    import dataclasses
+    from circuit_breaker import CircuitBreaker
+    from prometheus_client import generate_latest
+    
+    calls = []
+    state = {'up': True}
+    now = [1000.0]
+    
+    def mock_run_lmutil_command(self, args, timeout=30):
+        calls.append(args[1])
+        if not state['up']:
+            return 1, "", "Cannot connect to license server system"
+        return 0, """
+localhost: license server UP (MASTER) v11.18.1
+Users of SOLIDWORKS:  (Total of 3 licenses issued;  Total of 1 licenses in use)
+    testuser TESTPC TESTPC (v2023.0400) (localhost/27000 1234), start Wed 8/4 14:25
+""", ""
+    
+    with patch.object(FlexLMExporter, 'run_lmutil_command', mock_run_lmutil_command):
+        exporter = FlexLMExporter(targets=["27000@localhost"], enable_ad=False)
+        exporter.server_states['localhost:27000'].breaker = CircuitBreaker(
+            failure_threshold=2, initial_backoff=60, clock=lambda: now[0], random_uniform=lambda a, b: 0.0)
+        exporter.collect_metrics()
+        
+        state['up'] = False
+        for failure in (1, 2):
+            exporter.collect_metrics()
+            # Fehler 1..Schwelle: letzter guter Stand statt einer Lücke bis zum Öffnen des Breakers
+            output = generate_latest(exporter.registry).decode()
+            assert 'flexlm_snapshot_stale{server="localhost:27000"} 1.0' in output
+            assert 'flexlm_server_up{server="localhost:27000"} 0.0' in output
+            assert 'flexlm_feature_used_licenses{feature="SOLIDWORKS",server="localhost:27000",vendor="solidworks"} 1.0' in output
+            assert f'flexlm_scrape_errors_total{{server="localhost:27000"}} {failure}.0' in output
+        assert exporter.breaker('localhost:27000').state == 'open'
+        assert calls == ['-a', '-a', '-a']
+        
+        # Breaker offen: kein lmutil-Aufruf, letzter guter Stand als veraltet
+        exporter.collect_metrics()
+        assert len(calls) == 3
+        output = generate_latest(exporter.registry).decode()
+        assert 'flexlm_snapshot_stale{server="localhost:27000"} 1.0' in output
+        assert 'flexlm_server_up{server="localhost:27000"} 0.0' in output
+        assert 'flexlm_feature_used_licenses{feature="SOLIDWORKS",server="localhost:27000",vendor="solidworks"} 1.0' in output
+        assert 'flexlm_circuit_breaker_state{server="localhost:27000"} 1.0' in output
+        assert 'flexlm_circuit_breaker_opens_total{server="localhost:27000"} 1.0' in output
+        assert 'flexlm_scrape_errors_total{server="localhost:27000"} 2.0' in output
+        
+        # Nach dem Backoff: kurze Prüfung ohne -a, bei Erfolg wieder voller Poll
+        now[0] += 60
+        exporter.collect_metrics()
+        assert calls[3:] == ['-c']
+        state['up'] = True
+        now[0] += 120
+        exporter.collect_metrics()
+        assert calls[4:] == ['-c', '-a']
+        output = generate_latest(exporter.registry).decode()
+    
+    assert 'flexlm_snapshot_stale{server="localhost:27000"} 0.0' in output
+    assert 'flexlm_server_up{server="localhost:27000"} 1.0' in output
+    assert 'flexlm_circuit_breaker_state{server="localhost:27000"} 0.0' in output
+    
+    # Probe bei offenem Breaker: veralteter Snapshot ist kein Erfolg
+    from collection_engine import LicenseTarget
+    state['up'] = False
+    with patch.object(FlexLMExporter, 'run_lmutil_command', mock_run_lmutil_command):
+        target = LicenseTarget.parse("27000@lic-down")
+        exporter.probe.state(target.label).breaker = CircuitBreaker(
+            failure_threshold=1, initial_backoff=60, clock=lambda: now[0], random_uniform=lambda a, b: 0.0)
+        exporter.probe.state(target.label).last_good = dataclasses.replace(
+            exporter.engine.snapshots['localhost:27000'], server=target.label)
+        exporter.probe.min_interval = 0
+        exporter.probe.probe(target)
+        body = exporter.probe.probe(target).exposition.plain.decode()
+    assert exporter.breaker(target.label).state == 'open'
+    assert 'flexlm_snapshot_stale{server="lic-down:27000"} 1.0' in body
+    assert 'flexlm_probe_success 0.0' in body
+    print("✓ Übersprungen nach 2 Fehlern, geschlossen nach erfolgreicher Prüfung, Probe ohne Erfolg")
+
+
+def test_circuit_breaker_throttled():
+    """Das lokale lmutil-Limit zählt nicht als Fehler und blockiert den halb offenen Breaker nicht"""
+    print("\n=== Test: Circuit Breaker und lmutil-Limit ===")
+    
+    sys.path.append('.')
+    from flexlm_exporter import FlexLMExporter, THROTTLE_RETRY
+    from circuit_breaker import CircuitBreaker
+    from lmutil_guard import LmutilThrottled
+    from prometheus_client import generate_latest
+    
+    calls = []
+    throttled = set()
+    now = [1000.0]
+    
+    def mock_run_lmutil_command(self, args, timeout=30):
+        calls.append(args[1])
+        return 0, """
+localhost: license server UP (MASTER) v11.18.1
+Users of SOLIDWORKS:  (Total of 3 licenses issued;  Total of 1 licenses in use)
+    testuser TESTPC TESTPC (v2023.0400) (localhost/27000 1234), start Wed 8/4 14:25
+""", ""
+    
+    with patch.object(FlexLMExporter, 'run_lmutil_command', mock_run_lmutil_command):
+        exporter = FlexLMExporter(targets=["27000@localhost"], enable_ad=False)
+        guard_run = exporter.lmutil_guard.run
+        
+        def run(server, args, fn):
+            if args[1] in throttled:
+                raise LmutilThrottled(f"lmutil-Limit für {server} erreicht")
+            return guard_run(server, args, fn)
+        
+        exporter.lmutil_guard.run = run
+        breaker = exporter.server_states['localhost:27000'].breaker = CircuitBreaker(
+            failure_threshold=1, initial_backoff=60, clock=lambda: now[0], random_uniform=lambda a, b: 0.0)
+        
+        # Ohne guten Stand: übersprungen, weder Fehler noch Server down
+        throttled.update({'-a', '-c'})
+        exporter.collect_metrics()
+        assert breaker.state == 'closed' and breaker.failures == 0
+        output = generate_latest(exporter.registry).decode()
+        assert 'flexlm_server_up{server="localhost:27000"}' not in output
+        assert 'flexlm_scrape_errors_total{server="localhost:27000"}' not in output
+        
+        # Breaker halb offen, die Prüfung wird gedrosselt: zurück nach open ohne Backoff-Wachstum
+        breaker.record_failure()
+        now[0] += 60
+        exporter.collect_metrics()
+        assert breaker.state == 'open' and breaker.failures == 1 and breaker.backoff == 60
+        assert breaker.retry_in() == THROTTLE_RETRY
+        
+        # Prüfung erfolgreich, der volle Poll wird gedrosselt: ebenso
+        throttled.discard('-c')
+        now[0] += THROTTLE_RETRY
+        exporter.collect_metrics()
+        assert calls == ['-c']
+        assert breaker.state == 'open' and breaker.failures == 1 and breaker.backoff == 60
+        
+        # Danach lässt der Breaker den nächsten Versuch wieder zu
+        throttled.clear()
+        now[0] += THROTTLE_RETRY
+        exporter.collect_metrics()
+        assert calls == ['-c', '-c', '-a'] and breaker.state == 'closed'
+        output = generate_latest(exporter.registry).decode()
+    
+    assert 'flexlm_server_up{server="localhost:27000"} 1.0' in output
+    print("✓ Gedrosselte Polls ohne Fehler, Breaker nach kurzer Pause wieder offen für Prüfungen")
+
+def test_inventory_tier():
+    """lmstat -i läuft im eigenen Intervall und wird in den Snapshot des Polls eingemischt"""
+    print("\n=== Test: Inventar im eigenen Intervall ===")
+    
+    sys.path.append('.')
+    from flexlm_exporter import FlexLMExporter
+    from prometheus_client import generate_latest
+    
+    calls = []
+    
+    def mock_run_lmutil_command(self, args, timeout=30):
+        calls.append(args[1])
+        if args[1] == '-i':
+            return 0, """
+Feature                         Version     #licenses    Vendor        Expires
+_______                         _________   _________    ______        __________
+SOLIDWORKS                      2023.0400   2            SW_D          31-dec-2025
+SOLIDWORKS                      2023.0400   1            SW_D          30-jun-2025
+""", ""
+        return 0, """
+localhost: license server UP (MASTER) v11.18.1
+Users of SOLIDWORKS:  (Total of 3 licenses issued;  Total of 1 licenses in use)
+    testuser TESTPC TESTPC (v2023.0400) (localhost/27000 1234), start Wed 8/4 14:25
+""", ""
+    
+    with patch.object(FlexLMExporter, 'run_lmutil_command', mock_run_lmutil_command):
+        exporter = FlexLMExporter(targets=["27000@localhost"], enable_ad=False, update_interval=0.1,
+                                  inventory_interval=0.6, lmstat_rate=0)
+        exporter.engine.start()
+        try:
+            deadline = time.time() + 5
+            while time.time() < deadline:
+                snapshot = exporter.engine.snapshots.get('localhost:27000')
+                if snapshot is not None and snapshot.inventory and calls.count('-a') >= 6:
+                    break
+                time.sleep(0.02)
+            output = generate_latest(exporter.registry).decode()
+        finally:
+            exporter.engine.stop(timeout=1)
+    
+    assert snapshot.inventory and snapshot.users
+    assert calls.count('-a') > calls.count('-i') >= 1
+    assert ('flexlm_feature_issued_licenses{feature="SOLIDWORKS",server="localhost:27000",'
+            'vendor="SW_D",version="2023.0400"} 3.0') in output
+    assert ('flexlm_feature_expiry_timestamp_seconds{feature="SOLIDWORKS",server="localhost:27000",'
+            'vendor="SW_D",version="2023.0400"} 1.7512416e+09') in output
+    assert 'flexlm_collection_task_runs_total{result="ok",task="lmstat_i"}' in output
+    print(f"✓ {calls.count('-a')} × lmstat -a, {calls.count('-i')} × lmstat -i, ein Snapshot")
+
+def test_active_only():
+    """lmstat -A liefert nur aktive Features, ruhende kommen aus dem selteneren lmstat -a"""
+    print("\n=== Test: Active-Only-Modus ===")
+    
+    sys.path.append('.')
+    from flexlm_exporter import FlexLMExporter
+    from prometheus_client import generate_latest
+    
+    calls = []
+    active = """
+localhost: license server UP (MASTER) v11.18.1
+Users of SOLIDWORKS:  (Total of 3 licenses issued;  Total of 1 licenses in use)
+    testuser TESTPC TESTPC (v2023.0400) (localhost/27000 1234), start Wed 8/4 14:25
+"""
+    full = active + """
+Users of COSMOSWORKS:  (Total of 5 licenses issued;  Total of 2 licenses in use)
+Users of IDLE_FEATURE:  (Total of 7 licenses issued;  Total of 0 licenses in use)
+"""
+    
+    def mock_run_lmutil_command(self, args, timeout=30):
+        calls.append(args[1])
+        return 0, active if args[1] == '-A' else full, ""
+    
+    with patch.object(FlexLMExporter, 'run_lmutil_command', mock_run_lmutil_command):
+        exporter = FlexLMExporter(targets=["27000@localhost"], enable_ad=False, update_interval=0.1,
+                                  inventory_interval=0, active_only=True, full_interval=0.6, lmstat_rate=0)
+        exporter.engine.start()
+        try:
+            deadline = time.time() + 5
+            while time.time() < deadline:
+                snapshot = exporter.engine.snapshots.get('localhost:27000')
+                if snapshot is not None and len(snapshot.features) == 3 and calls.count('-A') >= 6:
+                    break
+                time.sleep(0.02)
+        finally:
+            exporter.engine.stop(timeout=1)
+        output = generate_latest(exporter.registry).decode()
+    
+    assert calls.count('-A') > calls.count('-a') >= 1
+    assert [feature.name for feature in snapshot.features] == ['SOLIDWORKS', 'COSMOSWORKS', 'IDLE_FEATURE']
+    # Seit dem vollständigen Poll zurückgegeben: nicht mehr in lmstat -A, also 0 belegt
+    assert 'flexlm_feature_used_licenses{feature="COSMOSWORKS",server="localhost:27000",vendor="solidworks"} 0.0' in output
+    assert 'flexlm_feature_available_licenses{feature="IDLE_FEATURE",server="localhost:27000",vendor="solidworks"} 7.0' in output
+    assert 'flexlm_feature_used_licenses{feature="SOLIDWORKS",server="localhost:27000",vendor="solidworks"} 1.0' in output
+    assert f'flexlm_lmstat_output_bytes{{server="localhost:27000"}} {float(len(active))}' in output
+    print(f"✓ {calls.count('-A')} × lmstat -A, {calls.count('-a')} × lmstat -a, 3 Features")
+
+def test_feature_filter_polling():
+    """Feste Feature-Liste: nach der Messung gezielt mit lmstat -f, unerwünschte Features fehlen"""
+    print("\n=== Test: Feature-Filter und lmstat -f ===")
+    
+    sys.path.append('.')
+    from flexlm_exporter import FlexLMExporter
+    from feature_filter import FeatureFilter, MODE_FEATURE
+    from prometheus_client import generate_latest
+    
+    banner = "lmutil - Copyright (c) 1989-2022 Flexera. All Rights Reserved.\n" \
+             "Flexible License Manager status on Wed 8/4/2025 14:30\n\n"
+    header = banner + "License server status: 27000@localhost\n" \
+             "localhost: license server UP (MASTER) v11.18.1\n\n" \
+             "Vendor daemon status (on localhost):\n\nSW_D: UP v11.18.1\nMSC: UP v11.18.1\n\n" \
+             "Feature usage info:\n\n"
+    blocks = {
+        'SOLIDWORKS': """Users of SOLIDWORKS:  (Total of 3 licenses issued;  Total of 1 licenses in use)
+  "SOLIDWORKS" v2023.0400, vendor: SW_D
+    testuser TESTPC TESTPC (v2023.0400) (localhost/27000 1234), start Wed 8/4 14:25
+""",
+        # Ruhend: ohne Benutzer nennt lmstat keinen Vendor
+        'NASTRAN': """Users of NASTRAN:  (Total of 2 licenses issued;  Total of 0 licenses in use)
+""",
+        'UNWANTED': """Users of UNWANTED:  (Total of 50 licenses issued;  Total of 1 licenses in use)
+  "UNWANTED" v2023.0400, vendor: SW_D
+    other OTHERPC OTHERPC (v2023.0400) (localhost/27000 1250), start Wed 8/4 14:25
+""",
+    }
+    inventory = banner + """Feature                         Version     #licenses    Vendor        Expires
+_______                         _________   _________    ______        __________
+SOLIDWORKS                      2023.0400   3            SW_D          permanent
+NASTRAN                         2023.0      2            MSC           permanent
+UNWANTED                        2023.0400   50           SW_D          permanent
+"""
+    calls = []
+    
+    def mock_run_lmutil_command(self, args, timeout=30):
+        calls.append(tuple(args[1:-2]))
+        if args[1] == '-i':
+            return 0, inventory, ""
+        if args[1] == '-f':
+            # Echte lmstat -f Ausgabe: ohne Server- und Daemon-Status
+            return 0, banner + blocks[args[2]], ""
+        time.sleep(0.05)  # vollständige Ausgabe ist teurer
+        return 0, header + "".join(blocks.values()), ""
+    
+    with patch.object(FlexLMExporter, 'run_lmutil_command', mock_run_lmutil_command):
+        exporter = FlexLMExporter(targets=["27000@localhost"], enable_ad=False, lmstat_rate=0,
+                                  feature_filter=FeatureFilter(allow=['SOLIDWORKS', 'NASTRAN'],
+                                                               vendor_deny=['MSC']))
+        # Vendor-Zuordnung aus lmstat -i vor dem ersten Poll: das ruhende NASTRAN (MSC) fehlt sofort
+        exporter.collect_metrics()
+        assert [f.name for f in exporter.engine.snapshots['localhost:27000'].features] == ['SOLIDWORKS']
+        for _ in range(2):
+            exporter.collect_metrics()
+        output = generate_latest(exporter.registry).decode()
+    
+    # Erst -a gemessen, dann -f: beide Features parallel, danach -f als günstigere Variante
+    assert calls[:2] == [('-i',), ('-a',)]
+    assert sorted(calls[2:]) == [('-f', 'NASTRAN'), ('-f', 'NASTRAN'), ('-f', 'SOLIDWORKS'), ('-f', 'SOLIDWORKS')]
+    assert exporter.poll_strategy.current['localhost:27000'] == MODE_FEATURE
+    snapshot = exporter.engine.snapshots['localhost:27000']
+    assert [feature.name for feature in snapshot.features] == ['SOLIDWORKS']
+    assert [user.username for user in snapshot.users] == ['testuser']
+    # Server-Status und Daemons trotz -f (Daemons aus dem letzten -a), Breaker bleibt geschlossen
+    assert snapshot.server_up and not snapshot.stale
+    assert [daemon.name for daemon in snapshot.daemons] == ['SW_D']
+    assert exporter.breaker('localhost:27000').failures == 0
+    assert 'flexlm_server_up{server="localhost:27000"} 1.0' in output
+    # Der Vendor dient nur dem Filter - das vendor-Label bleibt unverändert
+    assert 'flexlm_feature_used_licenses{feature="SOLIDWORKS",server="localhost:27000",vendor="solidworks"} 1.0' in output
+    assert 'UNWANTED' not in output and 'NASTRAN' not in output
+    assert 'flexlm_poll_mode{mode="feature",server="localhost:27000"} 1.0' in output
+    print(f"✓ {len(calls)} lmutil-Aufrufe, nur SOLIDWORKS überwacht")
+
+def test_streaming_lmutil():
+    """Testet den Streaming-Modus mit einem lmutil-Ersatzskript"""
+    print("\n=== Test: Streaming lmutil ===")
+    
+    if os.name == 'nt':
+        print("ℹ️  Test benötigt ein ausführbares Skript - unter Windows übersprungen")
+        return
+    
+    sys.path.append('.')
+    from flexlm_exporter import FlexLMExporter
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fake_lmutil = os.path.join(tmpdir, 'lmutil')
+        with open(fake_lmutil, 'w') as f:
+            f.write(f"""#!{sys.executable}
+import sys
+print("localhost: license server UP (MASTER) v11.18.1")
+print("SolidWorksNetworkLicense: UP v11.18.1")
+print("Users of SOLIDWORKS:  (Total of 300 licenses issued;  Total of 200 licenses in use)")
+for i in range(200):
+    print(f"    user{{i}} PC-{{i}} PC-{{i}} (v2023.0400) (localhost/27000 {{i}}), start Wed 8/4 14:25")
+sys.stderr.write("warnung\\n")
+""")
+        os.chmod(fake_lmutil, 0o755)
+        
+        exporter = FlexLMExporter(targets=["27000@localhost"], lmutil_path=fake_lmutil,
+                                  enable_ad=False, streaming=True)
+        snapshot = exporter.collect_metrics()["localhost:27000"]
+        assert snapshot.success
+        assert snapshot.server_up
+        assert len(snapshot.users) == 200
+        assert snapshot.features[0].used == 200
+        
+        rc, data, stderr = exporter.run_lmutil_stream(["lmstat"], list)
+        assert rc == 0 and len(data) == 203 and stderr == "warnung\n"
+
+        # Parser-Fehler: lmutil wird beendet und abgeholt, kein Zombie
+        import subprocess
+        processes = []
+        original_popen = subprocess.Popen
+        def recording_popen(*args, **kwargs):
+            processes.append(original_popen(*args, **kwargs))
+            return processes[-1]
+        def failing_parser(lines):
+            next(iter(lines))
+            raise ValueError("kaputt")
+        subprocess.Popen = recording_popen
+        try:
+            rc, data, stderr = exporter.run_lmutil_stream(["lmstat"], failing_parser)
+        finally:
+            subprocess.Popen = original_popen
+        assert rc == -1 and data is None and "kaputt" in stderr
+        assert processes[0].returncode is not None
+
+        # Fehlende Binary wird als Fehler gemeldet, ausgeliefert wird der letzte gute Stand
+        exporter.lmutil_path = os.path.join(tmpdir, 'gibt-es-nicht')
+        snapshot = exporter.collect_metrics()["localhost:27000"]
+        assert snapshot.stale and snapshot.error and len(snapshot.users) == 200
+    
+    print("✓ Streaming lmutil Test erfolgreich!")
+
 def test_metrics_endpoint():
     """Testet den HTTP Metrics Endpoint"""
     print("\n=== Test: Metrics Endpoint ===")
@@ -191,6 +822,18 @@ def main():
     try:
         test_lmstat_parsing()
         test_mock_exporter()
+        test_multiple_targets()
+        test_location_map()
+        test_released_license_disappears()
+        test_cardinality_budget()
+        test_probe()
+        test_lmutil_coalescing()
+        test_circuit_breaker()
+        test_circuit_breaker_throttled()
+        test_inventory_tier()
+        test_active_only()
+        test_feature_filter_polling()
+        test_streaming_lmutil()
         test_metrics_endpoint()
         
         print("\n" + "=" * 40)
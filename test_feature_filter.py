@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests für Feature-Filter und die Wahl der Poll-Art
+Läuft ohne License Server
+"""
+
+import sys
+
+sys.path.append('.')
+
+from feature_filter import FeatureFilter, PollStrategy, MODE_ALL, MODE_FEATURE
+
+
+def test_patterns():
+    """Glob und re: treffen den ganzen Namen ohne Groß-/Kleinschreibung, Deny gewinnt"""
+    print("=== Test: Muster ===")
+    feature_filter = FeatureFilter(allow=['SOLIDWORKS*', 're:sim_(flow|plastics)'], deny=['*_TRIAL'])
+    assert feature_filter.allows_feature('solidworks_premium')
+    assert feature_filter.allows_feature('SIM_Flow')
+    assert not feature_filter.allows_feature('SIM_FLOWX')
+    assert not feature_filter.allows_feature('SOLIDWORKS_TRIAL')
+    assert not feature_filter.allows_feature('COSMOSWORKS')
+    assert feature_filter.explicit_features is None
+
+    vendors = FeatureFilter(vendor_deny=['SW_D'])
+    assert vendors and vendors.filters_vendors
+    assert not vendors.allows_vendor('sw_d')
+    assert vendors.allows_vendor('MSC') and vendors.allows_vendor('')
+    assert not FeatureFilter()
+
+    try:
+        FeatureFilter(allow=['re:('])
+        assert False, "Ungültiger Ausdruck akzeptiert"
+    except ValueError:
+        pass
+    print("✓ Glob, Regex und Deny")
+
+
+def test_explicit_features():
+    """Nur feste Namen erlauben lmstat -f - ausgeschlossene Namen entfallen"""
+    print("\n=== Test: Feste Feature-Liste ===")
+    feature_filter = FeatureFilter(allow=['SOLIDWORKS', 'COSMOSWORKS', 'SOLIDWORKS', 'OLD'], deny=['OLD'])
+    assert feature_filter.explicit_features == ('SOLIDWORKS', 'COSMOSWORKS')
+    assert FeatureFilter(deny=['X']).explicit_features is None
+    print("✓ 2 Features für lmstat -f")
+
+
+def test_strategy_by_cost():
+    """Beide Poll-Arten werden gemessen, danach gewinnt die günstigere; regelmäßig wird neu gemessen"""
+    print("\n=== Test: Poll-Art nach Kosten ===")
+    strategy = PollStrategy(('A', 'B'), explore_every=5)
+    assert strategy.choose('srv') == MODE_ALL
+    strategy.record('srv', MODE_ALL, 2.0)
+    assert strategy.choose('srv') == MODE_FEATURE
+    strategy.record('srv', MODE_FEATURE, 0.5)
+
+    # Polls 3 bis 10: der 5. und 10. Poll messen -a erneut
+    modes = [strategy.choose('srv') for _ in range(8)]
+    assert modes == [MODE_FEATURE] * 2 + [MODE_ALL] + [MODE_FEATURE] * 4 + [MODE_ALL]
+
+    # Wird -a günstiger (z.B. durch mehr Features), wechselt die Wahl nach einigen Messungen
+    for _ in range(5):
+        strategy.record('srv', MODE_FEATURE, 5.0)
+    assert strategy.costs['srv'][MODE_FEATURE] > 2.0
+    assert strategy.choose('srv') == MODE_ALL
+    print(f"✓ Kosten -a {strategy.costs['srv'][MODE_ALL]:.1f}s, -f {strategy.costs['srv'][MODE_FEATURE]:.1f}s")
+
+
+def test_call_budget():
+    """Passen die -f Aufrufe nicht ins Rate-Limit, wird immer mit -a gepollt"""
+    print("\n=== Test: Aufruf-Budget ===")
+    strategy = PollStrategy(tuple(f"F{i}" for i in range(15)), call_budget=4)
+    strategy.record('srv', MODE_ALL, 2.0)
+    strategy.record('srv', MODE_FEATURE, 0.1)
+    assert all(strategy.choose('srv') == MODE_ALL for _ in range(30))
+    print("✓ 15 Features bei Burst 4: lmstat -a")
+
+
+def main():
+    """Führt alle Tests aus"""
+    print("Feature-Filter Tests")
+    print("=" * 40)
+    test_patterns()
+    test_explicit_features()
+    test_strategy_by_cost()
+    test_call_budget()
+    print("\n✓ Alle Tests erfolgreich abgeschlossen!")
+
+
+if __name__ == '__main__':
+    main()
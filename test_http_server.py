@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Tests für den HTTP-Server und die vorgerenderte Ausgabe
+Startet den Server auf einem freien Port - ohne License Server
+"""
+
+import sys
+import gzip
+import time
+import socket
+import http.client
+
+sys.path.append('.')
+
+from prometheus_client.core import CollectorRegistry, GaugeMetricFamily
+
+from collection_engine import LicenseSnapshot
+from exposition import ExpositionCache, StaticCollector, render_exposition
+from probe import ProbeCache
+from http_server import start_metrics_server, stop_metrics_server
+
+
+class SnapshotCollector:
+    """Collector, der wie der Exporter einen austauschbaren Stand rendert"""
+
+    def __init__(self):
+        self.generation = object()
+        self.value = 1
+        self.collects = 0
+
+    def collect(self):
+        self.collects += 1
+        yield GaugeMetricFamily('flexlm_test_value', 'Testwert', value=self.value)
+
+
+def make_server(ready=None, request_timeout=5.0, probe=None):
+    """Registry, Cache und Server auf einem freien Port"""
+    collector = SnapshotCollector()
+    registry = CollectorRegistry()
+    registry.register(collector)
+    cache = ExpositionCache(registry, lambda: collector.generation)
+    server = start_metrics_server(0, cache, addr='127.0.0.1', ready=ready, request_timeout=request_timeout,
+                                  probe=probe)
+    return collector, cache, server
+
+
+def get(server, path='/metrics', headers=None):
+    """GET-Anfrage, liefert (Status, Header, Body)"""
+    conn = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=5)
+    try:
+        conn.request('GET', path, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        conn.close()
+
+
+def test_rendered_once_per_snapshot():
+    """Mehrere Scrapes desselben Snapshots rendern die Registry nur einmal"""
+    print("=== Test: Einmal pro Snapshot rendern ===")
+    collector, cache, server = make_server()
+    try:
+        bodies = [get(server)[2] for _ in range(5)]
+        assert len(set(bodies)) == 1
+        assert b'flexlm_test_value 1.0' in bodies[0]
+        assert (cache.renders, collector.collects) == (1, 1)
+
+        # Neuer Snapshot -> neues Rendern beim nächsten Scrape
+        collector.value = 2
+        collector.generation = object()
+        assert b'flexlm_test_value 2.0' in get(server)[2]
+        assert cache.renders == 2
+    finally:
+        stop_metrics_server(server)
+    print("✓ 5 Scrapes, 1 Rendern")
+
+
+def test_gzip_and_etag():
+    """gzip nur auf Anfrage, ETag mit 304 bei unverändertem Stand"""
+    print("\n=== Test: gzip und ETag ===")
+    collector, cache, server = make_server()
+    try:
+        status, headers, plain = get(server)
+        assert status == 200 and 'Content-Encoding' not in headers
+        etag = headers['ETag']
+
+        status, headers, body = get(server, headers={'Accept-Encoding': 'gzip, deflate'})
+        assert headers['Content-Encoding'] == 'gzip'
+        assert headers['ETag'] == etag
+        assert gzip.decompress(body) == plain
+
+        status, headers, body = get(server, headers={'If-None-Match': etag})
+        assert status == 304 and body == b''
+
+        collector.generation = object()
+        collector.value = 3
+        status, headers, body = get(server, headers={'If-None-Match': etag})
+        assert status == 200 and headers['ETag'] != etag
+
+        assert get(server, '/unbekannt')[0] == 404
+    finally:
+        stop_metrics_server(server)
+    print("✓ gzip, ETag und 304")
+
+
+def test_header_negotiation():
+    """q=0 schließt gzip aus, If-None-Match mit * und schwachen ETags"""
+    print("\n=== Test: Header-Parameter ===")
+    collector, cache, server = make_server()
+    try:
+        status, headers, plain = get(server)
+        etag = headers['ETag']
+
+        for accept in ('gzip;q=0', 'gzip; q=0.0, identity', '*;q=0.5, gzip;q=0'):
+            status, headers, body = get(server, headers={'Accept-Encoding': accept})
+            assert 'Content-Encoding' not in headers and body == plain, accept
+        for accept in ('gzip;q=0.5', 'deflate, *', 'GZIP'):
+            status, headers, body = get(server, headers={'Accept-Encoding': accept})
+            assert headers.get('Content-Encoding') == 'gzip', accept
+
+        for match in ('*', f'W/{etag}', f'"anders", {etag}'):
+            assert get(server, headers={'If-None-Match': match})[0] == 304, match
+        assert get(server, headers={'If-None-Match': '"anders"'})[0] == 200
+    finally:
+        stop_metrics_server(server)
+    print("✓ q-Werte und ETag-Vergleich")
+
+
+def test_max_age_rerenders():
+    """Ohne neuen Snapshot wird nach max_age neu gerendert (Alter, HTTP-Zähler)"""
+    print("\n=== Test: max_age ===")
+    collector = SnapshotCollector()
+    registry = CollectorRegistry()
+    registry.register(collector)
+    now = [100.0]
+    cache = ExpositionCache(registry, lambda: collector.generation, max_age=5.0, clock=lambda: now[0])
+    first = cache.get()
+    now[0] += 4.9
+    assert cache.get() is first and cache.renders == 1
+
+    # Polling hängt: derselbe Snapshot, aber die Ausgabe wird trotzdem erneuert
+    collector.value = 7
+    now[0] += 0.2
+    assert b'flexlm_test_value 7.0' in cache.get().plain
+    assert cache.renders == 2
+    print("✓ Nach max_age neu gerendert")
+
+
+def test_health_and_ready():
+    """/health antwortet immer, /ready erst mit dem ersten Snapshot"""
+    print("\n=== Test: /health und /ready ===")
+    snapshots = {}
+    collector, cache, server = make_server(ready=lambda: bool(snapshots))
+    try:
+        assert get(server, '/health')[0] == 200
+        assert get(server, '/ready')[0] == 503
+        snapshots['lic:27000'] = object()
+        assert get(server, '/ready')[0] == 200
+        # Keiner der Endpunkte rendert oder fragt den Collector ab
+        assert collector.collects == 0
+    finally:
+        stop_metrics_server(server)
+    print("✓ /ready wartet auf den ersten Snapshot")
+
+
+def test_keep_alive_and_request_metrics():
+    """Mehrere Anfragen über eine Verbindung, gezählt pro Pfad"""
+    print("\n=== Test: Keep-Alive und Anfrage-Metriken ===")
+    collector, cache, server = make_server()
+    try:
+        conn = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=5)
+        for path in ('/metrics', '/health', '/metrics', '/nicht-da'):
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if path != '/nicht-da':
+                assert not response.will_close, "Verbindung wurde geschlossen"
+        conn.close()
+
+        # Neuer Snapshot, damit die Anfrage-Metriken neu gerendert werden
+        collector.generation = object()
+        body = get(server)[2].decode()
+        assert 'flexlm_http_requests_total{code="200",path="/metrics"} 2.0' in body
+        assert 'flexlm_http_requests_total{code="200",path="/health"} 1.0' in body
+        assert 'flexlm_http_requests_total{code="404",path="other"} 1.0' in body
+        assert 'flexlm_http_request_duration_seconds_count{path="/metrics"} 2.0' in body
+    finally:
+        stop_metrics_server(server)
+    print("✓ Vier Anfragen über eine Verbindung")
+
+
+def test_slow_client_does_not_block():
+    """Ein Client ohne vollständige Anfrage hält andere Scraper nicht auf und wird getrennt"""
+    print("\n=== Test: Langsamer Client ===")
+    collector, cache, server = make_server(request_timeout=0.5)
+    try:
+        slow = socket.create_connection(('127.0.0.1', server.server_address[1]))
+        slow.sendall(b'GET /metrics HTTP/1.1\r\n')
+        start = time.monotonic()
+        assert get(server)[0] == 200
+        assert time.monotonic() - start < 0.5
+
+        slow.settimeout(5)
+        # Nach dem Timeout schließt der Server die Verbindung
+        assert slow.recv(1024) == b''
+        slow.close()
+    finally:
+        stop_metrics_server(server)
+    print("✓ Andere Scraper sofort bedient, langsamer Client getrennt")
+
+
+def test_probe_endpoint():
+    """/probe pollt das angegebene Target und prüft den Parameter"""
+    print("\n=== Test: /probe ===")
+    polled = []
+
+    def poll(target):
+        polled.append(target.label)
+        return LicenseSnapshot(server=target.label, created_at=time.time(), duration=0.01, success=True)
+
+    def render(snapshot):
+        return render_exposition(StaticCollector([GaugeMetricFamily(
+            'flexlm_probe_success', 'Probe erfolgreich', value=1)]), snapshot)
+
+    collector, cache, server = make_server(probe=ProbeCache(poll, render))
+    try:
+        status, headers, body = get(server, '/probe?target=27000@lic-ansys')
+        assert status == 200 and b'flexlm_probe_success 1.0' in body
+        assert get(server, '/probe?target=27000@lic-ansys')[0] == 200
+        assert polled == ['lic-ansys:27000']
+        assert get(server, '/probe')[0] == 400
+        assert get(server, '/probe?target=lic-ansys')[0] == 400
+        # /probe rendert nie die Registry des Exporters
+        assert collector.collects == 0
+    finally:
+        stop_metrics_server(server)
+    print("✓ Probe gecacht, ungültige Targets abgewiesen")
+
+
+def main():
+    """Führt alle Tests aus"""
+    print("HTTP-Server Tests")
+    print("=" * 40)
+    test_rendered_once_per_snapshot()
+    test_gzip_and_etag()
+    test_header_negotiation()
+    test_max_age_rerenders()
+    test_health_and_ready()
+    test_keep_alive_and_request_metrics()
+    test_slow_client_does_not_block()
+    test_probe_endpoint()
+    print("\n✓ Alle Tests erfolgreich abgeschlossen!")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Tests für den LDAP Connection Pool
+Verwendet simulierte Verbindungen - läuft ohne Domain und ohne ldap3
+"""
+
+import sys
+import time
+import threading
+
+sys.path.append('.')
+
+from ldap_pool import LdapConnectionPool, LdapPoolUnavailable
+
+
+class FakeClock:
+    """Steuerbare Uhr für Backoff und Health-Checks"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeConnection:
+    """Gebundene Verbindung, die sich gezielt trennen lässt"""
+
+    def __init__(self, number):
+        self.number = number
+        self.bound = True
+        self.closed = False
+        self.dropped = False
+
+    def search(self, **kwargs):
+        if self.dropped:
+            raise ConnectionError("Verbindung vom DC getrennt")
+        return True
+
+    def unbind(self):
+        self.bound = False
+        self.closed = True
+
+
+class FakeFactory:
+    """Liefert neue Verbindungen oder schlägt auf Wunsch fehl"""
+
+    def __init__(self):
+        self.created = []
+        self.fail = False
+
+    def __call__(self):
+        if self.fail:
+            raise ConnectionError("DC nicht erreichbar")
+        conn = FakeConnection(len(self.created))
+        self.created.append(conn)
+        return conn
+
+
+def test_connections_are_reused():
+    """Verbindungen werden wiederverwendet und erst bei Bedarf aufgebaut"""
+    print("=== Test: Wiederverwendung ===")
+    factory = FakeFactory()
+    pool = LdapConnectionPool(factory, size=4)
+    for _ in range(5):
+        assert pool.run(lambda conn: conn.number) == 0
+    assert len(factory.created) == 1
+    stats = pool.stats()
+    assert (stats['acquisitions'], stats['idle'], stats['in_use']) == (5, 1, 0)
+    print("✓ Eine Verbindung für fünf Abfragen")
+
+
+def test_transparent_reconnect():
+    """Eine abgebrochene Verbindung wird verworfen und die Abfrage auf einer neuen wiederholt"""
+    print("\n=== Test: Transparenter Reconnect ===")
+    factory = FakeFactory()
+    pool = LdapConnectionPool(factory, size=2)
+    pool.run(lambda conn: conn.search())
+    factory.created[0].dropped = True
+
+    assert pool.run(lambda conn: conn.search() and conn.number) == 1
+    assert factory.created[0].closed
+    assert pool.stats()['reconnects'] == 1
+    print("✓ Abfrage nach Reconnect erfolgreich")
+
+
+def test_health_check_on_idle_connection():
+    """Länger ungenutzte Verbindungen werden vor der Verwendung geprüft"""
+    print("\n=== Test: Health-Check ===")
+    clock = FakeClock()
+    factory = FakeFactory()
+    pool = LdapConnectionPool(factory, size=1, health_check_interval=60, clock=clock)
+    pool.run(lambda conn: None)
+    factory.created[0].dropped = True
+
+    # Innerhalb des Intervalls wird nicht geprüft
+    clock.now += 30
+    with pool.connection() as conn:
+        assert conn is factory.created[0]
+
+    # Danach fällt die getrennte Verbindung beim Health-Check auf
+    clock.now += 61
+    with pool.connection() as conn:
+        assert conn is factory.created[1]
+    stats = pool.stats()
+    assert (stats['health_check_failures'], stats['reconnects']) == (1, 1)
+    print("✓ Getrennte Verbindung vor Verwendung ersetzt")
+
+
+def test_backoff_after_failed_connect():
+    """Nach einem fehlgeschlagenen Verbindungsaufbau wird mit wachsendem Abstand erneut versucht"""
+    print("\n=== Test: Backoff ===")
+    clock = FakeClock()
+    factory = FakeFactory()
+    factory.fail = True
+    pool = LdapConnectionPool(factory, size=1, initial_backoff=1, max_backoff=4, clock=clock)
+
+    for expected_failures, wait in ((1, 1), (2, 2), (3, 4), (4, 4)):
+        try:
+            pool.run(lambda conn: None)
+            assert False, "Verbindung trotz Ausfall"
+        except LdapPoolUnavailable:
+            pass
+        assert pool.connect_failures == expected_failures
+        # Während des Backoffs wird der DC nicht angesprochen
+        try:
+            pool.run(lambda conn: None)
+            assert False, "Kein Backoff"
+        except LdapPoolUnavailable:
+            pass
+        assert pool.connect_failures == expected_failures
+        clock.now += wait
+
+    factory.fail = False
+    assert pool.run(lambda conn: conn.number) == 0
+    print("✓ Backoff 1s, 2s, 4s, 4s")
+
+
+def test_parallel_lookups():
+    """Bis zu `size` Abfragen laufen gleichzeitig, weitere warten auf eine freie Verbindung"""
+    print("\n=== Test: Parallele Abfragen ===")
+    factory = FakeFactory()
+    pool = LdapConnectionPool(factory, size=3)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def slow_search(conn):
+        with lock:
+            active.append(conn)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.remove(conn)
+
+    threads = [threading.Thread(target=pool.run, args=(slow_search,)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(peak) == 3
+    assert len(factory.created) == 3
+    assert pool.stats()['wait_seconds'] > 0
+    print(f"✓ max. {max(peak)} parallele Abfragen, Wartezeit {pool.stats()['wait_seconds']:.3f}s")
+
+
+def main():
+    """Führt alle Tests aus"""
+    print("LDAP Connection Pool Tests")
+    print("=" * 40)
+    test_connections_are_reused()
+    test_transparent_reconnect()
+    test_health_check_on_idle_connection()
+    test_backoff_after_failed_connect()
+    test_parallel_lookups()
+    print("\n✓ Alle Tests erfolgreich abgeschlossen!")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Tests für den Single-Pass lmstat Parser
+Vergleicht die Ergebnisse mit der bisherigen zeilenweisen Implementierung
+"""
+
+import sys
+
+sys.path.append('.')
+
+from lmstat_parser import parse_lmstat, parse_lmstat_lines, parse_lmstat_inventory
+from benchmark_parser import parse_lmstat_legacy, generate_lmstat_output
+from feature_filter import FeatureFilter
+
+SAMPLE_OUTPUT = """
+lmutil - Copyright (c) 1989-2022 Flexera. All Rights Reserved.
+Flexible License Manager status on Wed 8/4/2025 14:30
+
+License server status: 27000@localhost
+    License file(s) on localhost: C:\\Program Files\\SolidWorks\\Network License Manager\\Licenses\\sw_d.lic:
+
+localhost: license server UP (MASTER) v11.18.1
+
+Vendor daemon status (on localhost):
+
+SolidWorksNetworkLicense: UP v11.18.1
+SOLIDWORKS: UP v11.18.1
+
+Feature usage info:
+
+Users of SOLIDWORKS:  (Total of 10 licenses issued;  Total of 3 licenses in use)
+
+  "SOLIDWORKS" v2023.0400, vendor: SolidWorksNetworkLicense
+  floating license
+
+    user1 WORKSTATION-01 WORKSTATION-01 (v2023.0400) (localhost/27000 1234), start Wed 8/4 14:25
+    user2 WORKSTATION-02 WORKSTATION-02 (v2023.0400) (localhost/27000 1235), start Wed 8/4 14:20  
+    admin PC-ADMIN PC-ADMIN (v2023.0400) (localhost/27000 1236), start Wed 8/4 14:15
+
+Users of swepdm_cadeditorandweb:  (Uncounted, node-locked)
+
+    ghost GHOST-PC GHOST-PC (v2023.0400) (localhost/27000 1240), start Wed 8/4 14:10
+
+Users of COSMOSWORKS:  (Total of 5 licenses issued;  Total of 1 license in use)
+
+  "COSMOSWORKS" v2023.0400, vendor: SolidWorksNetworkLicense
+  floating license
+
+    user1 WORKSTATION-01 WORKSTATION-01 (v2023.0400) (localhost/27000 1237), start Wed 8/4 14:26
+"""
+
+
+def without_vendor(data):
+    """Ergebnis ohne das (neuere) Vendor-Feld, das die bisherige Implementierung nicht kennt"""
+    for feature in data['features']:
+        feature.pop('vendor')
+    return data
+
+
+def test_sample_output():
+    """Parsed eine typische SolidWorks lmstat -a Ausgabe"""
+    print("=== Test: Beispiel-Ausgabe ===")
+    data = parse_lmstat(SAMPLE_OUTPUT)
+
+    assert data['server_status'] == True
+    assert [d['name'] for d in data['daemons']] == ['SolidWorksNetworkLicense', 'SOLIDWORKS']
+    assert [f['name'] for f in data['features']] == ['SOLIDWORKS', 'COSMOSWORKS']
+    assert len(data['users']) == 4
+    # Benutzer unter einem Feature ohne Zählung werden ignoriert
+    assert 'ghost' not in [u['username'] for u in data['users']]
+
+    solidworks = data['features'][0]
+    assert (solidworks['total'], solidworks['used'], solidworks['available']) == (10, 3, 7)
+    assert [u['hostname'] for u in solidworks['users']] == ['WORKSTATION-01', 'WORKSTATION-02', 'PC-ADMIN']
+    assert data['features'][1]['used'] == 1
+    print("✓ Beispiel-Ausgabe korrekt geparst")
+
+
+def test_matches_legacy_parser():
+    """Single-Pass Parser liefert exakt dasselbe Ergebnis wie die bisherige Implementierung"""
+    print("\n=== Test: Vergleich mit bisherigem Parser ===")
+    outputs = [
+        SAMPLE_OUTPUT,
+        SAMPLE_OUTPUT.replace('\n', '\r\n'),
+        generate_lmstat_output(0),
+        generate_lmstat_output(1234, users_per_feature=17),
+        "",
+    ]
+    for output in outputs:
+        assert without_vendor(parse_lmstat(output)) == parse_lmstat_legacy(output)
+    print(f"✓ {len(outputs)} Ausgaben identisch geparst")
+
+
+def test_streaming_parser():
+    """Zeilenweises Parsen aus einem Iterator liefert dasselbe Ergebnis wie der Puffer-Parser"""
+    print("\n=== Test: Streaming Parser ===")
+    output = generate_lmstat_output(500, users_per_feature=30)
+    consumed = []
+
+    def lines():
+        # Simuliert einen Pipe: Zeilen werden erst beim Weiterlesen erzeugt
+        for line in output.splitlines(keepends=True):
+            consumed.append(1)
+            yield line
+
+    assert parse_lmstat_lines(lines()) == parse_lmstat(output)
+    assert parse_lmstat_lines(SAMPLE_OUTPUT.splitlines(keepends=True)) == parse_lmstat(SAMPLE_OUTPUT)
+    assert len(consumed) == output.count('\n')
+    print("✓ Streaming Parser identisch")
+
+
+def test_server_down():
+    """Nicht erreichbarer Server wird als down erkannt"""
+    print("\n=== Test: Server nicht erreichbar ===")
+    data = parse_lmstat("lmgrd is not running: Cannot connect to license server system. (-15,570:115)\n")
+    assert data['server_status'] == False
+    assert data['features'] == []
+    print("✓ Server down erkannt")
+
+
+INVENTORY_OUTPUT = """
+lmutil - Copyright (c) 1989-2022 Flexera. All Rights Reserved.
+Flexible License Manager status on Wed 8/4/2025 14:30
+
+Feature                         Version     #licenses    Vendor        Expires
+_______                         _________   _________    ______        __________
+SOLIDWORKS                      2023.0400   10           SW_D          31-dec-2025
+COSMOSWORKS                     2023.0400   5            SW_D          permanent
+swepdm_cadeditorandweb          2023.0400   uncounted    SW_D          1-jan-0
+"""
+
+
+def test_inventory():
+    """Parsed die Feature-Tabelle von lmstat -i inkl. Ablaufdatum"""
+    print("\n=== Test: lmstat -i ===")
+    entries = parse_lmstat_inventory(INVENTORY_OUTPUT)
+    assert [e['name'] for e in entries] == ['SOLIDWORKS', 'COSMOSWORKS', 'swepdm_cadeditorandweb']
+    assert entries[0] == {'name': 'SOLIDWORKS', 'version': '2023.0400', 'licenses': 10,
+                          'vendor': 'SW_D', 'expires': 1767139200.0}
+    assert [e['expires'] for e in entries[1:]] == [0.0, 0.0]
+    assert entries[2]['licenses'] == 0
+
+    # Ältere lmutil-Versionen: Ablaufdatum vor dem Vendor
+    swapped = INVENTORY_OUTPUT.replace('Vendor        Expires', 'Expires       Vendor')
+    swapped = swapped.replace('SW_D          31-dec-2025', '31-dec-2025   SW_D')
+    assert parse_lmstat_inventory(swapped)[0] == entries[0]
+    assert parse_lmstat_inventory("lmgrd is not running") == []
+    print("✓ 3 Features, Spalten über die Kopfzeile zugeordnet")
+
+
+def test_feature_filter():
+    """Ausgefilterte Features und Vendor Daemons werden schon beim Parsen verworfen"""
+    print("\n=== Test: Filter beim Parsen ===")
+    data = parse_lmstat(SAMPLE_OUTPUT, FeatureFilter(deny=['COSMOS*']))
+    assert [f['name'] for f in data['features']] == ['SOLIDWORKS']
+    assert data['features'][0]['vendor'] == 'SolidWorksNetworkLicense'
+    assert len(data['users']) == 3
+
+    data = parse_lmstat(SAMPLE_OUTPUT, FeatureFilter(vendor_deny=['SolidWorksNetwork*']))
+    assert data['features'] == [] and data['users'] == []
+    assert [d['name'] for d in data['daemons']] == ['SOLIDWORKS']
+
+    lines = SAMPLE_OUTPUT.splitlines(keepends=True)
+    assert parse_lmstat_lines(lines, FeatureFilter(allow=['re:cosmos.*'])) == \
+        parse_lmstat(SAMPLE_OUTPUT, FeatureFilter(allow=['re:cosmos.*']))
+
+    # Ruhendes Feature ohne vendor-Zeile: Vendor aus der Zuordnung (lmstat -i)
+    idle = SAMPLE_OUTPUT + "\nUsers of NASTRAN:  (Total of 2 licenses issued;  Total of 0 licenses in use)\n"
+    assert 'NASTRAN' in [f['name'] for f in parse_lmstat(idle, FeatureFilter(vendor_deny=['MSC']))['features']]
+    data = parse_lmstat(idle, FeatureFilter(vendor_deny=['MSC']), feature_vendors={'NASTRAN': 'MSC'})
+    assert [f['name'] for f in data['features']] == ['SOLIDWORKS', 'COSMOSWORKS']
+    print("✓ Feature- und Vendor-Filter angewendet")
+
+
+def main():
+    """Führt alle Tests aus"""
+    print("lmstat Parser Tests")
+    print("=" * 40)
+    test_sample_output()
+    test_matches_legacy_parser()
+    test_streaming_parser()
+    test_server_down()
+    test_inventory()
+    test_feature_filter()
+    print("\n✓ Alle Tests erfolgreich abgeschlossen!")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests für Single-Flight und Rate-Limit der lmutil-Aufrufe
+Verwendet eine simulierte Uhr - kein echtes Warten, kein lmutil
+"""
+
+import sys
+import time
+import threading
+
+sys.path.append('.')
+
+from lmutil_guard import LmutilGuard, LmutilThrottled, SingleFlight, TokenBucket
+
+
+class FakeClock:
+    """Steuerbare Uhr; sleep() stellt sie nur vor"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_single_flight():
+    """Gleichzeitige Aufrufe teilen sich ein Ergebnis, auch Fehler"""
+    print("=== Test: Single-Flight ===")
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def slow_lmstat():
+        calls.append(1)
+        release.wait(5)
+        return (0, "lmstat-Ausgabe", "")
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do('27000@lic', slow_lmstat)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(coalesced for _, coalesced in results) == [False, True, True, True]
+    assert all(result == (0, "lmstat-Ausgabe", "") for result, _ in results)
+
+    # Nach Abschluss startet ein neuer Aufruf
+    def failing():
+        raise RuntimeError("lmutil nicht gefunden")
+    try:
+        flight.do('27000@lic', failing)
+        assert False, "Fehler wurde verschluckt"
+    except RuntimeError:
+        pass
+    assert flight.do('27000@lic', lambda: 42) == (42, False)
+    print("✓ 4 Aufrufe, 1 lmutil-Lauf")
+
+
+def test_token_bucket():
+    """Burst sofort, danach ein Token pro 1/rate Sekunden"""
+    print("\n=== Test: Token Bucket ===")
+    clock = FakeClock()
+    bucket = TokenBucket(rate=0.2, burst=2, clock=clock, sleep=clock.sleep)
+    assert bucket.acquire(timeout=0) == 0
+    assert bucket.acquire(timeout=0) == 0
+    assert bucket.acquire(timeout=1) is None
+    assert bucket.acquire(timeout=10) == 5
+    assert clock.slept == [5]
+    clock.now += 100
+    # Angespart werden höchstens `burst` Tokens
+    assert [bucket.acquire(timeout=0) for _ in range(3)] == [0, 0, None]
+    print("✓ Burst 2, danach alle 5s")
+
+
+def test_guard_per_server():
+    """Limit pro License Server mit Zählern für throttled und rejected"""
+    print("\n=== Test: Guard pro Server ===")
+    clock = FakeClock()
+    guard = LmutilGuard(rate_per_minute=6, burst=1, max_wait=15, clock=clock, sleep=clock.sleep)
+
+    assert guard.run('lic-a:27000', 'lmstat', lambda: 'a1') == 'a1'
+    # Anderer Server hat ein eigenes Kontingent
+    assert guard.run('lic-b:27000', 'lmstat', lambda: 'b1') == 'b1'
+    # Zweiter Aufruf für lic-a wartet 10s auf ein Token
+    assert guard.run('lic-a:27000', 'lmstat', lambda: 'a2') == 'a2'
+    assert clock.slept == [10]
+
+    strict = LmutilGuard(rate_per_minute=1, burst=1, max_wait=15, clock=clock, sleep=clock.sleep)
+    strict.run('lic-a:27000', 'lmstat', lambda: None)
+    try:
+        strict.run('lic-a:27000', 'lmstat', lambda: None)
+        assert False, "Aufruf trotz Limit"
+    except LmutilThrottled:
+        pass
+
+    assert guard.stats['lic-a:27000'] == {'executed': 2, 'coalesced': 0, 'throttled': 1, 'rejected': 0}
+    assert strict.stats['lic-a:27000']['rejected'] == 1
+    assert LmutilGuard(rate_per_minute=0)._bucket('lic-a:27000') is None
+    print("✓ Eigenes Kontingent pro Server")
+
+
+def main():
+    """Führt alle Tests aus"""
+    print("lmutil Guard Tests")
+    print("=" * 40)
+    test_single_flight()
+    test_token_bucket()
+    test_guard_per_server()
+    print("\n✓ Alle Tests erfolgreich abgeschlossen!")
+
+
+if __name__ == '__main__':
+    main()
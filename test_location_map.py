@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests für die statische Standort-Zuordnung
+Prüft CSV/JSON-Format und das Neuladen bei Dateiänderungen
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+
+sys.path.append('.')
+
+from location_map import LocationMap, LocationEntry
+
+
+def write_file(path: str, content: str, mtime_offset: float = 0):
+    """Schreibt eine Datei und setzt einen eindeutigen Änderungszeitpunkt"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    mtime = time.time() + mtime_offset
+    os.utime(path, (mtime, mtime))
+
+
+def test_csv_lookup():
+    """Benutzer und Hosts aus CSV, ohne Beachtung der Groß-/Kleinschreibung"""
+    print("=== Test: CSV-Datei ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'locations.csv')
+        write_file(path, "type,name,location,department\n"
+                         "user,MMueller,Stuttgart,Konstruktion\n"
+                         "host,ws-ber-07,Berlin,\n")
+        locations = LocationMap(path)
+        assert locations.user('mmueller') == LocationEntry('Stuttgart', 'Konstruktion')
+        assert locations.host('WS-BER-07') == LocationEntry('Berlin', '')
+        assert locations.user('unbekannt') is None
+        assert (locations.users, locations.hosts) == (1, 1)
+    print("✓ CSV geladen")
+
+
+def test_json_lookup():
+    """JSON mit Standort als String oder Objekt"""
+    print("\n=== Test: JSON-Datei ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'locations.json')
+        write_file(path, json.dumps({
+            'users': {'aschmidt': {'location': 'Berlin', 'department': 'Simulation'}},
+            'hosts': {'WS-STR-01': 'Stuttgart'}
+        }))
+        locations = LocationMap(path)
+        assert locations.user('ASCHMIDT') == LocationEntry('Berlin', 'Simulation')
+        assert locations.host('ws-str-01').location == 'Stuttgart'
+    print("✓ JSON geladen")
+
+
+def test_hot_reload():
+    """Geänderte Dateien werden neu geladen, fehlerhafte lassen den alten Stand aktiv"""
+    print("\n=== Test: Neuladen ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'locations.csv')
+        write_file(path, "type,name,location\nuser,mmueller,Stuttgart\n", mtime_offset=-20)
+        locations = LocationMap(path)
+
+        # Unveränderte Datei wird nicht erneut gelesen
+        assert not locations.reload()
+
+        write_file(path, "type,name,location\nuser,mmueller,München\n", mtime_offset=-10)
+        assert locations.reload()
+        assert locations.user('mmueller').location == 'München'
+
+        # Fehlerhafte Datei: letzter gültiger Stand bleibt aktiv
+        write_file(path, "name,location\nmmueller,Hamburg\n")
+        assert not locations.reload()
+        assert locations.user('mmueller').location == 'München'
+        assert locations.reload_errors == 1
+        assert not locations.reload()
+        assert locations.reload_errors == 1
+    print("✓ Neuladen bei Änderung")
+
+
+def test_large_file_shares_entries():
+    """100.000 Zeilen laden zügig, gleiche Standorte teilen sich ein Objekt"""
+    print("\n=== Test: Große Datei ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'locations.csv')
+        sites = ['Stuttgart', 'Berlin', 'Hamburg', 'München']
+        rows = [f"user,user{i},{sites[i % 4]},Abteilung {i % 10}" for i in range(100000)]
+        write_file(path, "type,name,location,department\n" + "\n".join(rows) + "\n")
+
+        start = time.perf_counter()
+        locations = LocationMap(path)
+        elapsed = time.perf_counter() - start
+
+        assert locations.users == 100000
+        assert locations.user('user99999').location == 'München'
+        assert locations.user('user0') is locations.user('user20')
+    print(f"✓ 100.000 Zeilen in {elapsed:.2f}s geladen")
+
+
+def test_background_watch():
+    """Die Überwachung lädt Änderungen im Hintergrund nach"""
+    print("\n=== Test: Hintergrund-Überwachung ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'locations.csv')
+        write_file(path, "type,name,location\nhost,ws1,Berlin\n", mtime_offset=-10)
+        locations = LocationMap(path, check_interval=0.02)
+        locations.start()
+        try:
+            write_file(path, "type,name,location\nhost,ws1,Köln\n")
+            deadline = time.time() + 2
+            while locations.host('ws1').location != 'Köln' and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            locations.stop(timeout=1)
+        assert locations.host('ws1').location == 'Köln'
+    print("✓ Änderung im Hintergrund übernommen")
+
+
+def main():
+    """Führt alle Tests aus"""
+    print("Standort-Datei Tests")
+    print("=" * 40)
+    test_csv_lookup()
+    test_json_lookup()
+    test_hot_reload()
+    test_large_file_shares_entries()
+    test_background_watch()
+    print("\n✓ Alle Tests erfolgreich abgeschlossen!")
+
+
+if __name__ == '__main__':
+    main()
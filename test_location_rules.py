@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Tests für die Standort-Regeln
+Hostname-Muster, CIDR-Netze und DNS-Cache mit simulierter Namensauflösung
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import tempfile
+
+sys.path.append('.')
+
+from location_rules import HostnameMatcher, NetworkTable, DnsCache, LocationRules
+
+
+class FakeResolver:
+    """Simulierte DNS-Auflösung mit Aufrufzähler"""
+
+    def __init__(self, hosts, delay: float = 0):
+        self.hosts = hosts
+        self.delay = delay
+        self.calls = []
+
+    def forward(self, hostname):
+        self.calls.append(hostname)
+        time.sleep(self.delay)
+        if hostname not in self.hosts:
+            raise OSError("Name or service not known")
+        return [self.hosts[hostname]]
+
+    def reverse(self, address):
+        self.calls.append(address)
+        for name, ip in self.hosts.items():
+            if ip == address:
+                return f"{name}.company.local"
+        raise OSError("Unknown host")
+
+
+def test_hostname_matcher():
+    """Die erste passende Regel gewinnt, Groß-/Kleinschreibung egal"""
+    print("=== Test: Hostname-Muster ===")
+    matcher = HostnameMatcher([
+        (r'WS-STR-LAB\d+', 'Stuttgart Labor'),
+        (r'WS-STR-\w+', 'Stuttgart'),
+        (r'(NB|WS)-(BER)-\d+', 'Berlin'),
+    ])
+    assert matcher.match('ws-str-lab01') == 'Stuttgart Labor'
+    assert matcher.match('WS-STR-01') == 'Stuttgart'
+    assert matcher.match('NB-BER-17') == 'Berlin'
+    assert matcher.match('PC-ADMIN') is None
+    assert HostnameMatcher([]).match('WS-STR-01') is None
+    print("✓ Hostname-Muster korrekt zugeordnet")
+
+
+def test_hostname_inline_flags():
+    """Führende Inline-Flags gelten nur für ihre Regel, globale Flags mittendrin werden abgelehnt"""
+    print("\n=== Test: Inline-Flags in Hostname-Mustern ===")
+    matcher = HostnameMatcher([
+        (r'WS-STR-\d+', 'Stuttgart'),
+        (r'(?x) NB - BER - \d+', 'Berlin'),
+        (r'(?s)(?i)ws-muc-\d+', 'München'),
+    ])
+    assert matcher.match('NB-BER-17') == 'Berlin'
+    assert matcher.match('WS-MUC-03') == 'München'
+    # (?x) gilt nicht für die anderen Regeln
+    assert matcher.match('WS-STR-01') == 'Stuttgart'
+    assert HostnameMatcher([(r'WS STR', 'Stuttgart')]).match('WS STR') == 'Stuttgart'
+    try:
+        HostnameMatcher([(r'WS-(?i)STR', 'Stuttgart')])
+        assert False, "Globales Flag mitten im Muster muss abgelehnt werden"
+    except re.error as e:
+        assert 'WS-(?i)STR' in str(e)
+    print("✓ Inline-Flags auf die Regel begrenzt")
+
+
+def test_network_table():
+    """Das spezifischste Netz gewinnt, IPv4 und IPv6"""
+    print("\n=== Test: CIDR-Netze ===")
+    table = NetworkTable([
+        ('10.20.0.0/16', 'Stuttgart'),
+        ('10.20.99.0/24', 'Stuttgart Labor'),
+        ('10.30.0.0/16', 'Berlin'),
+        ('2001:db8:1::/48', 'Hamburg'),
+    ])
+    assert table.lookup('10.20.1.5') == 'Stuttgart'
+    assert table.lookup('10.20.99.5') == 'Stuttgart Labor'
+    assert table.lookup('10.30.255.255') == 'Berlin'
+    assert table.lookup('10.40.0.1') is None
+    assert table.lookup('2001:db8:1::42') == 'Hamburg'
+    assert table.lookup('kein-ip') is None
+    print("✓ CIDR-Netze korrekt zugeordnet")
+
+
+def test_dns_feeds_networks():
+    """Hosts ohne passendes Muster werden per DNS aufgelöst und über die Netze zugeordnet"""
+    print("\n=== Test: DNS und Netze ===")
+    resolver = FakeResolver({'WORKSTATION-01': '10.20.1.5', 'PC-ADMIN': '10.30.0.9'})
+    rules = LocationRules(
+        hostname_rules=[(r'WS-STR-\d+', 'Stuttgart')],
+        networks=[('10.20.0.0/16', 'Stuttgart'), ('10.30.0.0/16', 'Berlin')],
+        dns=DnsCache(forward=resolver.forward, reverse=resolver.reverse)
+    )
+    hosts = ['WS-STR-01', 'WORKSTATION-01', 'PC-ADMIN', 'UNBEKANNT', 'WORKSTATION-01']
+    assert rules.locate_many(hosts) == {
+        'WS-STR-01': 'Stuttgart', 'WORKSTATION-01': 'Stuttgart', 'PC-ADMIN': 'Berlin'
+    }
+    # Muster-Treffer brauchen kein DNS, jeder Host wird nur einmal aufgelöst
+    assert sorted(resolver.calls) == ['PC-ADMIN', 'UNBEKANNT', 'WORKSTATION-01']
+
+    # Zweiter Zyklus kommt komplett aus dem Cache (auch der fehlgeschlagene Host)
+    rules.locate_many(hosts)
+    assert len(resolver.calls) == 3
+    assert rules.dns.failures == 1
+    print("✓ DNS-Ergebnisse gecacht und über Netze zugeordnet")
+
+
+def test_address_uses_reverse_dns():
+    """Steht statt des Hostnamens eine IP im lmstat, wird das Netz oder der Reverse-DNS-Name genutzt"""
+    print("\n=== Test: Reverse-DNS ===")
+    resolver = FakeResolver({'WS-STR-07': '192.168.5.7'})
+    rules = LocationRules(
+        hostname_rules=[(r'WS-STR-\d+', 'Stuttgart')],
+        networks=[('10.30.0.0/16', 'Berlin')],
+        dns=DnsCache(forward=resolver.forward, reverse=resolver.reverse)
+    )
+    assert rules.locate('10.30.1.1') == 'Berlin'
+    assert resolver.calls == []
+    assert rules.locate('192.168.5.7') == 'Stuttgart'
+    print("✓ IP-Adressen zugeordnet")
+
+
+def test_dns_deadline():
+    """Langsame DNS-Antworten blockieren den Zyklus nicht länger als die Deadline"""
+    print("\n=== Test: DNS-Deadline ===")
+    resolver = FakeResolver({'SLOW-PC': '10.20.1.1'}, delay=0.3)
+    rules = LocationRules(networks=[('10.20.0.0/16', 'Stuttgart')],
+                          dns=DnsCache(forward=resolver.forward, reverse=resolver.reverse))
+    start = time.monotonic()
+    assert rules.locate('SLOW-PC', deadline=0.05) is None
+    assert time.monotonic() - start < 0.25
+
+    # Die Auflösung läuft weiter und steht im nächsten Zyklus bereit
+    time.sleep(0.4)
+    assert rules.locate('SLOW-PC', deadline=0.05) == 'Stuttgart'
+    assert resolver.calls == ['SLOW-PC']
+    print("✓ Deadline eingehalten, Ergebnis im nächsten Zyklus")
+
+
+def test_rules_from_file():
+    """Regeln werden aus einer JSON-Datei geladen"""
+    print("\n=== Test: Regel-Datei ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'rules.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'hostname_rules': [{'pattern': r'.*-MUC$', 'location': 'München'}],
+                'networks': [{'cidr': '10.50.0.0/16', 'location': 'Köln'}]
+            }, f)
+        rules = LocationRules.from_file(path, dns=DnsCache(forward=lambda name: [], reverse=lambda ip: None))
+    assert rules.locate('NB-17-MUC') == 'München'
+    assert rules.locate('10.50.3.4') == 'Köln'
+    print("✓ Regel-Datei geladen")
+
+
+def main():
+    """Führt alle Tests aus"""
+    print("Standort-Regeln Tests")
+    print("=" * 40)
+    test_hostname_matcher()
+    test_hostname_inline_flags()
+    test_network_table()
+    test_dns_feeds_networks()
+    test_address_uses_reverse_dns()
+    test_dns_deadline()
+    test_rules_from_file()
+    print("\n✓ Alle Tests erfolgreich abgeschlossen!")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Tests für den /probe-Cache
+Prüft Cache, Zusammenfassen gleichzeitiger Probes und die Obergrenze ohne lmutil
+"""
+
+import sys
+import time
+import threading
+
+sys.path.append('.')
+
+from collection_engine import LicenseSnapshot, LicenseTarget
+from exposition import Exposition
+from probe import ProbeBusy, ProbeCache
+
+
+class FakeClock:
+    """Steuerbare Uhr für das Mindestintervall"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakePoller:
+    """Zählt Polls pro Target und blockiert auf Wunsch, bis `release` gesetzt ist"""
+
+    def __init__(self, block=False):
+        self.calls = []
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, target):
+        with self.lock:
+            self.calls.append(target.label)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        self.release.wait(5)
+        with self.lock:
+            self.active -= 1
+        return LicenseSnapshot(server=target.label, created_at=time.time(), duration=0.01,
+                               success=True, server_up=True)
+
+
+def render(snapshot):
+    return Exposition(plain=snapshot.server.encode(), gzip=b'', etag='"x"', generation=None,
+                      rendered_at=time.time())
+
+
+def test_cached_for_min_interval():
+    """Innerhalb des Mindestintervalls wird ein Target nicht erneut gepollt"""
+    print("=== Test: Mindestintervall ===")
+    clock = FakeClock()
+    poller = FakePoller()
+    cache = ProbeCache(poller, render, min_interval=30, clock=clock)
+    target = LicenseTarget.parse("27000@lic-ansys")
+
+    first = cache.probe(target)
+    clock.now += 29
+    assert cache.probe(target) is first
+    assert cache.probe(LicenseTarget.parse("27001@lic-ansys")).exposition.plain == b'lic-ansys:27001'
+    clock.now += 2
+    assert cache.probe(target) is not first
+    assert poller.calls == ['lic-ansys:27000', 'lic-ansys:27001', 'lic-ansys:27000']
+    assert cache.cache_hits == 1
+    print("✓ Ergebnis 30s gecacht")
+
+
+def test_concurrent_probes_coalesce():
+    """Gleichzeitige Probes desselben Targets teilen sich einen lmutil-Aufruf"""
+    print("\n=== Test: Zusammenfassen ===")
+    poller = FakePoller(block=True)
+    cache = ProbeCache(poller, render)
+    target = LicenseTarget.parse("27000@lic-ansys")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.probe(target))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while len(poller.calls) < 1 or cache.coalesced < 4:
+        time.sleep(0.01)
+    poller.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert poller.calls == ['lic-ansys:27000']
+    assert len(results) == 5 and all(result is results[0] for result in results)
+    print("✓ 5 Probes, 1 Poll")
+
+
+def test_concurrency_cap():
+    """Die Obergrenze begrenzt parallele Polls, Überlauf wird abgewiesen"""
+    print("\n=== Test: Obergrenze ===")
+    poller = FakePoller(block=True)
+    cache = ProbeCache(poller, render, max_concurrency=2, queue_timeout=0.2)
+    errors = []
+
+    def probe(number):
+        try:
+            cache.probe(LicenseTarget('lic', 27000 + number))
+        except ProbeBusy:
+            errors.append(number)
+
+    threads = [threading.Thread(target=probe, args=(n,)) for n in range(3)]
+    for thread in threads:
+        thread.start()
+    # Der dritte Probe wartet vergeblich auf einen freien Platz
+    while not errors:
+        time.sleep(0.01)
+    poller.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert poller.peak == 2 and len(poller.calls) == 2
+    assert len(errors) == 1 and cache.rejected == 1
+    print("✓ max. 2 parallele Polls, 1 abgewiesen")
+
+
+def test_failures_are_not_cached_and_targets_expire():
+    """Ausnahmen erreichen alle Wartenden und werden nicht gecacht; alte Targets verfallen"""
+    print("\n=== Test: Fehler und Verfall ===")
+    clock = FakeClock()
+    calls = []
+
+    def failing_poll(target):
+        calls.append(target.label)
+        if len(calls) == 1:
+            raise RuntimeError("lmutil abgestürzt")
+        return FakePoller()(target)
+
+    expired = []
+    cache = ProbeCache(failing_poll, render, expire_after=100, clock=clock,
+                       state_factory=lambda label: {'label': label}, on_expire=expired.append)
+    target = LicenseTarget.parse("27000@lic-ansys")
+    state = cache.state(target.label)
+    assert cache.state(target.label) is state
+    try:
+        cache.probe(target)
+        assert False, "Fehler wurde verschluckt"
+    except RuntimeError:
+        pass
+    assert cache.probe(target).snapshot.success
+    assert len(cache) == 1
+
+    clock.now += 101
+    cache.probe(LicenseTarget.parse("27001@lic-ansys"))
+    assert len(cache) == 1
+    # Zustand des alten Targets verfällt mit dem Ergebnis
+    assert expired == ['lic-ansys:27000']
+    assert cache.state(target.label) is not state
+    print("✓ Fehler nicht gecacht, altes Target samt Zustand entfernt")
+
+
+def main():
+    """Führt alle Tests aus"""
+    print("Probe Tests")
+    print("=" * 40)
+    test_cached_for_min_interval()
+    test_concurrent_probes_coalesce()
+    test_concurrency_cap()
+    test_failures_are_not_cached_and_targets_expire()
+    print("\n✓ Alle Tests erfolgreich abgeschlossen!")
+
+
+if __name__ == '__main__':
+    main()
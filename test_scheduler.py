@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Tests für den gestaffelten Scheduler
+Verwendet eine steuerbare Uhr - Läufe werden direkt im Test ausgeführt
+"""
+
+import sys
+
+sys.path.append('.')
+
+from collection_engine import LicenseTarget
+from scheduler import ScheduledTask, TieredScheduler
+
+
+class FakeClock:
+    """Steuerbare Uhr für die Planung"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def no_jitter(low, high):
+    return 0.0
+
+
+def run_until(scheduler, clock, end, step=1.0):
+    """Lässt die Uhr bis `end` laufen und führt fällige Läufe sofort aus"""
+    while clock.now < end:
+        for job in scheduler.pop_due():
+            scheduler.execute(job)
+        clock.now += step
+
+
+def test_independent_intervals():
+    """Jede Aufgabe läuft pro Target im eigenen Intervall, die Ergebnisse gehen an on_result"""
+    print("=== Test: Getrennte Intervalle ===")
+    clock = FakeClock()
+    results = []
+    tasks = [ScheduledTask('usage', 30, lambda target: 'usage'),
+             ScheduledTask('inventory', 600, lambda target: 'inventory')]
+    target = LicenseTarget("localhost", 27000)
+    scheduler = TieredScheduler(tasks, [target], lambda task, t, result: results.append(task),
+                                clock=clock, random_uniform=no_jitter)
+    scheduler.schedule()
+    run_until(scheduler, clock, 1000 + 1200)
+
+    assert results.count('usage') == 40
+    assert results.count('inventory') == 2
+    assert scheduler.stats['usage'].runs == 40
+    print("✓ 40 × usage, 2 × inventory in 20 Minuten")
+
+
+def test_targets_spread_over_interval():
+    """Die Targets starten gleichmäßig verteilt statt alle zur selben Sekunde"""
+    print("\n=== Test: Verteilung ===")
+    clock = FakeClock()
+    starts = {}
+    targets = [LicenseTarget(f"lic{i}", 27000) for i in range(4)]
+
+    def poll(target):
+        starts.setdefault(target.label, []).append(clock.now - 1000)
+
+    scheduler = TieredScheduler([ScheduledTask('usage', 60, poll)], targets, lambda *args: None,
+                                clock=clock, random_uniform=no_jitter)
+    scheduler.schedule()
+    run_until(scheduler, clock, 1000 + 200)
+
+    # Erster Lauf direkt nach dem Start, danach im Raster 60s + 15s * Target
+    assert [starts[t.label][1] - 60 for t in targets] == [0, 15, 30, 45]
+    assert all(runs[2] - runs[1] == 60 for runs in starts.values())
+    print("✓ 4 Targets im Abstand von 15s")
+
+
+def test_jitter_does_not_drift():
+    """Jitter streut jeden Lauf um den Rasterpunkt, ohne sich aufzusummieren"""
+    print("\n=== Test: Jitter ohne Drift ===")
+    clock = FakeClock()
+    starts = []
+    offsets = iter([3, -3] * 10)
+    scheduler = TieredScheduler([ScheduledTask('usage', 30, lambda t: starts.append(clock.now - 1000))],
+                                [LicenseTarget("localhost", 27000)], lambda *args: None,
+                                jitter=0.1, clock=clock, random_uniform=lambda low, high: next(offsets))
+    scheduler.schedule()
+    run_until(scheduler, clock, 1000 + 130)
+    assert starts == [0, 33, 57, 93, 117]
+    print("✓ Läufe bei 0, 33, 57, 93, 117s")
+
+
+def test_overlap_and_deadline():
+    """Läuft die vorige Abfrage noch, entfällt der Lauf; zu spät gestartete Läufe entfallen ebenfalls"""
+    print("\n=== Test: Überlappung und Deadline ===")
+    clock = FakeClock()
+    calls = []
+    task = ScheduledTask('usage', 30, lambda t: calls.append(clock.now), deadline=5)
+    scheduler = TieredScheduler([task], [LicenseTarget("localhost", 27000)], lambda *args: None,
+                                clock=clock, random_uniform=no_jitter)
+    scheduler.schedule()
+
+    first = scheduler.pop_due()
+    clock.now += 30
+    # Erster Lauf noch nicht ausgeführt: zweiter Lauf entfällt
+    assert scheduler.pop_due() == []
+    assert scheduler.stats['usage'].overlaps == 1
+
+    # Erster Lauf startet 30s zu spät - Deadline von 5s überschritten
+    scheduler.execute(first[0])
+    assert calls == [] and scheduler.stats['usage'].missed == 1
+
+    # Lange Pause: verpasste Rasterpunkte werden nicht nachgeholt, es folgt der nächste
+    clock.now += 300
+    jobs = scheduler.pop_due()
+    assert len(jobs) == 1
+    scheduler.execute(jobs[0])
+    assert calls == [] and scheduler.stats['usage'].missed == 2
+    assert 0 < scheduler.next_due() - clock.now <= 30
+    clock.now = scheduler.next_due()
+    for job in scheduler.pop_due():
+        scheduler.execute(job)
+    assert calls == [clock.now]
+    print("✓ Überlappung und verpasste Deadline übersprungen")
+
+
+def main():
+    """Führt alle Tests aus"""
+    print("Scheduler Tests")
+    print("=" * 40)
+    test_independent_intervals()
+    test_targets_spread_over_interval()
+    test_jitter_does_not_drift()
+    test_overlap_and_deadline()
+    print("\n✓ Alle Tests erfolgreich abgeschlossen!")
+
+
+if __name__ == '__main__':
+    main()